@@ -0,0 +1,297 @@
+"""
+Publish build artifacts: upload files to storage and report them to GMan.
+
+Executors hash every artifact, upload it and report its URI and SRI to GMan.
+ArtifactPipeline runs those steps as concurrent stages joined by bounded
+queues, so GMan reports overlap the next uploads and memory stays constant
+however many files there are. Storage clients compute the SRI while they read
+a file for upload, so hashing and uploading share one stage and every file is
+read exactly once.
+
+    pipeline = ArtifactPipeline(storecli, "artifacts", gman_url=url, task_id=task)
+    for artifact in pipeline.run(paths):
+        if artifact.error:
+            ...
+    print(pipeline.summary.record())
+"""
+import os
+import queue
+import threading
+import time
+
+from collections import namedtuple
+
+from piperci.gman import client as gman_client
+
+Artifact = namedtuple(
+    "Artifact", ["path", "object_name", "size", "uri", "sri", "error", "reported"]
+)
+Artifact.__new__.__defaults__ = (None, None, None, None, False)
+Artifact.__doc__ = "A file published by ArtifactPipeline, error is set if it failed"
+
+STAGES = ("upload", "report")
+
+_DONE = object()
+
+
+def report_message(artifact):
+    """The default GMan message of an uploaded artifact"""
+    return f"Uploaded artifact {artifact.uri} sri={artifact.sri}"
+
+
+class StageTimes:
+    """Items handled and seconds spent by the workers of one stage"""
+
+    __slots__ = ("items", "busy", "waiting")
+
+    def __init__(self):
+        self.items = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+
+
+class PipelineSummary:
+    """Totals of a pipeline run, with the time spent in each stage"""
+
+    def __init__(self):
+        self.files = 0
+        self.failures = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.stages = {stage: StageTimes() for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def stage(self, name, busy, waiting):
+        with self._lock:
+            times = self.stages[name]
+            times.items += 1
+            times.busy += busy
+            times.waiting += waiting
+
+    def add(self, artifact):
+        self.files += 1
+        self.failures += artifact.error is not None
+        self.bytes += artifact.size or 0
+
+    def record(self):
+        mb_per_s = self.bytes / self.seconds / 1e6 if self.seconds else 0.0
+        return {
+            "files": self.files,
+            "failures": self.failures,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 6),
+            "mb_per_s": round(mb_per_s, 3),
+            "stages": {
+                name: {
+                    "items": times.items,
+                    "busy_seconds": round(times.busy, 6),
+                    "wait_seconds": round(times.waiting, 6),
+                }
+                for name, times in self.stages.items()
+            },
+        }
+
+
+class _Stage:
+    """
+    Workers taking items from inbox, passing handle(item) to outbox. The last
+    worker to finish passes _DONE on. Workers also return once the pipeline is
+    stopped, whether or not _DONE arrives.
+    """
+
+    def __init__(self, name, handle, workers, inbox, outbox, pipeline):
+        self.name = name
+        self.handle = handle
+        self.inbox = inbox
+        self.outbox = outbox
+        self.pipeline = pipeline
+        self.running = workers
+        self._lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self._work, name=f"artifacts-{name}", daemon=True)
+            for _ in range(workers)
+        ]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def _work(self):
+        try:
+            while True:
+                started = time.perf_counter()
+                item = self.pipeline._get(self.inbox)
+                if item is _DONE:
+                    # Let sibling workers see it too
+                    self.pipeline._put(self.inbox, _DONE)
+                    return
+                waited = time.perf_counter() - started
+                item = self.handle(item)
+                self.pipeline.summary.stage(
+                    self.name, time.perf_counter() - started - waited, waited
+                )
+                if not self.pipeline._put(self.outbox, item):
+                    return
+        finally:
+            with self._lock:
+                self.running -= 1
+                last = not self.running
+            if last:
+                self.pipeline._put(self.outbox, _DONE)
+
+
+class ArtifactPipeline:
+    """
+    :param storage: A piperci.storeman BaseStorageClient
+    :param bucket_name: Bucket to upload to
+    :param gman_url: GMan endpoint as a string, artifacts are not reported
+    without it
+    :param task_id: The task to report artifacts to
+    :param prefix: Prepended to the object name of every file
+    :param root: Object names are file paths relative to root, by default the
+    file name
+    :param dgst: Digest algorithm of the SRIs
+    :param upload_workers: Files uploaded concurrently
+    :param report_workers: GMan reports sent concurrently
+    :param max_queued: Files queued between two stages
+    :param status: GMan status of the reports
+    :param message: message(artifact) returning the GMan message of an artifact
+    """
+
+    def __init__(
+        self,
+        storage,
+        bucket_name,
+        gman_url=None,
+        task_id=None,
+        prefix="",
+        root=None,
+        dgst="sha256",
+        upload_workers=4,
+        report_workers=2,
+        max_queued=16,
+        status="info",
+        message=report_message,
+    ):
+        self.storage = storage
+        self.bucket_name = bucket_name
+        self.gman_url = gman_url
+        self.task_id = task_id
+        self.prefix = prefix
+        self.root = root
+        self.dgst = dgst
+        self.upload_workers = upload_workers
+        self.report_workers = report_workers
+        self.max_queued = max_queued
+        self.status = status
+        self.message = message
+        self.summary = PipelineSummary()
+        self._stop = threading.Event()
+
+    def object_name(self, path):
+        if self.root is None:
+            name = os.path.basename(path)
+        else:
+            name = os.path.relpath(path, self.root).replace(os.sep, "/")
+        return f"{self.prefix}{name}"
+
+    def upload(self, item):
+        path, object_name = item
+        try:
+            stat = self.storage.upload_file(
+                self.bucket_name, object_name, path, dgst=self.dgst
+            )
+            return Artifact(
+                path,
+                object_name,
+                size=stat.size,
+                uri=self.storage.object_uri(self.bucket_name, object_name),
+                sri=str(stat.sri),
+            )
+        except Exception as e:
+            return Artifact(path, object_name, error=f"{type(e).__name__}: {e}")
+
+    def report(self, artifact):
+        if artifact.error is not None or not (self.gman_url and self.task_id):
+            return artifact
+        try:
+            gman_client.update_task_id(
+                task_id=self.task_id,
+                gman_url=self.gman_url,
+                status=self.status,
+                message=self.message(artifact),
+            )
+        except Exception as e:
+            return artifact._replace(error=f"{type(e).__name__}: {e}")
+        return artifact._replace(reported=True)
+
+    def _put(self, box, item):
+        while not self._stop.is_set():
+            try:
+                box.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, box):
+        """The next item of box, _DONE once the pipeline is stopped"""
+        while not self._stop.is_set():
+            try:
+                return box.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _feed(self, files, inbox):
+        try:
+            for item in files:
+                if isinstance(item, str):
+                    item = (item, self.object_name(item))
+                if not self._put(inbox, item):
+                    return
+        finally:
+            self._put(inbox, _DONE)
+
+    def run(self, files):
+        """
+        Upload and report files, yielding an Artifact per file as it completes.
+        Failures don't stop the run, they are yielded with error set.
+        :param files: Iterable of paths or (path, object_name) pairs, consumed
+        lazily
+        """
+        self._stop.clear()
+        started = time.perf_counter()
+        uploads = queue.Queue(self.max_queued)
+        reports = queue.Queue(self.max_queued)
+        published = queue.Queue(self.max_queued)
+        feeder = threading.Thread(
+            target=self._feed, args=(files, uploads), name="artifacts-feed", daemon=True
+        )
+        stages = [
+            _Stage("upload", self.upload, self.upload_workers, uploads, reports, self),
+            _Stage("report", self.report, self.report_workers, reports, published, self),
+        ]
+        feeder.start()
+        for stage in stages:
+            stage.start()
+        try:
+            while True:
+                artifact = published.get()
+                if artifact is _DONE:
+                    return
+                self.summary.add(artifact)
+                self.summary.seconds = time.perf_counter() - started
+                yield artifact
+        finally:
+            # Unblocks every stage if the caller stops iterating early
+            self._stop.set()
+
+
+def publish(storage, bucket_name, files, **kwargs):
+    """
+    Upload and report files with an ArtifactPipeline
+    :return: (list of Artifact, PipelineSummary)
+    """
+    pipeline = ArtifactPipeline(storage, bucket_name, **kwargs)
+    return list(pipeline.run(files)), pipeline.summary
@@ -0,0 +1,132 @@
+"""
+Output formats for sritool results.
+
+Every checked file produces one record, and a run ends with one summary record:
+
+    {"type": "file", "path": ..., "sri": ..., "ok": true, "bytes": 12, "seconds": 0.01}
+    {"type": "summary", "files": 1, "failures": 0, "bytes": 12, "seconds": 0.01,
+     "mb_per_s": 0.0012}
+
+json and csv are imported by the reporters that use them, sritool startup only
+pays for them when a structured format is asked for.
+"""
+import sys
+
+FORMATS = ('text', 'json', 'jsonl', 'csv')
+CSV_FIELDS = ('type', 'path', 'sri', 'expected', 'ok', 'bytes', 'seconds',
+              'error', 'files', 'failures', 'mb_per_s')
+
+
+class Summary:
+    """Accumulates file records into the summary record"""
+
+    def __init__(self):
+        self.files = 0
+        self.failures = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def add(self, record):
+        self.files += 1
+        self.failures += not record['ok']
+        self.bytes += record.get('bytes') or 0
+        self.seconds += record.get('seconds') or 0.0
+
+    def record(self):
+        mb_per_s = self.bytes / self.seconds / 1e6 if self.seconds else 0.0
+        return {'type': 'summary', 'files': self.files, 'failures': self.failures,
+                'bytes': self.bytes, 'seconds': round(self.seconds, 6),
+                'mb_per_s': round(mb_per_s, 3)}
+
+
+class TextReporter:
+    """
+    The classic sritool output: the SRI of a single file, or "SRI  path" lines
+    for a list of files. verify prints the real SRI and its url safe form.
+    Failures go to stderr, there is no summary.
+    """
+
+    def __init__(self, out=sys.stdout, show_path=False):
+        self.out = out
+        self.show_path = show_path
+
+    def file(self, record):
+        if record.get('error'):
+            print(f'{record["path"]}: {record["error"]}', file=sys.stderr)
+            return
+        if 'expected' in record:
+            self._verified(record)
+        elif self.show_path:
+            print(f'{record["sri"]}  {record["path"]}', file=self.out)
+        else:
+            print(record['sri'], file=self.out)
+
+    def _verified(self, record):
+        if self.show_path:
+            print(f'{record["path"]}: {"OK" if record["ok"] else "FAILED"}',
+                  file=self.out)
+        else:
+            print(f'{record["sri"]}\nurlsafeb64: {record["urlsafe"]}', file=self.out)
+        if not record['ok']:
+            print(f'{record["path"]}: {record["sri"]} != {record["expected"]}',
+                  file=sys.stderr)
+
+    def summary(self, record):
+        pass
+
+
+class JSONLinesReporter:
+    """One JSON object per line, written as each file is checked"""
+
+    def __init__(self, out=sys.stdout):
+        import json
+
+        self.out = out
+        self._dumps = json.dumps
+
+    def file(self, record):
+        print(self._dumps(record), file=self.out, flush=True)
+
+    def summary(self, record):
+        self.file(record)
+
+
+class JSONReporter:
+    """A single JSON document, {"files": [...], "summary": {...}}, written at the end"""
+
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.files = []
+
+    def file(self, record):
+        self.files.append(record)
+
+    def summary(self, record):
+        import json
+
+        json.dump({'files': self.files, 'summary': record}, self.out, indent=2)
+        print(file=self.out)
+
+
+class CSVReporter:
+    """CSV with a header row, file rows and a final summary row, see CSV_FIELDS"""
+
+    def __init__(self, out=sys.stdout):
+        import csv
+
+        self.writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def file(self, record):
+        self.writer.writerow(record)
+
+    def summary(self, record):
+        self.writer.writerow(record)
+
+
+def reporter(fmt, out=sys.stdout, show_path=False):
+    """Return the reporter for one of FORMATS"""
+    if fmt == 'text':
+        return TextReporter(out, show_path=show_path)
+    reporters = {'json': JSONReporter, 'jsonl': JSONLinesReporter, 'csv': CSVReporter}
+    return reporters[fmt](out)
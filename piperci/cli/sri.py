@@ -1,8 +1,231 @@
 import argparse
-import hashlib
+import os
 import sys
+import time
+
 import piperci.sri as sritool
 
+from piperci.cli import report
+
+
+STDIN = '-'
+
+
+def _client(opts):
+    from piperci.sri_server import SRIClient
+
+    return SRIClient(opts.server_socket)
+
+
+def _read_lines(stream, null=False):
+    """Yield lines from a newline or NUL delimited list, as written by find"""
+    if not null:
+        for line in stream:
+            line = line.rstrip(b'\r\n')
+            if line:
+                yield os.fsdecode(line)
+        return
+
+    pending = b''
+    for chunk in iter(lambda: stream.read(sritool.STREAM_BUFFER_SIZE), b''):
+        *lines, pending = (pending + chunk).split(b'\0')
+        yield from (os.fsdecode(line) for line in lines if line)
+    if pending:
+        yield os.fsdecode(pending)
+
+
+def _list_lines(opts):
+    if opts.from_file == STDIN:
+        yield from _read_lines(sys.stdin.buffer, null=opts.null)
+        return
+    with open(opts.from_file, 'rb') as stream:
+        yield from _read_lines(stream, null=opts.null)
+
+
+def _check_dgst(parser, opts):
+    algorithms = sritool.digest_algorithms()
+    if opts.dgst not in algorithms:
+        parser.error(f"argument --dgst: invalid choice: '{opts.dgst}' "
+                     f"(choose from {', '.join(sorted(algorithms))})")
+
+
+def _check_inputs(parser, opts):
+    if opts.from_file is not None:
+        if opts.file is not None or opts.tee:
+            parser.error('argument --from-file: not allowed with a file or --tee')
+    elif opts.file is None:
+        parser.error('the following arguments are required: file or --from-file')
+    elif opts.null:
+        parser.error('argument -0: only allowed with --from-file')
+
+
+class _CountingWriter:
+    """Counts the bytes written through it, forwarding them to out if given"""
+
+    def __init__(self, out=None):
+        self.out = out
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        if self.out is not None:
+            self.out.write(data)
+
+    def flush(self):
+        if self.out is not None:
+            self.out.flush()
+
+
+def _digest(opts, client, path, dgst):
+    """Return the SRI of path as a string and the number of bytes hashed"""
+    if path == STDIN or opts.tee:
+        # The server can't read our stdin, streams are always hashed locally
+        counter = _CountingWriter(sys.stdout.buffer if opts.tee else None)
+        if path == STDIN:
+            sri = sritool.generate_sri_stream(sys.stdin.buffer, dgst, tee=counter)
+        else:
+            with open(path, 'rb') as stream:
+                sri = sritool.generate_sri_stream(stream, dgst, tee=counter)
+        counter.flush()
+        return str(sri), counter.size
+
+    size = os.stat(path).st_size
+    if client is not None:
+        return client.generate(path, dgst=dgst), size
+    return str(sritool.generate_sri(path, dgst=dgst)), size
+
+
+def _claimed(opts, expected):
+    """Parse an expected SRI given on the command line or in a --from-file list"""
+    sri = sritool.urlsafe_to_sri(expected) if opts.url_safe else expected
+    hashes = sritool.sri_to_hashes(sri)
+    if not hashes:
+        raise ValueError(f'Not a valid integrity value: {expected!r}')
+    return hashes[0]
+
+
+def _check(opts, client, path, expected):
+    """Hash one file, comparing it to expected when verifying, as a report record"""
+    record = {'type': 'file', 'path': path, 'ok': False}
+    started = time.perf_counter()
+    try:
+        if expected is None:
+            sri, record['bytes'] = _digest(opts, client, path, opts.dgst)
+            record['sri'] = sritool.sri_to_urlsafe(sri) if opts.url_safe else sri
+            record['ok'] = True
+        else:
+            claimed = _claimed(opts, expected)
+            record['expected'] = str(claimed)
+            sri, record['bytes'] = _digest(opts, client, path, claimed.algorithm)
+            record.update(sri=sri, urlsafe=sritool.sri_to_urlsafe(sri),
+                          ok=sri == str(claimed))
+    except Exception as e:
+        record['error'] = f'{type(e).__name__}: {e}'
+    record['seconds'] = round(time.perf_counter() - started, 6)
+    return record
+
+
+def _checked(opts, jobs):
+    """Report records for (path, expected SRI) jobs, hashed one by one"""
+    client = _client(opts) if opts.server_socket else None
+    try:
+        for path, expected in jobs:
+            yield _check(opts, client, path, expected)
+    finally:
+        if client is not None:
+            client.close()
+
+
+def _pooled(opts, paths):
+    """Report records for paths hashed by a pool of --jobs worker processes"""
+    from piperci.sri_pool import hash_files
+
+    for batch in hash_files(paths, dgst=opts.dgst, workers=opts.jobs):
+        for index, path in enumerate(batch.paths):
+            record = {'type': 'file', 'path': path, 'ok': index not in batch.errors,
+                      'bytes': batch.sizes[index],
+                      'seconds': round(batch.seconds[index], 6)}
+            if record['ok']:
+                record['sri'] = str(batch.sri(index, url_safe=opts.url_safe))
+            else:
+                record['error'] = batch.errors[index]
+            yield record
+
+
+def _run(opts, records):
+    """
+    Report every record and a summary. Stops at the first failure unless
+    --keep-going, exits 1 if any failed.
+    """
+    out = sys.stderr if opts.tee else sys.stdout
+    reporter = report.reporter(opts.format, out, show_path=opts.from_file is not None)
+    summary = report.Summary()
+    try:
+        for record in records:
+            summary.add(record)
+            reporter.file(record)
+            if not record['ok'] and not opts.keep_going:
+                break
+    finally:
+        records.close()
+
+    reporter.summary(summary.record())
+    if summary.failures:
+        sys.exit(1)
+
+
+def _generate(parser, opts):
+    _check_inputs(parser, opts)
+    if not opts.server_socket or opts.file == STDIN or opts.tee:
+        _check_dgst(parser, opts)
+
+    if opts.from_file is None:
+        _run(opts, _checked(opts, [(opts.file, None)]))
+    elif opts.jobs > 1 and not opts.server_socket:
+        _run(opts, _pooled(opts, _list_lines(opts)))
+    else:
+        _run(opts, _checked(opts, ((path, None) for path in _list_lines(opts))))
+
+
+def _verify_jobs(opts):
+    """(path, sri) jobs from "SRI  path" lines, the generate --from-file output"""
+    for line in _list_lines(opts):
+        expected, _, path = line.partition('  ')
+        yield path or expected, expected if path else ''
+
+
+def _verify(parser, opts):
+    if opts.from_file is None and (opts.file is None or opts.sri is None):
+        parser.error('the following arguments are required: file sri, or --from-file')
+    if opts.from_file is not None and opts.file is not None:
+        parser.error('argument --from-file: not allowed with a file')
+    opts.tee = False
+
+    if opts.from_file is None:
+        jobs = [(opts.file, opts.sri)]
+    else:
+        jobs = _verify_jobs(opts)
+    _run(opts, _checked(opts, jobs))
+
+
+def _decode(parser, opts):
+    # Only base64 decodes, so decode never imports hashlib
+    print(sritool.urlsafe_to_sri(opts.sri))
+
+
+def _backends(parser, opts):
+    backends = sritool.digest_backends()
+    throughput = sritool.benchmark_backends(size=opts.size * 1024 * 1024)
+    for name, mb_per_s in sorted(throughput.items(), key=lambda item: -item[1]):
+        kind = 'sri' if backends[name] else 'internal'
+        print(f'{name:<10} {kind:<8} {mb_per_s:10.1f} MB/s')
+
+
+def _serve(parser, opts):
+    from piperci.sri_server import serve
+
+    serve(opts.socket, cache_size=opts.cache_size)
+
 
 def main():
     parser = argparse.ArgumentParser('SubResource Integrity(SRI) Tool',
@@ -13,45 +236,91 @@ def main():
                         action='store_true',
                         help='Assume a URL safe base64 encoded SRI: decodes to an SRI'
                              ' of format sha256-myhash')
+    parser.add_argument('--socket',
+                        dest='server_socket',
+                        default=os.environ.get('SRITOOL_SOCKET'),
+                        help='Send generate and verify requests to the sritool server'
+                             ' listening on this Unix socket. Defaults to'
+                             ' $SRITOOL_SOCKET')
 
     subparsers = parser.add_subparsers(help='encode or decode',
                                        required=True,
                                        dest='command')
 
-    gen = subparsers.add_parser('generate')
+    # Options shared by generate and verify
+    batch = argparse.ArgumentParser(add_help=False)
+    batch.add_argument('--format',
+                       choices=report.FORMATS,
+                       default='text',
+                       help='output format, json, jsonl and csv include per file'
+                            ' byte counts and timings and a summary record')
+    batch.add_argument('-k', '--keep-going',
+                       action='store_true',
+                       help='check every file before exiting, exits 1 if any failed')
+    batch.add_argument('-0', '--null',
+                       action='store_true',
+                       help='lines in the --from-file list are NUL delimited, as'
+                            ' written by find -print0')
+
+    gen = subparsers.add_parser('generate', parents=[batch])
 
-    gen.add_argument('file')
+    gen.add_argument('file',
+                     nargs='?',
+                     help='file to hash, - reads stdin')
+    # Validated in _generate, building choices would import hashlib for every
+    # subcommand
     gen.add_argument('--dgst',
                      default='sha256',
-                     choices=hashlib.algorithms_available,
-                     help='digest algorithm see: openssl dgst')
+                     help='digest algorithm see: openssl dgst and sritool backends.'
+                          ' Only sha256, sha384 and sha512 are SRI standard, others'
+                          ' are for internal values such as cache keys')
+    gen.add_argument('--tee',
+                     action='store_true',
+                     help='copy the input to stdout while hashing it, the SRI is'
+                          ' printed to stderr')
+    gen.add_argument('--from-file',
+                     metavar='LIST',
+                     help='hash every path listed in LIST, one per line (- reads'
+                          ' stdin), printing "SRI  path" lines')
+    gen.add_argument('-j', '--jobs',
+                     type=int,
+                     default=1,
+                     help='hash the --from-file list with this many worker'
+                          ' processes, for trees of many small files')
+    gen.set_defaults(func=_generate)
 
-    verify = subparsers.add_parser('verify')
+    verify = subparsers.add_parser('verify', parents=[batch])
 
-    verify.add_argument('file')
-    verify.add_argument('sri')
+    verify.add_argument('file', nargs='?', help='file to verify, - reads stdin')
+    verify.add_argument('sri', nargs='?')
+    verify.add_argument('--from-file',
+                        metavar='LIST',
+                        help='verify every "SRI  path" line in LIST, as printed by'
+                             ' generate --from-file (- reads stdin)')
+    verify.set_defaults(func=_verify)
 
     decoder = subparsers.add_parser('decode')
     decoder.add_argument('sri')
+    decoder.set_defaults(func=_decode)
 
-    opts = parser.parse_args()
+    backends = subparsers.add_parser('backends',
+                                     help='list the installed digest backends and'
+                                          ' their measured throughput')
+    backends.add_argument('--size',
+                          type=int,
+                          default=8,
+                          help='MiB hashed per backend and round')
+    backends.set_defaults(func=_backends)
 
-    if opts.command == 'generate':
-        print(str(sritool.generate_sri(opts.file,
-                                       dgst=opts.dgst,
-                                       url_safe=opts.url_safe)))
-    elif opts.command == 'verify':
-        if opts.url_safe:
-            claimed = sritool.urlsafe_to_hash(opts.sri)
-        else:
-            claimed = sritool.sri_to_hash(opts.sri)
+    server = subparsers.add_parser('serve')
+    server.add_argument('--socket',
+                        required=True,
+                        help='Unix socket path to listen on')
+    server.add_argument('--cache-size',
+                        type=int,
+                        default=100000,
+                        help='number of file digests to keep cached')
+    server.set_defaults(func=_serve)
 
-        real = sritool.generate_sri(opts.file, claimed.algorithm)
-
-        print(f'{str(real)}\nurlsafeb64: {sritool.hash_to_urlsafeb64(real)}')
-
-        if str(real) != str(claimed):
-            print(f'{opts.file}: {str(real)} != {str(claimed)}', file=sys.stderr)
-            sys.exit(1)
-    elif opts.command == 'decode':
-        print(str(sritool.urlsafe_to_hash(opts.sri)))
+    opts = parser.parse_args()
+    opts.func(parser, opts)
@@ -0,0 +1,84 @@
+"""
+Short lived cache for GMan reads.
+
+Components polling the same task or thread from one process share results:
+a response is reused for ttl seconds, and concurrent requests for the same URL
+wait for the one request already in flight instead of sending their own.
+"""
+import threading
+import time
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ReadCache:
+    """
+    TTL cache with single-flight coalescing, keyed by URL
+    :param ttl: Seconds a response is reused for. With 0 responses are not
+    reused, only shared between concurrent callers
+    """
+
+    def __init__(self, ttl=0.5):
+        self.ttl = ttl
+        self._entries = {}
+        self._flights = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, fetch):
+        """
+        Return the cached value of key, or fetch(key) it. Values are shared
+        between callers and must not be modified.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                generation = self._generation
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fetch(key)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                # Don't cache a response that may predate an invalidation
+                if flight.error is None and generation == self._generation:
+                    self._entries[key] = (time.monotonic() + self.ttl, flight.value)
+                    self._expire()
+            flight.done.set()
+        return flight.value
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+
+    def invalidate(self, *prefixes):
+        """Drop the entries whose key starts with any of prefixes"""
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._entries if k.startswith(prefixes)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
@@ -1,13 +1,86 @@
-import json
 import logging
 import requests
 import time
 
+from urllib.parse import urlparse
+from urllib3.exceptions import NewConnectionError
+
+from piperci.gman.cache import ReadCache
+from piperci import tracing
+from piperci.gman import schemas
 from piperci.gman.exceptions import TaskError
+from piperci.resilience import (
+    OK,
+    RETRY_STATUSES,
+    TRANSIENT,
+    UNSENT,
+    CircuitOpenError,
+    default_resilience,
+)
 
 log = logging.getLogger(__name__)
 
+# Shared by get_task_id_events, get_thread_id_tasks and get_thread_id_events,
+# set read_cache.ttl to tune how long responses are reused
+read_cache = ReadCache()
+
+# Arguments of the client functions recorded as span attributes
+_RECORDED = ("task_id", "thread_id", "status")
+
+
+def _classify(response, error):
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return UNSENT
+    if isinstance(error, requests.exceptions.ConnectionError):
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return UNSENT if isinstance(reason, NewConnectionError) else TRANSIENT
+    if isinstance(error, requests.exceptions.Timeout):
+        return TRANSIENT
+    if error is not None:
+        return OK
+    return TRANSIENT if response.status_code in RETRY_STATUSES else OK
+
+
+def _request(method, url, **kwargs):
+    """
+    Send a request to GMan through piperci.resilience, retrying transient
+    failures. An open circuit is raised as a requests ConnectionError.
+    """
+    endpoint = "{0.scheme}://{0.netloc}".format(urlparse(url))
+    try:
+        return default_resilience().call(
+            endpoint,
+            lambda: getattr(requests, method)(url, **kwargs),
+            method=method.upper(),
+            classify=_classify,
+        )
+    except CircuitOpenError as e:
+        raise requests.exceptions.ConnectionError(str(e))
+
+
+def _get_content(url):
+    r = _request("get", url)
+    r.raise_for_status()
+    return r.content
+
+
+def _get_json(url, schema=schemas.event_schema):
+    return schemas.parse(schema, _get_content(url), many=True)
 
+
+def _cached_get(url, query_filter=None, schema=schemas.event_schema):
+    """
+    GET url through read_cache. The cache holds the response body, each caller
+    parses its own copy it is free to modify.
+    """
+    result = schemas.parse(schema, read_cache.get(url, _get_content), many=True)
+    tracing.current_span().set_attribute("gman.items", len(result))
+    if query_filter:
+        result = list(filter(query_filter, result))
+    return result
+
+
+@tracing.traced("gman.request_new_task_id", record=_RECORDED)
 def request_new_task_id(
     run_id=None, gman_url=None, project=None, caller=None, status=None, thread_id=None
 ):
@@ -40,8 +113,14 @@ def request_new_task_id(
         }
         if thread_id:
             data.update({"thread_id": thread_id})
-        r = requests.post(f"{gman_url}/task", data=json.dumps(data))
+        r = _request(
+            "post",
+            f"{gman_url}/task",
+            data=schemas.render(schemas.new_task_schema, data),
+        )
         r.raise_for_status()
+        if thread_id:
+            read_cache.invalidate(f"{gman_url}/thread/{thread_id}")
     except requests.exceptions.HTTPError as e:
         raise requests.exceptions.HTTPError(
             f"GMan returned with a bad status code. \n\n{e}"
@@ -50,9 +129,10 @@ def request_new_task_id(
         raise requests.exceptions.HTTPError(
             f"Failed to request new task id from gman. \n\n{e}"
         )
-    return r.json()
+    return schemas.parse(schemas.event_schema, r.content)
 
 
+@tracing.traced("gman.wait_for_task_status", record=_RECORDED)
 def wait_for_task_status(task_id=None, status=None, gman_url=None, retry_max=10):
     """
     Returns true if given task_id has a status of the given status. If retry_max
@@ -65,14 +145,15 @@ def wait_for_task_status(task_id=None, status=None, gman_url=None, retry_max=10)
     :return: True or exception
     """
     retries = 0
+    span = tracing.current_span()
     while retries < retry_max:
+        span.set_attribute("gman.poll_iterations", retries + 1)
         try:
             log.debug(f"Checking status of task {task_id}")
-            r = requests.get(f"{gman_url}/task/{task_id}/events")
-            r.raise_for_status()
-            events = [event for event in r.json() if event.get("status") == status]
+            task_events = _get_json(f"{gman_url}/task/{task_id}/events")
+            events = [event for event in task_events if event.get("status") == status]
             events_failed = [
-                event for event in r.json() if event.get("status") == "failed"
+                event for event in task_events if event.get("status") == "failed"
             ]
             if len(events_failed):
                 raise TaskError(
@@ -95,6 +176,7 @@ def wait_for_task_status(task_id=None, status=None, gman_url=None, retry_max=10)
     raise TimeoutError(f"Checking task status timeout for task {task_id}")
 
 
+@tracing.traced("gman.update_task_id", record=_RECORDED)
 def update_task_id(task_id=None, gman_url=None, status=None, message=None):
     """
     Updates a taskID status and/or message
@@ -106,8 +188,14 @@ def update_task_id(task_id=None, gman_url=None, status=None, message=None):
     """
     try:
         data = {"message": message, "status": status}
-        r = requests.put(f"{gman_url}/task/{task_id}", data=json.dumps(data))
+        r = _request(
+            "put",
+            f"{gman_url}/task/{task_id}",
+            data=schemas.render(schemas.task_update_schema, data),
+        )
         r.raise_for_status()
+        # The task's thread isn't known here, drop every cached thread read
+        read_cache.invalidate(f"{gman_url}/task/{task_id}/", f"{gman_url}/thread/")
     except requests.exceptions.HTTPError as e:
         raise requests.exceptions.HTTPError(
             f"GMan returned with a bad status code. \n\n{e}"
@@ -116,9 +204,10 @@ def update_task_id(task_id=None, gman_url=None, status=None, message=None):
         raise requests.exceptions.RequestException(
             f"Failed to update taskID {task_id}. \n\n{e}"
         )
-    return r.json()
+    return schemas.parse(schemas.event_schema, r.content)
 
 
+@tracing.traced("gman.get_task_id_events", record=_RECORDED)
 def get_task_id_events(task_id=None, gman_url=None, query_filter=None):
     """
     Get a list of taskID events from gman.
@@ -130,15 +219,11 @@ def get_task_id_events(task_id=None, gman_url=None, query_filter=None):
     :param task_id: taskID to query as a string
     :param gman_url: GMan endpoint as as string
     :param query_filter: lambda expression
-    :return: List of events
+    :return: List of events, the response may be shared with concurrent callers
+    through read_cache but each caller gets its own copy
     """
     try:
-        r = requests.get(f"{gman_url}/task/{task_id}/events")
-        r.raise_for_status()
-        if query_filter:
-            return list(filter(query_filter, r.json()))
-        else:
-            return r.json()
+        return _cached_get(f"{gman_url}/task/{task_id}/events", query_filter)
     except requests.exceptions.HTTPError as e:
         raise requests.exceptions.HTTPError(
             f"Gman returned with a bad status code. \n\n{e}"
@@ -149,21 +234,21 @@ def get_task_id_events(task_id=None, gman_url=None, query_filter=None):
         )
 
 
+@tracing.traced("gman.get_thread_id_tasks", record=_RECORDED)
 def get_thread_id_tasks(thread_id=None, gman_url=None, query_filter=None):
     """
     Get a list of tasks associated with the given thread_id
     :param thread_id: The thread_id to query with as a sring
     :param gman_url: The GMan endpoint as a string
     :param query_filter: lambda expression
-    :return: List of tasks associated with thread_id
+    :return: List of tasks associated with thread_id, the response may be
+    shared with concurrent callers through read_cache but each caller gets its
+    own copy
     """
     try:
-        r = requests.get(f"{gman_url}/thread/{thread_id}")
-        r.raise_for_status()
-        if query_filter:
-            return list(filter(query_filter, r.json()))
-        else:
-            return r.json()
+        return _cached_get(
+            f"{gman_url}/thread/{thread_id}", query_filter, schemas.task_schema
+        )
     except requests.exceptions.HTTPError as e:
         raise requests.exceptions.HTTPError(
             f"Gman returned with a bad status code. \n\n{e}"
@@ -174,6 +259,7 @@ def get_thread_id_tasks(thread_id=None, gman_url=None, query_filter=None):
         )
 
 
+@tracing.traced("gman.get_thread_id_events", record=_RECORDED)
 def get_thread_id_events(thread_id=None, gman_url=None, query_filter=None):
     """
     Get list of all events for a given thread_id, optionally filtered by
@@ -181,15 +267,11 @@ def get_thread_id_events(thread_id=None, gman_url=None, query_filter=None):
     :param thread_id: Thread ID to query for as a string.
     :param gman_url:  GMan endpoint as a string.
     :param query_filter: Lambda expression
-    :return: List of task events
+    :return: List of task events, the response may be shared with concurrent
+    callers through read_cache but each caller gets its own copy
     """
     try:
-        r = requests.get(f"{gman_url}/thread/{thread_id}/events")
-        r.raise_for_status()
-        if query_filter:
-            return list(filter(query_filter, r.json()))
-        else:
-            return r.json()
+        return _cached_get(f"{gman_url}/thread/{thread_id}/events", query_filter)
     except requests.exceptions.HTTPError as e:
         raise requests.exceptions.HTTPError(
             f"Gman returned with a bad status code. \n\n{e}"
@@ -200,6 +282,7 @@ def get_thread_id_events(thread_id=None, gman_url=None, query_filter=None):
         )
 
 
+@tracing.traced("gman.wait_for_thread_id_complete", record=_RECORDED)
 def wait_for_thread_id_complete(thread_id=None, gman_url=None, retry_max=10):
     """
     Wait for all tasks under a given thread_id to return with a status of complete,
@@ -210,10 +293,12 @@ def wait_for_thread_id_complete(thread_id=None, gman_url=None, retry_max=10):
     :return: True or exception
     """
     retries = 0
+    span = tracing.current_span()
     while retries < retry_max:
+        span.set_attribute("gman.poll_iterations", retries + 1)
         try:
             log.debug(f"Checking status of thread {thread_id}")
-            r = requests.head(f"{gman_url}/thread/{thread_id}")
+            r = _request("head", f"{gman_url}/thread/{thread_id}")
             r.raise_for_status()
             running, completed, failed = [
                 r.headers.get(key)
@@ -0,0 +1,195 @@
+"""
+Load test for GMan and piperci.gman.client.
+
+Drives many concurrent task lifecycles, each one requesting a task id, posting
+progress updates and completing, while a watcher per task polls its events
+until it sees the completion. Reports calls/sec, client call latency and the
+time from a task completing to a watcher noticing.
+
+    python -m piperci.gman.loadtest --lifecycles 500 --concurrency 50
+
+Without --gman-url it runs against an in-process GManStandIn, which needs
+aiohttp (the aio extra).
+"""
+import argparse
+import json
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from piperci.gman import client
+
+
+def percentile(values, fraction):
+    """The value at fraction (0-1) of the sorted values, None if there are none"""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class LoadTest:
+    """
+    :param gman_url: GMan endpoint as a string
+    :param lifecycles: Number of task lifecycles to run
+    :param concurrency: Lifecycles in progress at once, each one also runs a watcher
+    :param updates: Progress updates per lifecycle before completing
+    :param poll_interval: Seconds between a watcher's polls
+    """
+
+    def __init__(
+        self, gman_url, lifecycles=100, concurrency=10, updates=5, poll_interval=0.01
+    ):
+        self.gman_url = gman_url
+        self.lifecycles = lifecycles
+        self.concurrency = concurrency
+        self.updates = updates
+        self.poll_interval = poll_interval
+        self.latencies = []
+        self.detections = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _call(self, fn, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(gman_url=self.gman_url, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.latencies.append(time.perf_counter() - started)
+
+    def lifecycle(self, index, watchers):
+        """Run one task from start to completion, handing it to a watcher"""
+        task = self._call(
+            client.request_new_task_id,
+            run_id=f"load-{index}",
+            project="loadtest",
+            caller="loadtest",
+            status="started",
+        )
+        task_id = task["task"]["task_id"]
+        completed = threading.Event()
+        completed.completed_at = None
+        detection = watchers.submit(self.watch, task_id, completed)
+        try:
+            for update in range(self.updates):
+                self._call(
+                    client.update_task_id,
+                    task_id=task_id,
+                    status="running",
+                    message=f"update {update}",
+                )
+            self._call(
+                client.update_task_id,
+                task_id=task_id,
+                status="completed",
+                message="done",
+            )
+            completed.completed_at = time.perf_counter()
+        finally:
+            # Also set when an update failed, completed_at None stops the watcher
+            completed.set()
+        return detection
+
+    def watch(self, task_id, completed):
+        """
+        Poll the task's events until it shows as completed, or until its
+        lifecycle failed and it never will
+        """
+        while True:
+            if completed.is_set() and completed.completed_at is None:
+                return
+            events = self._call(
+                client.get_task_id_events,
+                task_id=task_id,
+                query_filter=lambda event: event.get("status") == "completed",
+            )
+            if events:
+                completed.wait()
+                if completed.completed_at is None:
+                    return
+                detected = time.perf_counter() - completed.completed_at
+                with self._lock:
+                    self.detections.append(max(detected, 0.0))
+                return
+            time.sleep(self.poll_interval)
+
+    def run(self):
+        """Run every lifecycle, return the report as a dict"""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as workers, ThreadPoolExecutor(
+            self.concurrency
+        ) as watchers:
+            lifecycles = [
+                workers.submit(self.lifecycle, index, watchers)
+                for index in range(self.lifecycles)
+            ]
+            for lifecycle in lifecycles:
+                try:
+                    lifecycle.result().result()
+                except Exception:
+                    pass
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed):
+        def ms(value):
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "lifecycles": self.lifecycles,
+            "concurrency": self.concurrency,
+            "calls": len(self.latencies),
+            "errors": self.errors,
+            "seconds": round(elapsed, 3),
+            "calls_per_s": round(len(self.latencies) / elapsed, 1),
+            "latency_p50_ms": ms(percentile(self.latencies, 0.5)),
+            "latency_p99_ms": ms(percentile(self.latencies, 0.99)),
+            "detect_p50_ms": ms(percentile(self.detections, 0.5)),
+            "detect_p99_ms": ms(percentile(self.detections, 0.99)),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        "python -m piperci.gman.loadtest",
+        description="Load test GMan with concurrent task lifecycles",
+    )
+    parser.add_argument("--gman-url", help="GMan to test, default an in-process stand-in")
+    parser.add_argument("--lifecycles", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--updates", type=int, default=5)
+    parser.add_argument("--poll-interval", type=float, default=0.01)
+    parser.add_argument(
+        "--latency", type=float, default=0, help="stand-in latency per request, seconds"
+    )
+    parser.add_argument(
+        "--failure-rate", type=float, default=0, help="stand-in fraction of 503s"
+    )
+    opts = parser.parse_args(argv)
+
+    def run(gman_url):
+        return LoadTest(
+            gman_url,
+            lifecycles=opts.lifecycles,
+            concurrency=opts.concurrency,
+            updates=opts.updates,
+            poll_interval=opts.poll_interval,
+        ).run()
+
+    if opts.gman_url:
+        report = run(opts.gman_url)
+    else:
+        from piperci.gman.standin import GManStandIn
+
+        with GManStandIn(latency=opts.latency, failure_rate=opts.failure_rate) as gman:
+            report = run(gman.url)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Schemas of the GMan task and event payloads.
+
+Payloads are validated once where they cross into or out of
+piperci.gman.client. Fields GMan may add later pass through untouched, and
+fields it leaves out are not required, so only malformed values are rejected.
+
+Loading a long event list through marshmallow costs far more than parsing it,
+so each response schema is compiled into a plain type check. Only payloads
+failing that check are loaded by marshmallow, to report what is wrong.
+
+Responses are parsed with orjson or ujson when either is installed, else with
+the standard library json module. Request bodies are a handful of fields and
+keep being rendered by json.
+"""
+import json
+
+from marshmallow import INCLUDE, Schema, ValidationError, fields, validate
+
+from piperci.gman.exceptions import InvalidResponse
+
+try:
+    import orjson as json_backend
+except ImportError:
+    try:
+        import ujson as json_backend
+    except ImportError:
+        json_backend = json
+
+NEW_TASK_STATUSES = ("started", "received")
+
+
+class _GManSchema(Schema):
+    class Meta:
+        unknown = INCLUDE
+
+
+class TaskSchema(_GManSchema):
+    task_id = fields.Str(allow_none=True)
+    thread_id = fields.Str(allow_none=True)
+    run_id = fields.Str(allow_none=True)
+    project = fields.Str(allow_none=True)
+    caller = fields.Str(allow_none=True)
+
+
+class EventSchema(_GManSchema):
+    task = fields.Nested(TaskSchema)
+    timestamp = fields.Str(allow_none=True)
+    message = fields.Str(allow_none=True)
+    status = fields.Str(allow_none=True)
+
+
+class NewTaskSchema(_GManSchema):
+    """Body of POST /task"""
+
+    run_id = fields.Str(allow_none=True)
+    project = fields.Str(allow_none=True)
+    caller = fields.Str(allow_none=True)
+    message = fields.Str(allow_none=True)
+    status = fields.Str(required=True, validate=validate.OneOf(NEW_TASK_STATUSES))
+    thread_id = fields.Str()
+
+
+class TaskUpdateSchema(_GManSchema):
+    """Body of PUT /task/{task_id}"""
+
+    message = fields.Str(allow_none=True)
+    status = fields.Str(required=True, allow_none=True)
+
+
+def _never(value):
+    return False
+
+
+def _field_check(field):
+    """A check of a field's value, _never for fields that need marshmallow"""
+    if field.validators:
+        return _never
+    if isinstance(field, fields.Nested):
+        inner = compile_schema(field.schema)
+    elif isinstance(field, fields.String):
+        inner = None
+    else:
+        return _never
+    kind = dict if inner else str
+    allow_none = field.allow_none
+
+    def check(value):
+        if value is None:
+            return allow_none
+        return isinstance(value, kind) and (inner is None or inner(value))
+
+    return check
+
+
+def compile_schema(schema):
+    """
+    Compile schema into check(data), True if marshmallow would load data
+    unchanged. A False check doesn't mean data is invalid, only that
+    marshmallow has to decide.
+    """
+    checks = [
+        (field.data_key or name, _field_check(field), field.required)
+        for name, field in schema.fields.items()
+    ]
+
+    def check(data):
+        if not isinstance(data, dict):
+            return False
+        for key, check_value, required in checks:
+            if key in data:
+                if not check_value(data[key]):
+                    return False
+            elif required:
+                return False
+        return True
+
+    return check
+
+
+task_schema = TaskSchema()
+event_schema = EventSchema()
+new_task_schema = NewTaskSchema()
+task_update_schema = TaskUpdateSchema()
+
+_checks = {
+    task_schema: compile_schema(task_schema),
+    event_schema: compile_schema(event_schema),
+}
+
+
+def render(schema, data):
+    """Validate a request payload and render it as JSON"""
+    errors = schema.validate(data)
+    if errors:
+        raise ValueError(f"Invalid GMan request {errors}")
+    return json.dumps(data)
+
+
+def parse(schema, content, many=False):
+    """
+    Parse and validate a GMan response body
+    :param schema: Schema of the payload, or of each item if many
+    :param content: The response body as bytes
+    :param many: True if the payload is a list
+    :return: The payload as dicts, InvalidResponse is raised if it doesn't fit
+    the schema
+    """
+    try:
+        data = json_backend.loads(content)
+    except ValueError as e:
+        raise InvalidResponse(f"Malformed GMan response: {e}")
+    check = _checks.get(schema, _never)
+    if many and isinstance(data, list) and all(map(check, data)):
+        return data
+    if not many and check(data):
+        return data
+    try:
+        return schema.load(data, many=many)
+    except ValidationError as e:
+        raise InvalidResponse(f"Malformed GMan response: {e}")
@@ -0,0 +1,184 @@
+"""
+In-process GMan stand-in served by aiohttp on a background thread.
+
+Implements the GMan API used by piperci.gman.client, keeping tasks and events
+in memory, with optional latency and failure injection for load tests.
+Requires aiohttp, install piperci with the aio extra.
+
+    with GManStandIn(latency=0.005, failure_rate=0.01) as gman:
+        task = client.request_new_task_id(..., gman_url=gman.url)
+
+Endpoints:
+
+    POST /task                  create a task, returns its first event
+    PUT  /task/{id}             add an event, returns it
+    GET  /task/{id}             the task
+    GET  /task/{id}/events      the task's events
+    GET  /thread/{id}           the thread's tasks
+    HEAD /thread/{id}           x-gman-tasks-running/completed/failed counts
+    GET  /thread/{id}/events    the events of every task in the thread
+"""
+import asyncio
+import json
+import random
+import threading
+import uuid
+
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+
+def _json(data, status=200):
+    return web.Response(
+        status=status, body=json.dumps(data), content_type="application/json"
+    )
+
+
+class GManStandIn:
+    """
+    :param latency: Seconds added to every request, or a callable returning them
+    :param failure_rate: Fraction of requests answered with a 503
+    :param seed: Seed for the failure injection
+    """
+
+    def __init__(self, latency=0, failure_rate=0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.tasks = {}
+        self.events = {}
+        self.threads = {}
+        # Statuses to answer the next requests with, for failure injection
+        self.failures = []
+        self.requests = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        app = web.Application(middlewares=[self._inject])
+        app.router.add_post("/task", self.create_task)
+        app.router.add_put("/task/{task_id}", self.update_task)
+        app.router.add_get("/task/{task_id}", self.get_task)
+        app.router.add_get("/task/{task_id}/events", self.get_task_events)
+        # HEAD /thread/{id} returns counts, not a body-less GET
+        app.router.add_route("HEAD", "/thread/{thread_id}", self.thread_status)
+        app.router.add_get("/thread/{thread_id}", self.get_thread, allow_head=False)
+        app.router.add_get("/thread/{thread_id}/events", self.get_thread_events)
+        self.runner = web.AppRunner(app)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+        return self
+
+    async def _start(self):
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    @web.middleware
+    async def _inject(self, request, handler):
+        self.requests += 1
+        latency = self.latency() if callable(self.latency) else self.latency
+        if latency:
+            await asyncio.sleep(latency)
+        if self.failures:
+            return _json({"error": "injected"}, status=self.failures.pop(0))
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            return _json({"error": "injected"}, status=503)
+        return await handler(request)
+
+    def _event(self, task_id, status, message):
+        event = {
+            "task": self.tasks[task_id],
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "message": message,
+            "status": status,
+        }
+        self.events[task_id].append(event)
+        return event
+
+    def status(self, task_id):
+        """The status of the task's latest event"""
+        return self.events[task_id][-1]["status"]
+
+    async def create_task(self, request):
+        data = json.loads(await request.read())
+        if data.get("status") not in ("started", "received"):
+            return _json({"error": "status must be started or received"}, 400)
+        task_id = str(uuid.uuid4())
+        thread_id = data.get("thread_id") or task_id
+        self.tasks[task_id] = {
+            "task_id": task_id,
+            "thread_id": thread_id,
+            "run_id": data.get("run_id"),
+            "project": data.get("project"),
+            "caller": data.get("caller"),
+        }
+        self.events[task_id] = []
+        self.threads.setdefault(thread_id, []).append(task_id)
+        return _json(self._event(task_id, data["status"], data.get("message")))
+
+    async def update_task(self, request):
+        task_id = request.match_info["task_id"]
+        if task_id not in self.tasks:
+            return _json({"error": "task not found"}, 404)
+        data = json.loads(await request.read())
+        return _json(self._event(task_id, data.get("status"), data.get("message")))
+
+    async def get_task(self, request):
+        task_id = request.match_info["task_id"]
+        if task_id not in self.tasks:
+            return _json({"error": "task not found"}, 404)
+        return _json(self.tasks[task_id])
+
+    async def get_task_events(self, request):
+        task_id = request.match_info["task_id"]
+        if task_id not in self.tasks:
+            return _json({"error": "task not found"}, 404)
+        return _json(self.events[task_id])
+
+    def _thread_tasks(self, request):
+        return self.threads.get(request.match_info["thread_id"])
+
+    async def thread_status(self, request):
+        task_ids = self._thread_tasks(request)
+        if task_ids is None:
+            return web.Response(status=404)
+        statuses = [self.status(task_id) for task_id in task_ids]
+        completed = statuses.count("completed")
+        failed = statuses.count("failed")
+        return web.Response(
+            headers={
+                "x-gman-tasks-running": str(len(statuses) - completed - failed),
+                "x-gman-tasks-completed": str(completed),
+                "x-gman-tasks-failed": str(failed),
+            }
+        )
+
+    async def get_thread(self, request):
+        task_ids = self._thread_tasks(request)
+        if task_ids is None:
+            return _json({"error": "thread not found"}, 404)
+        return _json([self.tasks[task_id] for task_id in task_ids])
+
+    async def get_thread_events(self, request):
+        task_ids = self._thread_tasks(request)
+        if task_ids is None:
+            return _json({"error": "thread not found"}, 404)
+        return _json([event for task_id in task_ids for event in self.events[task_id]])
@@ -0,0 +1,206 @@
+"""
+Track the tasks of a large GMan thread.
+
+ThreadTracker keeps one entry per task, its latest status, and status counts
+updated as tasks change. A refresh first asks for the thread's status counters
+with a HEAD request. The thread's events are fetched only when the counters
+changed since the last refresh, and only the running tasks' events when the
+counters account for no new task and few tasks are still running. Waiting for
+a handful of tasks polls the events of those tasks instead of the whole thread.
+While waiting, the whole thread's events are re-read at most every
+full_refresh_interval seconds.
+
+    tracker = ThreadTracker(thread_id, gman_url)
+    tracker.wait(my_task_ids, timeout=600)
+    print(tracker.counts, tracker.failed())
+"""
+import sys
+import time
+
+from collections import Counter
+
+from piperci.gman import client
+from piperci.gman.exceptions import TaskError
+from piperci.gman.updater import TERMINAL_STATUSES
+
+_COUNTERS = ("x-gman-tasks-running", "x-gman-tasks-completed", "x-gman-tasks-failed")
+
+
+class ThreadTracker:
+    """
+    :param thread_id: The thread to track as a string
+    :param gman_url: GMan endpoint as a string
+    :param poll_interval: Seconds between refreshes while waiting
+    :param per_task_limit: Waiting for at most this many unfinished tasks polls
+    their events one task at a time instead of the whole thread's
+    :param full_refresh_interval: Minimum seconds between two reads of the whole
+    thread's events while waiting
+    """
+
+    def __init__(
+        self,
+        thread_id,
+        gman_url,
+        poll_interval=1.0,
+        per_task_limit=8,
+        full_refresh_interval=5.0,
+    ):
+        self.thread_id = thread_id
+        self.gman_url = gman_url
+        self.poll_interval = poll_interval
+        self.per_task_limit = per_task_limit
+        self.full_refresh_interval = full_refresh_interval
+        # task_id: latest status, statuses are interned so each is stored once
+        self.statuses = {}
+        self.counts = Counter()
+        self._running = set()
+        self._failed = set()
+        self.requests = 0
+        self._counters = None
+        self._full_refreshed = None
+
+    def __len__(self):
+        return len(self.statuses)
+
+    def status(self, task_id):
+        """The latest status of task_id, None if it hasn't been seen"""
+        return self.statuses.get(task_id)
+
+    def running(self):
+        """The tasks that have neither completed nor failed yet"""
+        return set(self._running)
+
+    def failed(self):
+        return set(self._failed)
+
+    def completed(self):
+        return {t for t, status in self.statuses.items() if status == "completed"}
+
+    def _set(self, task_id, status):
+        """Record a task's latest status, True if it changed"""
+        previous = self.statuses.get(task_id)
+        if status == previous or previous in TERMINAL_STATUSES:
+            return False
+        status = sys.intern(status)
+        self.statuses[task_id] = status
+        if previous is not None:
+            self.counts[previous] -= 1
+        self.counts[status] += 1
+        if status in TERMINAL_STATUSES:
+            self._running.discard(task_id)
+            if status == "failed":
+                self._failed.add(task_id)
+        else:
+            self._running.add(task_id)
+        return True
+
+    def apply(self, events):
+        """
+        Update the index from events, in the order GMan returns them. Terminal
+        statuses are final, later events don't change them.
+        :return: The number of tasks whose status changed
+        """
+        latest = {}
+        for event in events:
+            task_id = (event.get("task") or {}).get("task_id")
+            status = event.get("status")
+            if task_id is None or status is None:
+                continue
+            timestamp = event.get("timestamp") or ""
+            seen = latest.get(task_id)
+            if seen is not None and (
+                seen[1] in TERMINAL_STATUSES
+                or (timestamp < seen[0] and status not in TERMINAL_STATUSES)
+            ):
+                continue
+            latest[task_id] = (timestamp, status)
+        return sum(self._set(task_id, status) for task_id, (_, status) in latest.items())
+
+    def _thread_counters(self):
+        self.requests += 1
+        r = client._request("head", f"{self.gman_url}/thread/{self.thread_id}")
+        r.raise_for_status()
+        return tuple(r.headers.get(key) for key in _COUNTERS)
+
+    def _accounted(self, counters):
+        """True if the counters count exactly the tasks already tracked"""
+        try:
+            return bool(self.statuses) and sum(map(int, counters)) == len(self)
+        except (TypeError, ValueError):
+            return False
+
+    def refresh(self, full_interval=0):
+        """
+        Bring the whole thread up to date, fetching events only if its status
+        counters changed. When they count no new task and at most
+        per_task_limit tasks are running, only those tasks' events are fetched.
+        :param full_interval: Don't re-read the whole thread's events if they
+        were read less than this many seconds ago, the counters are checked
+        again by the next refresh
+        :return: The number of tasks whose status changed
+        """
+        counters = self._thread_counters()
+        if counters == self._counters:
+            return 0
+        if self._accounted(counters) and len(self._running) <= self.per_task_limit:
+            changed = self.refresh_tasks(self.running())
+        else:
+            now = time.monotonic()
+            if (
+                self._full_refreshed is not None
+                and now - self._full_refreshed < full_interval
+            ):
+                return 0
+            self.requests += 1
+            # Bypasses read_cache, a cached response may predate the new counters
+            changed = self.apply(
+                client._get_json(f"{self.gman_url}/thread/{self.thread_id}/events")
+            )
+            self._full_refreshed = now
+        self._counters = counters
+        return changed
+
+    def refresh_tasks(self, task_ids):
+        """Bring the given tasks up to date from their own events"""
+        changed = 0
+        for task_id in task_ids:
+            self.requests += 1
+            changed += self.apply(
+                client._get_json(f"{self.gman_url}/task/{task_id}/events")
+            )
+        return changed
+
+    def pending(self, task_ids=None):
+        """The unfinished tasks among task_ids, by default the whole thread"""
+        if task_ids is None:
+            return set(self._running)
+        return {t for t in task_ids if self.statuses.get(t) not in TERMINAL_STATUSES}
+
+    def wait(self, task_ids=None, timeout=None, raise_on_failure=True):
+        """
+        Wait until the given tasks, or every task of the thread, have completed
+        or failed
+        :param task_ids: Iterable of task ids, tasks not seen yet count as pending
+        :param timeout: Seconds to wait at most, None to wait forever
+        :param raise_on_failure: Raise TaskError as soon as a waited task failed
+        :return: The set of waited tasks that failed
+        """
+        task_ids = None if task_ids is None else set(task_ids)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            pending = self.pending(task_ids)
+            if task_ids is not None and len(pending) <= self.per_task_limit:
+                self.refresh_tasks(pending)
+            else:
+                self.refresh(self.full_refresh_interval)
+            failed = self._failed if task_ids is None else self._failed & task_ids
+            if failed and raise_on_failure:
+                raise TaskError(f"Thread {self.thread_id} has failed tasks {failed}")
+            if not self.pending(task_ids) and (task_ids is not None or self.statuses):
+                return set(failed)
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Waiting for thread {self.thread_id} timed out, "
+                    f"{len(self.pending(task_ids))} tasks still running"
+                )
+            time.sleep(self.poll_interval)
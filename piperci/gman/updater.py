@@ -0,0 +1,142 @@
+"""
+Background task status updates.
+
+Executors report progress far more often than anyone reads it. TaskUpdater
+queues progress updates and sends them from a worker thread, so the work loop
+never waits on GMan. An update still waiting to be sent is replaced by a newer
+update to the same task with the same status, so a status change such as
+"delegated" is never lost behind a later "info". Terminal updates ("completed"
+and "failed") are sent synchronously and after every update already sent for
+the task. Progress updates to a task after its terminal update are dropped.
+
+    with TaskUpdater(gman_url) as updater:
+        for item in work:
+            updater.update(task_id, "info", f"processing {item}")
+        updater.update(task_id, "completed", "done")
+"""
+import atexit
+import logging
+import threading
+
+from collections import OrderedDict
+
+from piperci.gman import client
+
+log = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = frozenset(["completed", "failed"])
+
+
+class TaskUpdater:
+    """
+    :param gman_url: GMan endpoint as a string
+    """
+
+    def __init__(self, gman_url):
+        self.gman_url = gman_url
+        self.sent = 0
+        self.merged = 0
+        self.errors = 0
+        self.dropped = 0
+        # (task_id, status): message, oldest first
+        self._pending = OrderedDict()
+        self._sending = None
+        # Tasks given a terminal update, their progress updates are dropped
+        self._terminal = set()
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name="gman-task-updater", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def update(self, task_id, status, message):
+        """
+        Update a task. Terminal statuses are sent before returning, dropping any
+        queued update to the task, and return GMan's response. Other updates are
+        queued and return None, they are dropped once the task had a terminal
+        update.
+        """
+        if status in TERMINAL_STATUSES:
+            with self._condition:
+                self._terminal.add(task_id)
+                for key in [key for key in self._pending if key[0] == task_id]:
+                    del self._pending[key]
+                    self.merged += 1
+                while self._sending == task_id:
+                    self._condition.wait()
+            try:
+                return self._send(task_id, status, message, raise_errors=True)
+            except Exception:
+                with self._condition:
+                    # GMan didn't take it, the caller may retry or carry on
+                    self._terminal.discard(task_id)
+                raise
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("TaskUpdater is closed")
+            if task_id in self._terminal:
+                self.dropped += 1
+                return None
+            key = (task_id, status)
+            if key in self._pending:
+                self.merged += 1
+                del self._pending[key]
+            self._pending[key] = message
+            self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every queued update has been sent, False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._pending and self._sending is None, timeout
+            )
+
+    def close(self, timeout=None):
+        """Send the queued updates and stop the worker thread"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                (task_id, status), message = self._pending.popitem(last=False)
+                self._sending = task_id
+            try:
+                self._send(task_id, status, message)
+            finally:
+                with self._condition:
+                    self._sending = None
+                    self._condition.notify_all()
+
+    def _send(self, task_id, status, message, raise_errors=False):
+        try:
+            response = client.update_task_id(
+                task_id=task_id, gman_url=self.gman_url, status=status, message=message
+            )
+        except Exception as e:
+            with self._condition:
+                self.errors += 1
+            if raise_errors:
+                raise
+            log.warning(f"Failed to update task {task_id} to {status}: {e}")
+            return None
+        with self._condition:
+            self.sent += 1
+        return response
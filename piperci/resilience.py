@@ -0,0 +1,320 @@
+"""
+Retries, circuit breaking and retry budgets shared by the GMan and storage
+clients.
+
+Every remote call runs through Resilience.call (or call_async) with the name
+of the endpoint it talks to. Calls to one endpoint share a circuit breaker,
+which fails fast once the endpoint keeps failing, and a retry budget, which
+caps retries to a fraction of recent requests so a struggling server is not
+buried under a retry storm.
+
+The caller classifies each outcome:
+
+    OK         not a failure of the endpoint: a response, including 4xx ones,
+               or a client side error. Not retried.
+    UNSENT     the request never reached the server, eg. connection refused.
+               Retried for any method.
+    TRANSIENT  the request may have been processed, eg. a 5xx or a timeout.
+               Retried only for idempotent methods.
+"""
+import asyncio
+import random
+import threading
+import time
+
+from collections import deque
+
+from piperci import tracing
+
+OK = "ok"
+UNSENT = "unsent"
+TRANSIENT = "transient"
+
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "PUT", "DELETE", "OPTIONS"])
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, endpoint, retry_in):
+        super().__init__(
+            f"Circuit open for {endpoint} after repeated failures, "
+            f"retrying in {retry_in:.1f}s"
+        )
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class RetryPolicy:
+    """
+    How often and how fast to retry a call
+    :param attempts: Maximum attempts including the first one as an integer
+    :param backoff: Base delay in seconds, doubled on every retry
+    :param max_backoff: Cap on the delay in seconds
+    :param idempotent_methods: HTTP methods safe to repeat after a TRANSIENT failure
+    """
+
+    def __init__(
+        self,
+        attempts=3,
+        backoff=0.1,
+        max_backoff=5.0,
+        idempotent_methods=IDEMPOTENT_METHODS,
+    ):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.idempotent_methods = idempotent_methods
+
+    def retryable(self, method, outcome):
+        if outcome == UNSENT:
+            return True
+        return outcome == TRANSIENT and method.upper() in self.idempotent_methods
+
+    def delay(self, attempt):
+        """Full jitter exponential backoff before retry number attempt"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures, rejecting calls until
+    reset_timeout seconds have passed. Then one probe call is let through, its
+    outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """Return 0 if a call may go ahead, else the seconds until the next probe"""
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                return remaining
+            # Restarting the timer lets another probe through should this one
+            # never report back
+            self._opened_at = time.monotonic()
+            self._probing = True
+            return 0
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class RetryBudget:
+    """
+    Allows retries up to ratio times the requests of the last window seconds,
+    plus min_retries per window so quiet clients can still retry
+    """
+
+    def __init__(self, ratio=0.2, min_retries=10, window=10):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        # [second, requests, retries] per second of the window
+        self._buckets = deque()
+        self._lock = threading.Lock()
+
+    def _bucket(self):
+        now = int(time.monotonic())
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+        if not self._buckets or self._buckets[-1][0] != now:
+            self._buckets.append([now, 0, 0])
+        return self._buckets[-1]
+
+    def record_request(self):
+        with self._lock:
+            self._bucket()[1] += 1
+
+    def try_retry(self):
+        """Withdraw one retry from the budget, False if it is spent"""
+        with self._lock:
+            bucket = self._bucket()
+            requests = sum(b[1] for b in self._buckets)
+            retries = sum(b[2] for b in self._buckets)
+            if retries >= self.min_retries + self.ratio * requests:
+                return False
+            bucket[2] += 1
+            return True
+
+
+class _Attempts:
+    """The retry state of one call, shared by Resilience.call and call_async"""
+
+    def __init__(self, resilience, endpoint, method, policy):
+        self.breaker, self.budget = resilience.endpoint(endpoint)
+        self.endpoint = endpoint
+        self.method = method
+        self.policy = policy or resilience.policy
+        self.attempt = 0
+        self.budget.record_request()
+
+    def start(self):
+        retry_in = self.breaker.allow()
+        if retry_in:
+            raise CircuitOpenError(self.endpoint, retry_in)
+        self.attempt += 1
+
+    def finish(self, outcome):
+        """Record an outcome, return the delay before retrying or None to stop"""
+        if outcome == OK:
+            self.breaker.record_success()
+            return None
+        self.breaker.record_failure()
+        if (
+            self.attempt >= self.policy.attempts
+            or not self.policy.retryable(self.method, outcome)
+            or not self.budget.try_retry()
+        ):
+            return None
+        delay = self.policy.delay(self.attempt)
+        span = tracing.current_span()
+        span.add_event(
+            "retry",
+            {
+                "retry.endpoint": self.endpoint,
+                "retry.attempt": self.attempt,
+                "retry.outcome": outcome,
+                "retry.delay": delay,
+            },
+        )
+        span.set_attribute("retry.attempts", self.attempt + 1)
+        return delay
+
+
+class Resilience:
+    """
+    Per endpoint circuit breakers and retry budgets, plus the default
+    RetryPolicy. Use the process wide instance from default_resilience.
+    """
+
+    def __init__(
+        self,
+        policy=None,
+        failure_threshold=5,
+        reset_timeout=30.0,
+        budget_ratio=0.2,
+        min_retries=10,
+    ):
+        self.policy = policy or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.budget_ratio = budget_ratio
+        self.min_retries = min_retries
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def endpoint(self, name):
+        """Return the (CircuitBreaker, RetryBudget) of an endpoint"""
+        with self._lock:
+            if name not in self._endpoints:
+                self._endpoints[name] = (
+                    CircuitBreaker(self.failure_threshold, self.reset_timeout),
+                    RetryBudget(self.budget_ratio, self.min_retries),
+                )
+            return self._endpoints[name]
+
+    def call(self, endpoint, fn, method="GET", classify=None, policy=None, discard=None):
+        """
+        Call fn() with retries
+        :param endpoint: Name of the remote endpoint, eg. scheme://host:port
+        :param fn: Callable making the request
+        :param method: HTTP method of the request, decides if it is idempotent
+        :param classify: classify(result, error) returning OK, UNSENT or TRANSIENT.
+        By default every exception is TRANSIENT and every result OK
+        :param policy: RetryPolicy overriding the default one
+        :param discard: Called with a result that is dropped to retry, eg. to
+        release its connection
+        :return: The result of the last attempt, its exception is raised instead
+        if it failed with one. Raises CircuitOpenError without calling fn if the
+        endpoint's circuit is open.
+        """
+        classify = classify or _classify
+        attempts = _Attempts(self, endpoint, method, policy)
+        while True:
+            attempts.start()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = attempts.finish(classify(None, e))
+                if delay is None:
+                    raise
+            else:
+                delay = attempts.finish(classify(result, None))
+                if delay is None:
+                    return result
+                if discard is not None:
+                    discard(result)
+            time.sleep(delay)
+
+    async def call_async(
+        self, endpoint, fn, method="GET", classify=None, policy=None, discard=None
+    ):
+        """Like call, for a coroutine function fn and an async discard"""
+        classify = classify or _classify
+        attempts = _Attempts(self, endpoint, method, policy)
+        while True:
+            attempts.start()
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = attempts.finish(classify(None, e))
+                if delay is None:
+                    raise
+            else:
+                delay = attempts.finish(classify(result, None))
+                if delay is None:
+                    return result
+                if discard is not None:
+                    await discard(result)
+            await asyncio.sleep(delay)
+
+
+def _classify(result, error):
+    return OK if error is None else TRANSIENT
+
+
+_default = Resilience()
+_default_lock = threading.Lock()
+
+
+def default_resilience():
+    """The process wide Resilience shared by the GMan and storage clients"""
+    return _default
+
+
+def set_default_resilience(resilience=None):
+    """
+    Replace the process wide Resilience, dropping all breaker and budget state.
+    Called without arguments it restores the defaults.
+    """
+    global _default
+    with _default_lock:
+        _default = resilience or Resilience()
+    return _default
@@ -1,17 +1,264 @@
+"""
+SubResource Integrity helpers. hashlib, subresource_integrity and
+piperci.tracing are imported only by the functions that need them to keep
+sritool startup fast.
+
+Digests come from a registry of backends. The SRI standard algorithms, sha256,
+sha384 and sha512, are the default and the only ones browsers accept. Faster
+backends (BLAKE2, and BLAKE3 or xxHash when installed) are meant for internal
+values such as cache keys, their results are DigestHash objects formatted the
+same way: algorithm-b64digest.
+"""
 import base64
-import hashlib
 import os
-import subresource_integrity as integrity
+import re
+import time
+
+STREAM_BUFFER_SIZE = 1024 * 1024
+SRI_ALGORITHMS = ('sha256', 'sha384', 'sha512')
+
+_BACKENDS = {}
+
+
+def register_backend(name, new, sri=False):
+    """Register a digest backend
+
+    :param name: algorithm name, used as dgst and as the SRI prefix
+    :param new: callable returning a hashlib style object with update() and
+        digest(), it may raise ImportError when an optional package is missing
+    :param sri: True only for SRI standard algorithms
+    """
+    _BACKENDS[name] = (new, sri)
+
+
+def _hashlib_backend(name):
+    def new():
+        import hashlib
+
+        return hashlib.new(name)
+    return new
+
+
+def _blake3():
+    import blake3
+
+    return blake3.blake3()
+
+
+def _xxhash_backend(name):
+    def new():
+        import xxhash
+
+        return getattr(xxhash, name)()
+    return new
+
+
+for _name in SRI_ALGORITHMS:
+    register_backend(_name, _hashlib_backend(_name), sri=True)
+for _name in ('blake2b', 'blake2s'):
+    register_backend(_name, _hashlib_backend(_name))
+register_backend('blake3', _blake3)
+for _name in ('xxh3_128', 'xxh3_64', 'xxh64'):
+    register_backend(_name, _xxhash_backend(_name))
+
+
+def new_hasher(dgst):
+    """Return a new hasher for dgst from the backend registry
+
+    Only registered backends are accepted, so every SRI generated here can be
+    parsed back by sri_to_hash and verified.
+    """
+    try:
+        new = _BACKENDS[dgst][0]
+    except KeyError:
+        raise ValueError(f'Unsupported digest algorithm {dgst!r}, '
+                         f'expected one of {", ".join(_BACKENDS)}')
+    return new()
+
+
+def digest_backends():
+    """Return {name: is SRI standard} for every registered backend that is installed"""
+    available = {}
+    for name, (new, sri) in _BACKENDS.items():
+        try:
+            new()
+        except ImportError:
+            continue
+        available[name] = sri
+    return available
+
+
+def digest_algorithms():
+    """All dgst names new_hasher accepts and sri_to_hash parses, installed backends"""
+    return set(digest_backends())
+
+
+def benchmark_backends(size=8 * 1024 * 1024, rounds=3):
+    """Measure the throughput of every installed backend
+
+    :param size: bytes hashed per round
+    :param rounds: rounds per backend, the fastest one is reported
+    :return: {name: MB/s}
+    """
+    data = os.urandom(size)
+    results = {}
+    for name in digest_backends():
+        best = None
+        for _ in range(rounds):
+            started = time.perf_counter()
+            hasher = new_hasher(name)
+            hasher.update(data)
+            hasher.digest()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = size / best / 1e6 if best else float('inf')
+    return results
+
+
+class DigestHash(object):
+    """
+    A digest from a non SRI backend, with the same interface and string form
+    as subresource_integrity.Hash: algorithm-b64digest
+    """
+
+    def __init__(self, algorithm, digest, options=''):
+        if not isinstance(digest, bytes):
+            raise TypeError('Digest must be a binary string')
+        self._algorithm = algorithm
+        self._digest = digest
+        self._options = options
+
+    # Read only, as on subresource_integrity.Hash
+    @property
+    def algorithm(self):
+        return self._algorithm
+
+    @property
+    def digest(self):
+        return self._digest
+
+    @property
+    def options(self):
+        return self._options
+
+    @property
+    def b64digest(self):
+        return base64.standard_b64encode(self.digest).decode('ascii')
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.algorithm!r}, {self.b64digest!r})'
+
+    def __str__(self):
+        if not self.options:
+            return f'{self.algorithm}-{self.b64digest}'
+        return f'{self.algorithm}-{self.b64digest}?{self.options}'
+
+    def __eq__(self, other):
+        return (isinstance(other, DigestHash)
+                and (self.algorithm, self.digest, self.options)
+                == (other.algorithm, other.digest, other.options))
+
+    def __hash__(self):
+        return hash((self.algorithm, self.digest, self.options))
+
+
+class SRIResult(DigestHash):
+    """
+    The result of generate_sri. Holds the raw digest, its base64, SRI string
+    and url safe forms are only built when first used, then cached.
+
+    For the SRI algorithms it is also a subresource_integrity.Hash, as
+    generate_sri returned before, so it compares equal to a Hash with the same
+    algorithm, digest and options from either side. Like Hash it never equals
+    a string, compare str(result) to compare SRI strings.
+    """
+
+    def __new__(cls, algorithm, digest, options=''):
+        if cls is SRIResult and algorithm in SRI_ALGORITHMS:
+            cls = _sri_hash_result()
+        # object.__new__ skips Hash.__new__, the digest comes from a backend
+        return object.__new__(cls)
+
+    def __init__(self, algorithm, digest, options=''):
+        super().__init__(algorithm, digest, options)
+        self._b64digest = None
+        self._sri = None
+        self._urlsafe = None
+
+    @property
+    def b64digest(self):
+        if self._b64digest is None:
+            self._b64digest = base64.standard_b64encode(self.digest).decode('ascii')
+        return self._b64digest
+
+    def __str__(self):
+        if self._sri is None:
+            self._sri = super().__str__()
+        return self._sri
+
+    @property
+    def urlsafe(self):
+        """The SRI string encoded with urlsafe base64, as hash_to_urlsafeb64"""
+        if self._urlsafe is None:
+            self._urlsafe = base64.urlsafe_b64encode(
+                str(self).encode('ascii')).decode('utf-8')
+        return self._urlsafe
+
+    def to_hash(self):
+        """A subresource_integrity.Hash, or a DigestHash for non SRI algorithms"""
+        return hash_to_sri_hash(self.algorithm, self.digest)
+
+    def __eq__(self, other):
+        try:
+            return (self.algorithm, self.digest, self.options) == (
+                other.algorithm, other.digest, other.options)
+        except AttributeError:
+            return NotImplemented
+
+    __hash__ = DigestHash.__hash__
+
+    def __reduce__(self):
+        return SRIResult, (self.algorithm, self.digest, self.options)
+
+
+_SRIHashResult = None
+
+
+def _sri_hash_result():
+    """The SRIResult subclass of subresource_integrity.Hash, created on first use"""
+    global _SRIHashResult
+    if _SRIHashResult is None:
+        import subresource_integrity as integrity
+
+        class SRIHashResult(SRIResult, integrity.Hash):
+            pass
+
+        _SRIHashResult = SRIHashResult
+    return _SRIHashResult
+
+
+def _sri_pattern():
+    names = '|'.join(re.escape(name) for name in _BACKENDS)
+    return re.compile(rf'^\s*({names})-[A-Za-z0-9+/]+={{0,2}}(\?\S*)?\s*$')
 
 
 def hash_to_urlsafeb64(hash):
-    assert isinstance(hash, integrity.Hash), 'to_urlsafe encodes a Hash to urlsafe b64'
+    import subresource_integrity as integrity
+
+    assert isinstance(hash, (integrity.Hash, DigestHash)), (
+        'to_urlsafe encodes a Hash to urlsafe b64')
+    if isinstance(hash, SRIResult):
+        return hash.urlsafe
     return base64.urlsafe_b64encode(str(hash).encode('ascii')).decode('utf-8')
 
 
+def sri_to_urlsafe(value):
+    """Encode an SRI string to urlsafe base64 without parsing it"""
+    return base64.urlsafe_b64encode(str(value).encode('ascii')).decode('utf-8')
+
+
 def urlsafe_to_hash(value):
     """Convert a urlsafe_b64encode'd string to and integrity.Hash object"""
-
     assert isinstance(value, str) or isinstance(value, bytes), (
         'decodes urlsafe "string" or "bytes" b64 to a Hash')
 
@@ -19,26 +266,67 @@ def urlsafe_to_hash(value):
         value = value.encode('ascii')
 
     value = base64.urlsafe_b64decode(value).decode('utf-8')
-    return integrity.parse(value)[0]
+    return sri_to_hash(value)
+
+
+def urlsafe_to_sri(value):
+    """Decode a urlsafe_b64encode'd SRI to its SRI string without parsing it.
+
+    Only the format is checked, so neither hashlib nor subresource_integrity
+    are imported.
+    """
+    if isinstance(value, str):
+        value = value.encode('ascii')
+
+    sri = base64.urlsafe_b64decode(value).decode('utf-8')
+    if not _sri_pattern().match(sri):
+        raise ValueError(f'Not a valid integrity value: {sri!r}')
+    return sri.strip()
 
 
 def sri_to_hash(value):
     """Convert an SRI encoded string to integrity.Hash."""
-    return integrity.parse(value)[0]
+    hashes = sri_to_hashes(value)
+    if not hashes:
+        raise ValueError(f'Not a valid integrity value: {value!r}')
+    return hashes[0]
+
+
+def sri_to_hashes(value):
+    """Convert an SRI encoded string of one or more hashes to integrity.Hash list.
+
+    SRI standard hashes come first, strongest first, followed by DigestHash
+    objects for the hashes of other registered backends.
+    """
+    import subresource_integrity as integrity
+
+    hashes = integrity.parse(value)
+    pattern = _sri_pattern()
+    for token in value.split():
+        match = pattern.match(token)
+        if match and match.group(1) not in SRI_ALGORITHMS:
+            algorithm, _, rest = token.partition('-')
+            b64digest, _, options = rest.partition('?')
+            hashes.append(DigestHash(algorithm, base64.b64decode(b64digest), options))
+    return hashes
 
 
 def hash_to_sri_hash(dgst, value):
-    """Coverts a b64 encoded binary hash string to subresource_integrity.Hash"""
+    """Coverts a b64 encoded binary hash string to subresource_integrity.Hash,
+    or a DigestHash for algorithms outside the SRI standard"""
+    import subresource_integrity as integrity
 
-    if isinstance(value, bytes):
+    if isinstance(value, bytes) and dgst in SRI_ALGORITHMS:
         return integrity.Hash(dgst, value)
+    elif isinstance(value, bytes):
+        return DigestHash(dgst, value)
     else:
         raise ValueError('hash value is not a bytes or str can\'t encode')
 
 
 def hash_file(dgst, path):
     """Generate a dgst hash from file path"""
-    h = hashlib.new(dgst)
+    h = new_hasher(dgst)
 
     with open(path, 'rb') as file:
         for chunk in iter(lambda: file.read(4096), b""):
@@ -46,6 +334,31 @@ def hash_file(dgst, path):
     return h.digest()
 
 
+def hash_stream(dgst, stream, tee=None, chunk_size=STREAM_BUFFER_SIZE):
+    """Generate a dgst hash from a binary stream, optionally copying it to tee
+
+    Reads into one reused buffer of chunk_size bytes, so large streams are
+    hashed with bounded memory and no per chunk allocations.
+    """
+    h = new_hasher(dgst)
+    if not hasattr(stream, 'readinto'):
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            h.update(chunk)
+            if tee is not None:
+                tee.write(chunk)
+        return h.digest()
+
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    size = stream.readinto(buffer)
+    while size:
+        h.update(view[:size])
+        if tee is not None:
+            tee.write(view[:size])
+        size = stream.readinto(buffer)
+    return h.digest()
+
+
 def b64_hash(bhash):
     """Converts a bhash to b64encoded hash for manual sri generation"""
     assert isinstance(bhash, bytes)
@@ -53,8 +366,27 @@ def b64_hash(bhash):
 
 
 def generate_sri(path, dgst='sha256', url_safe=False):
-    """Generate an SRI from a file path"""
+    """Generate an SRI from a file path
+
+    dgst may name any registered backend, see digest_backends. Keep the sha256
+    default for values handed to browsers or other SRI consumers.
+    """
+    from piperci import tracing
+
     path = os.path.realpath(path)
-    bhash = hash_file(dgst, path)
-    hash = hash_to_sri_hash(dgst, bhash)
-    return hash_to_urlsafeb64(hash) if url_safe else hash
+    with tracing.span('sri.generate_sri', {'sri.algorithm': dgst}) as span:
+        bhash = hash_file(dgst, path)
+        if span.is_recording():
+            span.set_attribute('sri.bytes', os.path.getsize(path))
+    result = SRIResult(dgst, bhash)
+    return result.urlsafe if url_safe else result
+
+
+def generate_sri_stream(stream, dgst='sha256', url_safe=False, tee=None):
+    """Generate an SRI from a binary stream, see hash_stream"""
+    from piperci import tracing
+
+    with tracing.span('sri.generate_sri_stream', {'sri.algorithm': dgst}):
+        bhash = hash_stream(dgst, stream, tee=tee)
+    result = SRIResult(dgst, bhash)
+    return result.urlsafe if url_safe else result
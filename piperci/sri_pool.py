@@ -0,0 +1,160 @@
+"""
+Process pool hashing for trees of many small files.
+
+Hashing tiny files one at a time is dominated by per file Python overhead, and
+threads contend for the GIL. DigestPool sends batches of paths to worker
+processes, which return the raw digests packed into one bytes object per batch
+along with arrays of sizes and timings. SRI strings are only built in the
+parent, and only for the digests that are asked for.
+
+    with DigestPool() as pool:
+        for batch in pool.hash_files(paths):
+            for index, path in enumerate(batch.paths):
+                print(batch.sri(index), path)
+"""
+import os
+import time
+
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import piperci.sri as sritool
+
+DEFAULT_BATCH_SIZE = 256
+_READ_SIZE = 256 * 1024
+
+
+def _hash_batch(dgst, paths):
+    """Worker: hash every path, returning packed digests, sizes, timings and errors"""
+    digest_size = sritool.new_hasher(dgst).digest_size
+    digests = bytearray()
+    sizes = array('Q')
+    seconds = array('d')
+    errors = {}
+    buffer = bytearray(_READ_SIZE)
+    view = memoryview(buffer)
+
+    for index, path in enumerate(paths):
+        started = time.perf_counter()
+        hasher = sritool.new_hasher(dgst)
+        size = 0
+        try:
+            with open(path, 'rb', buffering=0) as file:
+                read = file.readinto(buffer)
+                while read:
+                    hasher.update(view[:read])
+                    size += read
+                    read = file.readinto(buffer)
+            digests += hasher.digest()
+        except OSError as e:
+            errors[index] = f'{type(e).__name__}: {e}'
+            digests += bytes(digest_size)
+        sizes.append(size)
+        seconds.append(time.perf_counter() - started)
+    return bytes(digests), sizes, seconds, errors
+
+
+class DigestBatch:
+    """
+    The digests of one batch of paths. digests holds digest_size bytes per path,
+    paths that failed to hash are listed in errors by index.
+    """
+
+    __slots__ = ('dgst', 'paths', 'digests', 'sizes', 'seconds', 'errors',
+                 'digest_size')
+
+    def __init__(self, dgst, paths, digests, sizes, seconds, errors):
+        self.dgst = dgst
+        self.paths = paths
+        self.digests = digests
+        self.sizes = sizes
+        self.seconds = seconds
+        self.errors = errors
+        self.digest_size = len(digests) // len(paths) if paths else 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def digest(self, index):
+        """The raw digest of paths[index], None if it could not be hashed"""
+        if index in self.errors:
+            return None
+        start = index * self.digest_size
+        return self.digests[start:start + self.digest_size]
+
+    def sri(self, index, url_safe=False):
+        """The SRI of paths[index] as generate_sri returns it, None on error"""
+        digest = self.digest(index)
+        if digest is None:
+            return None
+        result = sritool.SRIResult(self.dgst, digest)
+        return result.urlsafe if url_safe else result
+
+
+def _batches(paths, size):
+    batch = []
+    for path in paths:
+        batch.append(path)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class DigestPool:
+    """
+    A pool of hashing worker processes, reusable across hash_files calls
+    :param workers: Number of worker processes, defaults to the CPU count
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+        # Submitted batches, cancelled on close if they haven't started
+        self._futures = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            # shutdown(cancel_futures=True) needs Python 3.9
+            for future in list(self._futures):
+                future.cancel()
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def hash_files(self, paths, dgst='sha256', batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Hash the files at paths, yielding a DigestBatch per batch_size paths in
+        the order of paths. paths may be a lazy iterable, at most two batches
+        per worker are in flight.
+        :param dgst: Digest algorithm, see piperci.sri.digest_backends
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        pending = deque()
+        for batch in _batches(paths, batch_size):
+            future = self._executor.submit(_hash_batch, dgst, batch)
+            self._futures.add(future)
+            future.add_done_callback(self._futures.discard)
+            pending.append((batch, future))
+            if len(pending) >= 2 * self.workers:
+                yield self._result(dgst, *pending.popleft())
+        while pending:
+            yield self._result(dgst, *pending.popleft())
+
+    @staticmethod
+    def _result(dgst, batch, future):
+        return DigestBatch(dgst, batch, *future.result())
+
+
+def hash_files(paths, dgst='sha256', workers=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Hash the files at paths with a temporary DigestPool, see DigestPool.hash_files"""
+    with DigestPool(workers) as pool:
+        yield from pool.hash_files(paths, dgst=dgst, batch_size=batch_size)
@@ -0,0 +1,203 @@
+"""
+Long running SRI hashing server and its client.
+
+The server answers newline delimited JSON requests over a Unix socket, one
+response line per request line, handling each connection on its own thread.
+Digests are cached by path and file stat so unchanged files are not re-read.
+
+    {"op": "generate", "path": "/abs/file", "dgst": "sha256"}
+    {"op": "verify", "path": "/abs/file", "sri": "sha256-...", "url_safe": false}
+"""
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+
+from collections import OrderedDict
+
+import piperci.sri as sritool
+
+
+class SRIServerError(Exception):
+    pass
+
+
+class DigestCache:
+    """
+    Thread safe LRU cache of file digests. Entries are keyed by path and digest
+    algorithm and invalidated when the file's inode, size, mtime or ctime change.
+    The ctime catches rewrites within one mtime tick and restored mtimes.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def digest(self, dgst, path):
+        # stat before hashing, a change while hashing shows up on the next lookup
+        st = os.stat(path)
+        stamp = (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+        key = (path, dgst)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        digest = sritool.hash_file(dgst, path)
+        with self._lock:
+            self._entries[key] = (stamp, digest)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return digest
+
+
+class SRIRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.dispatch(line)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+class SRIServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, cache=None):
+        self.socket_path = socket_path
+        self.cache = cache or DigestCache()
+        _remove_stale_socket(socket_path)
+        super().__init__(socket_path, SRIRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def dispatch(self, line):
+        request = {}
+        try:
+            request = json.loads(line)
+            op = getattr(self, f'op_{request.get("op")}', None)
+            if op is None:
+                raise ValueError(f'Unknown op {request.get("op")!r}')
+            response = op(request)
+            response['ok'] = True
+        except Exception as e:
+            response = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+        if 'id' in request:
+            response['id'] = request['id']
+        return response
+
+    def _sri(self, dgst, path):
+        result = sritool.SRIResult(dgst, self.cache.digest(dgst, path))
+        return {'sri': str(result), 'urlsafe': result.urlsafe}
+
+    def op_ping(self, request):
+        return {'hits': self.cache.hits, 'misses': self.cache.misses}
+
+    def op_generate(self, request):
+        path = os.path.realpath(request['path'])
+        return self._sri(request.get('dgst', 'sha256'), path)
+
+    def op_verify(self, request):
+        if request.get('url_safe'):
+            claimed = sritool.urlsafe_to_hash(request['sri'])
+        else:
+            claimed = sritool.sri_to_hash(request['sri'])
+        response = self._sri(claimed.algorithm, os.path.realpath(request['path']))
+        response['match'] = response['sri'] == str(claimed)
+        return response
+
+
+def _remove_stale_socket(socket_path):
+    """Remove a socket file left behind by a server that is no longer running"""
+    if not os.path.exists(socket_path):
+        return
+    if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+        raise SRIServerError(f'{socket_path} exists and is not a socket')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(socket_path)
+            return
+    raise SRIServerError(f'An sritool server is already listening on {socket_path}')
+
+
+def serve(socket_path, cache_size=100000):
+    """Serve SRI requests on socket_path until interrupted"""
+    with SRIServer(socket_path, DigestCache(cache_size)) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+class SRIClient:
+    """
+    Client for an sritool server. Keeps one connection open, requests from
+    several threads are serialized over it.
+
+        with SRIClient('/tmp/sritool.sock') as client:
+            client.generate('README.md')
+    """
+
+    def __init__(self, socket_path, timeout=None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def connect(self):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(self.timeout)
+        self._sock.connect(self.socket_path)
+        self._file = self._sock.makefile('rwb')
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = self._file = None
+
+    def request(self, **request):
+        """Send one request and return the response, raising SRIServerError on failure"""
+        with self._lock:
+            if self._sock is None:
+                self.connect()
+            self._file.write(json.dumps(request).encode('utf-8') + b'\n')
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            self.close()
+            raise SRIServerError(f'Connection to {self.socket_path} closed')
+        response = json.loads(line)
+        if not response.pop('ok'):
+            raise SRIServerError(response['error'])
+        return response
+
+    def generate(self, path, dgst='sha256', url_safe=False):
+        response = self.request(op='generate', path=os.path.abspath(path), dgst=dgst)
+        return response['urlsafe'] if url_safe else response['sri']
+
+    def verify(self, path, sri, url_safe=False):
+        """Return the verify response: match as a bool, the real sri and urlsafe"""
+        return self.request(op='verify', path=os.path.abspath(path), sri=sri,
+                            url_safe=url_safe)
@@ -0,0 +1,621 @@
+"""
+Native asyncio storage client speaking the S3 API through aiohttp.
+
+Requests are signed with minio's SigV4 signer and share one aiohttp connection
+pool per client. The number of requests in flight is bounded by
+max_concurrency, including the parts of a multipart upload. Like MinioClient,
+every request goes through piperci.resilience, and uploads may be compressed
+with the codecs of piperci.storeman.compression.
+
+    async with storage_client("minio", async_=True, hostname=...) as storecli:
+        await storecli.upload_file("bucket", "object", "/path/to/file")
+"""
+import asyncio
+import os
+
+from contextlib import asynccontextmanager
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from xml.etree import ElementTree
+
+import aiohttp
+from yarl import URL
+
+from minio.credentials import Credentials, Static
+from minio.definitions import UploadPart
+from minio.fold_case_dict import FoldCaseDict
+from minio.helpers import (
+    DEFAULT_PART_SIZE,
+    MAX_POOL_SIZE,
+    get_target_url,
+    queryencode,
+)
+from minio.parsers import parse_list_objects_v2, parse_new_multipart_upload
+from minio.signer import sign_v4
+from minio.xml_marshal import xml_marshal_complete_multipart_upload
+
+from piperci.resilience import (
+    OK,
+    RETRY_STATUSES,
+    TRANSIENT,
+    UNSENT,
+    RetryPolicy,
+    default_resilience,
+)
+from piperci.storeman.client import ObjectRecord
+from piperci.storeman.compression import (
+    CODEC_METADATA,
+    compressor,
+    decompressor,
+    object_codec,
+    upload_codec,
+)
+from piperci.storeman.exceptions import IntegrityError, StorageError
+from piperci.storeman.integrity import DownloadVerifier
+from piperci.storeman.minio_client import (
+    MAX_COPY_SIZE,
+    SRI_METADATA,
+    _S3_NS,
+    _check_length,
+    _parse_uri,
+    copy_ranges,
+    staging_name,
+)
+from piperci.storeman.streams import IterReader, SRIHasher, read_full
+
+_UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+_BUCKET_EXISTS = ("BucketAlreadyOwnedByYou", "BucketAlreadyExists")
+SRI_HEADER = f"X-Amz-Meta-{SRI_METADATA}"
+CODEC_HEADER = f"X-Amz-Meta-{CODEC_METADATA}"
+
+
+def _storage_error(status, data):
+    try:
+        fields = {
+            e.tag.rpartition("}")[2]: e.text for e in ElementTree.fromstring(data)
+        }
+        code = fields.get("Code")
+        message = fields.get("Message") or code
+    except ElementTree.ParseError:
+        code, message = None, data.decode("utf-8", "replace")
+    return StorageError(
+        f"Storage returned with a bad status code {status}. \n\n{message}",
+        status=status,
+        code=code,
+    )
+
+
+def _classify(response, error):
+    if isinstance(error, aiohttp.ClientConnectorError):
+        return UNSENT
+    if isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError)):
+        return TRANSIENT
+    if error is not None:
+        return OK
+    return TRANSIENT if response.status in RETRY_STATUSES else OK
+
+
+async def _release(response):
+    response.release()
+
+
+def _metadata_headers(sri, codec):
+    headers = {SRI_HEADER: sri}
+    if codec is not None:
+        headers[CODEC_HEADER] = codec
+    return headers
+
+
+def _record_from_headers(object_name, headers):
+    last_modified = headers.get("Last-Modified")
+    return ObjectRecord(
+        object_name,
+        int(headers.get("Content-Length", 0)),
+        headers.get("ETag", "").replace('"', ""),
+        parsedate_to_datetime(last_modified) if last_modified else None,
+        False,
+        headers.get(SRI_HEADER),
+    )
+
+
+class AsyncObjectReader:
+    """Streaming reader over an object download, see AsyncMinioClient.open_download"""
+
+    def __init__(self, response, chunk_size=1024 * 1024):
+        self._response = response
+        self.chunk_size = chunk_size
+        self.headers = response.headers
+
+    async def read(self, size=-1):
+        return await self._response.content.read(size)
+
+    async def iter_chunks(self, chunk_size=None):
+        """
+        Yield the object content as bytes chunks of at most chunk_size bytes
+        :param chunk_size: Maximum chunk size in bytes, defaults to self.chunk_size
+        """
+        while True:
+            chunk = await self._response.content.read(chunk_size or self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class AsyncDecompressingReader:
+    """
+    Decompresses an AsyncObjectReader over an object stored with codec, see
+    piperci.storeman.compression.DecompressingReader
+    """
+
+    def __init__(self, reader, codec):
+        self._reader = reader
+        self._decompressor = decompressor(codec)
+        self._buffer = b""
+        self._done = False
+        self.codec = codec
+        self.chunk_size = reader.chunk_size
+        self.headers = reader.headers
+
+    def _decompress(self, data):
+        if data:
+            return self._decompressor.decompress(data)
+        self._done = True
+        if not getattr(self._decompressor, "eof", True):
+            raise IntegrityError(f"{self.codec} stream ended before its end marker")
+        return b""
+
+    async def read(self, size=-1):
+        while not self._done and (size < 0 or len(self._buffer) < size):
+            self._buffer += self._decompress(await self._reader.read(self.chunk_size))
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    async def iter_chunks(self, chunk_size=None):
+        """
+        Yield the decompressed object content as bytes chunks, decompressing
+        chunk_size compressed bytes at a time
+        """
+        if self._buffer:
+            yield self._buffer
+            self._buffer = b""
+        if self._done:
+            return
+        async for chunk in self._reader.iter_chunks(chunk_size):
+            data = self._decompress(chunk)
+            if data:
+                yield data
+        self._decompress(b"")
+
+
+class _PartReader:
+    """
+    Reads fixed size parts from a file-like object, a (sync) iterable of bytes or
+    an async iterable of bytes, digesting them as they are read. With a codec the
+    parts are compressed, the digest is of the uncompressed data. Blocking
+    reads, digesting and compression run together in the default executor, so
+    the event loop only gathers the chunks of an async iterable.
+    """
+
+    def __init__(self, data, dgst="sha256", codec=None):
+        self._aiter = None
+        self._buffer = b""
+        self.hasher = SRIHasher(dgst)
+        if hasattr(data, "__aiter__"):
+            self._aiter = data.__aiter__()
+        elif not callable(getattr(data, "read", None)):
+            data = IterReader(data)
+        self._data = data
+        self._compressor = None if codec is None else compressor(codec)
+        self._output = b""
+        self._done = False
+
+    async def read(self, size):
+        loop = asyncio.get_running_loop()
+        if self._aiter is None:
+            return await loop.run_in_executor(None, self._read_part, size)
+        while self._wants(size):
+            data = await self._gather(size)
+            self._output += await loop.run_in_executor(None, self._digest, data)
+        return self._take(size)
+
+    def _read_part(self, size):
+        while self._wants(size):
+            self._output += self._digest(read_full(self._data, size))
+        return self._take(size)
+
+    async def _gather(self, size):
+        while len(self._buffer) < size:
+            try:
+                self._buffer += bytes(await self._aiter.__anext__())
+            except StopAsyncIteration:
+                break
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def _wants(self, size):
+        return len(self._output) < size and not self._done
+
+    def _digest(self, data):
+        """Digest data read from the source, returning it as it is uploaded"""
+        self.hasher.update(data)
+        if not data:
+            self._done = True
+        if self._compressor is None:
+            return data
+        return self._compressor.compress(data) if data else self._compressor.flush()
+
+    def _take(self, size):
+        part, self._output = self._output[:size], self._output[size:]
+        return part
+
+
+class AsyncMinioClient:
+    def __init__(self, *args, **kwargs):
+        hostname = kwargs.get("hostname")
+        scheme = "https" if kwargs.get("secure", False) else "http"
+        self.endpoint_url = f"{scheme}://{hostname}"
+        self.region = kwargs.get("region") or "us-east-1"
+        self.credentials = Credentials(
+            provider=Static(kwargs.get("access_key"), kwargs.get("secret_key"))
+        )
+        self.max_pool_size = kwargs.get("max_pool_size", MAX_POOL_SIZE)
+        self.max_concurrency = kwargs.get("max_concurrency", self.max_pool_size)
+        # The codec uploads are compressed with unless they name another one
+        self.compression = kwargs.get("compression")
+        if self.compression is not None:
+            # Fail now on an unknown codec or a codec package that's missing
+            compressor(self.compression)
+        self.timeout = kwargs.get("timeout")
+        retries = kwargs.get("retries")
+        self.retry_policy = None if retries is None else RetryPolicy(attempts=retries + 1)
+        self._session = None
+        self._limit = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        # Created lazily so the session and semaphore bind to the running loop
+        if self._session is None or self._session.closed:
+            if isinstance(self.timeout, tuple):
+                timeout = aiohttp.ClientTimeout(
+                    total=None, connect=self.timeout[0], sock_read=self.timeout[1]
+                )
+            else:
+                timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_pool_size),
+                timeout=timeout,
+            )
+            self._limit = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    @asynccontextmanager
+    async def _request(
+        self, method, bucket_name, object_name=None, query=None, headers=None, body=None
+    ):
+        session = self._get_session()
+        url = get_target_url(
+            self.endpoint_url,
+            bucket_name=bucket_name,
+            object_name=object_name,
+            bucket_region=self.region,
+            query=query,
+        )
+        signed_headers = sign_v4(
+            method,
+            url,
+            self.region,
+            FoldCaseDict(headers or {}),
+            self.credentials,
+            _UNSIGNED_PAYLOAD if body is not None else None,
+            datetime.utcnow(),
+        )
+        headers = dict(signed_headers)
+        async with self._limit:
+            response = await default_resilience().call_async(
+                self.endpoint_url,
+                lambda: session.request(
+                    method, URL(url, encoded=True), headers=headers, data=body
+                ),
+                method=method,
+                classify=_classify,
+                policy=self.retry_policy,
+                discard=_release,
+            )
+            try:
+                if response.status not in (200, 204, 206):
+                    raise _storage_error(response.status, await response.read())
+                yield response
+            finally:
+                response.release()
+
+    async def _call(self, method, bucket_name, object_name=None, **kwargs):
+        async with self._request(method, bucket_name, object_name, **kwargs) as r:
+            return r.headers, await r.read()
+
+    async def _ensure_bucket(self, bucket_name):
+        try:
+            await self._call("PUT", bucket_name)
+        except StorageError as e:
+            if e.code not in _BUCKET_EXISTS:
+                raise
+
+    async def iter_objects(
+        self, bucket_name, prefix=None, recursive=False, start_after=None
+    ):
+        """
+        Lazily list objects page by page, see BaseStorageClient.iter_objects
+        """
+        query = {
+            "list-type": "2",
+            "prefix": prefix or "",
+            "start-after": start_after or "",
+        }
+        if not recursive:
+            query["delimiter"] = "/"
+
+        is_truncated = True
+        while is_truncated:
+            _, data = await self._call("GET", bucket_name, query=query)
+            objects, is_truncated, token = parse_list_objects_v2(data, bucket_name)
+            query["continuation-token"] = token
+            for obj in objects:
+                yield ObjectRecord(
+                    obj.object_name, obj.size, obj.etag, obj.last_modified, obj.is_dir
+                )
+
+    async def stat_file(self, bucket_name, prefix=None, recursive=False):
+        return [
+            record
+            async for record in self.iter_objects(
+                bucket_name, prefix=prefix, recursive=recursive
+            )
+        ]
+
+    async def download_file(
+        self, uri, file_path, expected_sri=None, expected_size=None
+    ):
+        bucket_name, object_name = _parse_uri(uri)
+        verifier = DownloadVerifier(uri, expected_sri, expected_size)
+        loop = asyncio.get_running_loop()
+        part_path = f"{file_path}.part"
+
+        try:
+            async with self.open_download(uri) as reader:
+                # The stored size of a compressed object isn't its content's size
+                compressed = object_codec(reader.headers) is not None
+                if not compressed and "Content-Length" in reader.headers:
+                    verifier.check_size(int(reader.headers["Content-Length"]))
+                verifier.check_sri(reader.headers.get(SRI_HEADER))
+                with open(part_path, "wb") as part_file:
+
+                    def write(chunk):
+                        verifier.update(chunk)
+                        part_file.write(chunk)
+
+                    async for chunk in reader.iter_chunks():
+                        # Hashing blocks like the write, both run off the loop
+                        await loop.run_in_executor(None, write, chunk)
+            verifier.verify()
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        os.replace(part_path, file_path)
+        return _record_from_headers(object_name, reader.headers)
+
+    @asynccontextmanager
+    async def open_download(self, uri):
+        """
+        Open a streaming reader over the object at uri, decompressing objects
+        uploaded with a compression codec:
+
+            async with storecli.open_download(uri) as reader:
+                async for chunk in reader.iter_chunks():
+                    ...
+        """
+        bucket_name, object_name = _parse_uri(uri)
+        async with self._request("GET", bucket_name, object_name) as response:
+            reader = AsyncObjectReader(response)
+            codec = object_codec(response.headers)
+            yield reader if codec is None else AsyncDecompressingReader(reader, codec)
+
+    async def upload_file(
+        self,
+        bucket_name,
+        object_name,
+        file_path,
+        dgst="sha256",
+        part_size=DEFAULT_PART_SIZE,
+        compression=None,
+    ):
+        with open(file_path, "rb") as data:
+            return await self.upload_stream(
+                bucket_name,
+                object_name,
+                data,
+                length=os.path.getsize(file_path),
+                dgst=dgst,
+                part_size=part_size,
+                compression=compression,
+            )
+
+    async def upload_stream(
+        self,
+        bucket_name,
+        object_name,
+        data,
+        length=None,
+        dgst="sha256",
+        part_size=DEFAULT_PART_SIZE,
+        compression=None,
+    ):
+        """
+        Upload a file-like object, an iterable or an async iterable of bytes.
+        Parts of a multipart upload are sent concurrently, at most
+        max_concurrency parts are held in memory. The SRI of the data is computed
+        in the same pass and stored in the object metadata.
+        :param compression: Codec to store the object compressed with, None for
+        the client's default, False or "none" to store it uncompressed
+        :return: ObjectRecord of the uploaded object
+        """
+        codec = upload_codec(compression, self.compression)
+        reader = _PartReader(data, dgst, codec)
+        await self._ensure_bucket(bucket_name)
+        part_data = await reader.read(part_size)
+        # Compressed, a first part of length bytes needn't be the whole stream
+        if len(part_data) < part_size or (codec is None and len(part_data) == length):
+            _check_length(length, reader.hasher.size)
+            await self._call(
+                "PUT",
+                bucket_name,
+                object_name,
+                headers=_metadata_headers(reader.hasher.sri(), codec),
+                body=part_data,
+            )
+        else:
+            staging = staging_name(object_name)
+            await self._put_multipart(
+                bucket_name, staging, reader, part_data, part_size, length
+            )
+            await self._publish(
+                bucket_name,
+                staging,
+                object_name,
+                _metadata_headers(reader.hasher.sri(), codec),
+            )
+
+        headers, _ = await self._call("HEAD", bucket_name, object_name)
+        return _record_from_headers(object_name, headers)
+
+    async def _publish(self, bucket_name, staging, object_name, headers):
+        """
+        Copy the completed multipart upload staging to object_name with the
+        metadata headers and remove it, see MinioClient._publish
+        """
+        try:
+            stat, _ = await self._call("HEAD", bucket_name, staging)
+            headers = dict(headers)
+            headers["Content-Type"] = stat.get("Content-Type", "binary/octet-stream")
+            size = int(stat["Content-Length"])
+            source = queryencode(f"/{bucket_name}/{staging}")
+            if size <= MAX_COPY_SIZE:
+                headers["X-Amz-Copy-Source"] = source
+                headers["X-Amz-Metadata-Directive"] = "REPLACE"
+                await self._call("PUT", bucket_name, object_name, headers=headers)
+            else:
+                await self._copy_multipart(
+                    bucket_name, source, object_name, size, headers
+                )
+        finally:
+            await self._call("DELETE", bucket_name, staging)
+
+    async def _copy_multipart(self, bucket_name, source, object_name, size, headers):
+        """Server side copy of an object too large for CopyObject, UploadPartCopy"""
+        _, data = await self._call(
+            "POST", bucket_name, object_name, query={"uploads": ""}, headers=headers
+        )
+        upload_id = parse_new_multipart_upload(data)
+
+        async def _copy(number, start, end):
+            _, data = await self._call(
+                "PUT",
+                bucket_name,
+                object_name,
+                query={"partNumber": str(number), "uploadId": upload_id},
+                headers={
+                    "X-Amz-Copy-Source": source,
+                    "X-Amz-Copy-Source-Range": f"bytes={start}-{end}",
+                },
+            )
+            etag = ElementTree.fromstring(data).findtext(f"{{{_S3_NS}}}ETag")
+            return UploadPart(
+                bucket_name,
+                object_name,
+                upload_id,
+                number,
+                etag.strip('"'),
+                None,
+                end - start + 1,
+            )
+
+        try:
+            parts = await asyncio.gather(*(_copy(*r) for r in copy_ranges(size)))
+            await self._call(
+                "POST",
+                bucket_name,
+                object_name,
+                query={"uploadId": upload_id},
+                body=xml_marshal_complete_multipart_upload(parts),
+            )
+        except BaseException:
+            await self._call(
+                "DELETE", bucket_name, object_name, query={"uploadId": upload_id}
+            )
+            raise
+
+    async def _put_part(self, bucket_name, object_name, upload_id, number, data):
+        headers, _ = await self._call(
+            "PUT",
+            bucket_name,
+            object_name,
+            query={"partNumber": str(number), "uploadId": upload_id},
+            body=data,
+        )
+        etag = headers["ETag"].replace('"', "")
+        return UploadPart(
+            bucket_name, object_name, upload_id, number, etag, None, len(data)
+        )
+
+    async def _put_multipart(
+        self, bucket_name, object_name, reader, part_data, size, length
+    ):
+        _, data = await self._call(
+            "POST", bucket_name, object_name, query={"uploads": ""}
+        )
+        upload_id = parse_new_multipart_upload(data)
+        in_flight = asyncio.Semaphore(self.max_concurrency)
+        uploads = []
+
+        async def _upload(number, data):
+            try:
+                return await self._put_part(
+                    bucket_name, object_name, upload_id, number, data
+                )
+            finally:
+                in_flight.release()
+
+        try:
+            while part_data:
+                await in_flight.acquire()
+                uploads.append(
+                    asyncio.ensure_future(_upload(len(uploads) + 1, part_data))
+                )
+                part_data = await reader.read(size)
+            parts = await asyncio.gather(*uploads)
+            _check_length(length, reader.hasher.size)
+            await self._call(
+                "POST",
+                bucket_name,
+                object_name,
+                query={"uploadId": upload_id},
+                body=xml_marshal_complete_multipart_upload(parts),
+            )
+        except BaseException:
+            for upload in uploads:
+                upload.cancel()
+            await self._call(
+                "DELETE", bucket_name, object_name, query={"uploadId": upload_id}
+            )
+            raise
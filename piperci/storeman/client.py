@@ -1,8 +1,78 @@
+import queue
+import threading
+
 from abc import ABC, abstractmethod
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+ObjectRecord = namedtuple(
+    "ObjectRecord", ["name", "size", "etag", "last_modified", "is_dir", "sri"]
+)
+# Listings don't carry object metadata, so sri is only set on single object stats
+ObjectRecord.__new__.__defaults__ = (None,)
+ObjectRecord.__doc__ = "Compact listing entry yielded by BaseStorageClient.iter_objects"
+
+_SHARD_DONE = object()
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class _ShardedListing:
+    """
+    Fans listing of several shards out to a thread pool, funnelling the records
+    through a bounded queue so memory stays constant however large the listing.
+    """
 
+    def __init__(self, list_shard, max_queued):
+        self.list_shard = list_shard
+        self.records = queue.Queue(maxsize=max_queued)
+        self.stop = threading.Event()
 
-def storage_client(storage_type, **kwargs):
-    if storage_type == "minio":
+    def _put(self, item):
+        while not self.stop.is_set():
+            try:
+                self.records.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _worker(self, shard):
+        try:
+            for record in self.list_shard(shard):
+                if not self._put(record):
+                    return
+        except Exception as e:
+            self._put(e)
+        finally:
+            self._put(_SHARD_DONE)
+
+    def run(self, shards, workers):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for shard in shards:
+                executor.submit(self._worker, shard)
+            try:
+                remaining = len(shards)
+                while remaining:
+                    item = self.records.get()
+                    if item is _SHARD_DONE:
+                        remaining -= 1
+                    elif isinstance(item, Exception):
+                        raise item
+                    else:
+                        yield item
+            finally:
+                # Unblocks workers if the caller stops iterating early
+                self.stop.set()
+
+
+def _new_storage_client(storage_type, async_=False, **kwargs):
+    if storage_type == "minio" and async_:
+        from piperci.storeman.aio import AsyncMinioClient
+
+        return AsyncMinioClient(**kwargs)
+    elif storage_type == "minio":
         from piperci.storeman.minio_client import MinioClient
 
         return MinioClient(**kwargs)
@@ -10,6 +80,44 @@ def storage_client(storage_type, **kwargs):
         raise NotImplementedError("Only minio is supported at the moment.")
 
 
+def storage_client(storage_type, shared=None, **kwargs):
+    """
+    Return a storage client for storage_type. By default clients are shared:
+    calls with identical connection parameters return the same thread-safe
+    instance, so threads reuse its warm connection pool. Asyncio clients are
+    not shared by default, their session is bound to one event loop.
+    :param storage_type: The storage backend, only "minio" is supported
+    :param shared: Set to False to always construct a new, private client, or
+    to True to share an asyncio client used from a single event loop
+    :param kwargs: Connection parameters passed to the backend client. Pass
+    async_=True for an asyncio client (piperci.storeman.aio)
+    :return: BaseStorageClient or AsyncMinioClient
+    """
+    if shared is None:
+        shared = not kwargs.get("async_")
+    if not shared:
+        return _new_storage_client(storage_type, **kwargs)
+
+    try:
+        key = (storage_type, tuple(sorted(kwargs.items())))
+        hash(key)
+    except TypeError:
+        # Unhashable parameters (eg. a custom http_client) can't be shared
+        return _new_storage_client(storage_type, **kwargs)
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = _new_storage_client(storage_type, **kwargs)
+        return client
+
+
+def clear_storage_clients():
+    """Drop all shared clients, the next storage_client call creates new ones"""
+    with _clients_lock:
+        _clients.clear()
+
+
 class BaseStorageClient(ABC):
     @abstractmethod
     def stat_file(self, bucket_name, prefix=None, recursive=False):
@@ -22,21 +130,119 @@ class BaseStorageClient(ABC):
         """
 
     @abstractmethod
-    def download_file():
+    def iter_objects(self, bucket_name, prefix=None, recursive=False, start_after=None):
+        """
+        Lazily list objects page by page, yielding ObjectRecord tuples in key order.
+        Only one page of results is held in memory at a time.
+        :param bucket_name:
+        :param prefix:
+        :param recursive:
+        :param start_after: Resume the listing after this object name
+        :return: Iterator of ObjectRecord
+        """
+
+    def iter_objects_sharded(self, bucket_name, prefix=None, workers=8, max_queued=1000):
+        """
+        Recursively list objects under prefix, listing each of its immediate
+        "sub directories" in parallel. Records are yielded as they arrive, so
+        ordering is only guaranteed within a shard. At most max_queued records
+        are buffered regardless of bucket size.
+        :param bucket_name:
+        :param prefix:
+        :param workers: Number of shards listed concurrently
+        :param max_queued: Maximum number of records buffered between the
+        listing threads and the caller
+        :return: Iterator of ObjectRecord
+        """
+        shards = []
+        for record in self.iter_objects(bucket_name, prefix=prefix):
+            if record.is_dir:
+                shards.append(record.name)
+            else:
+                yield record
+
+        if not shards:
+            return
+
+        listing = _ShardedListing(
+            lambda shard: self.iter_objects(bucket_name, prefix=shard, recursive=True),
+            max_queued,
+        )
+        yield from listing.run(shards, workers)
+
+    @abstractmethod
+    def object_uri(self, bucket_name, object_name):
         """
-        Downloads a file to a given location.
+        The URI download_file and open_download accept for an object
         :param bucket_name:
         :param object_name:
+        :return: URI as a string
+        """
+
+    @abstractmethod
+    def download_file(self, uri, file_path, expected_sri=None, expected_size=None):
+        """
+        Downloads a file to a given location, decompressing objects uploaded
+        with a compression codec.
+        When expected_sri or expected_size is given the object is verified while
+        it is written: a wrong size aborts before or during the transfer and
+        any mismatch removes the partial file and raises IntegrityError.
+        Both refer to the uncompressed content.
+        :param uri:
         :param file_path:
+        :param expected_sri: SRI string or subresource_integrity.Hash
+        :param expected_size: Size in bytes as an integer
         :return:
         """
 
     @abstractmethod
-    def upload_file(self, bucket_name, object_name, file_path):
+    def upload_file(
+        self, bucket_name, object_name, file_path, dgst="sha256", compression=None
+    ):
         """
-        Uploads a file to a given bucket with a given object_name
+        Uploads a file to a given bucket with a given object_name. The file's SRI
+        is computed while it is read for upload and stored in the object metadata.
         :param bucket_name:
         :param object_name:
         :param file_path:
-        :return:
+        :param dgst: Digest algorithm, or a list of them for a multi-hash SRI
+        :param compression: Codec to store the object compressed with, "gzip"
+        or "zstd", see piperci.storeman.compression. The SRI is still computed
+        over the uncompressed content. None uses the client's default codec,
+        False or "none" stores the object uncompressed.
+        :return: The object stat, with the SRI as its sri attribute
+        """
+
+    @abstractmethod
+    def upload_stream(
+        self,
+        bucket_name,
+        object_name,
+        data,
+        length=None,
+        dgst="sha256",
+        compression=None,
+    ):
+        """
+        Uploads the contents of a stream to a given bucket with a given object_name
+        without staging it on disk. Memory use is bounded by the part size. The
+        SRI is computed and stored as for upload_file.
+        :param bucket_name:
+        :param object_name:
+        :param data: A file-like object with a read() method or an iterable of
+        bytes chunks (eg. a generator)
+        :param length: The total size in bytes if known, None otherwise
+        :param dgst: Digest algorithm, or a list of them for a multi-hash SRI
+        :param compression: Codec to store the object compressed with
+        :return: The object stat, with the SRI as its sri attribute
+        """
+
+    @abstractmethod
+    def open_download(self, uri):
+        """
+        Opens a streaming reader over the object at uri, decompressing objects
+        uploaded with a compression codec. The reader must be closed (or used
+        as a context manager) to release its connection.
+        :param uri:
+        :return: piperci.storeman.streams.ObjectReader
         """
@@ -0,0 +1,194 @@
+"""
+Streaming compression of object content in transit and at rest.
+
+An object uploaded with a codec is stored compressed, with the codec named in
+its metadata. Its SRI is computed over the uncompressed content, so the same
+file has the same SRI whether or not it was compressed. Downloads decompress
+objects that name a codec and pass the others through unchanged.
+
+A client's default codec applies to uploads that don't name one, compression
+False or "none" uploads a single object uncompressed.
+
+    gzip  zlib from the standard library, single threaded
+    zstd  the zstandard package (pip install piperci[zstd]), compressing on
+          every core
+"""
+import io
+import zlib
+
+from piperci.storeman.exceptions import IntegrityError
+
+CODEC_METADATA = "codec"
+CODECS = ("gzip", "zstd")
+NO_COMPRESSION = "none"
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3}
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _gzip_compressor(level):
+    return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def _gzip_decompressor():
+    return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+
+def _zstd_compressor(level):
+    import zstandard
+
+    # threads=-1 compresses on as many threads as there are cores
+    return zstandard.ZstdCompressor(level=level, threads=-1).compressobj()
+
+
+def _zstd_decompressor():
+    import zstandard
+
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+_BACKENDS = {
+    "gzip": (_gzip_compressor, _gzip_decompressor),
+    "zstd": (_zstd_compressor, _zstd_decompressor),
+}
+
+
+def _backend(codec):
+    try:
+        return _BACKENDS[codec]
+    except KeyError:
+        raise ValueError(f"Unknown codec {codec}, expected one of {CODECS}")
+
+
+def compressor(codec, level=None):
+    """
+    A streaming compressor with compress(data) and flush() methods
+    :param codec: "gzip" or "zstd"
+    :param level: Compression level, the codec's default if None
+    """
+    return _backend(codec)[0](DEFAULT_LEVELS[codec] if level is None else level)
+
+
+def decompressor(codec):
+    """A streaming decompressor with a decompress(data) method and eof attribute"""
+    return _backend(codec)[1]()
+
+
+def available_codecs():
+    """The codecs whose packages are installed"""
+    available = []
+    for codec in CODECS:
+        try:
+            decompressor(codec)
+        except ImportError:
+            continue
+        available.append(codec)
+    return available
+
+
+def upload_codec(compression, default=None):
+    """
+    The codec an upload is compressed with, None for none
+    :param compression: The upload's compression argument, None for default
+    :param default: The client's default codec
+    """
+    if compression is None:
+        return default
+    if compression is False or compression == NO_COMPRESSION:
+        return None
+    return compression
+
+
+def object_codec(metadata):
+    """
+    The codec an object was stored with, None if it is stored uncompressed
+    :param metadata: The object's metadata or response headers
+    """
+    metadata = {k.lower(): v for k, v in (metadata or {}).items()}
+    return metadata.get(f"x-amz-meta-{CODEC_METADATA}")
+
+
+class CompressingReader(io.RawIOBase):
+    """
+    Wraps a readable file-like object and reads it compressed with codec. Only
+    one chunk of compressed output is buffered.
+    :ivar size: The number of uncompressed bytes read so far
+    """
+
+    def __init__(self, reader, codec, level=None, chunk_size=_CHUNK_SIZE):
+        self._reader = reader
+        self._compressor = compressor(codec, level)
+        self._buffer = b""
+        self._done = False
+        self.codec = codec
+        self.chunk_size = chunk_size
+        self.size = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer and not self._done:
+            data = self._reader.read(self.chunk_size)
+            if data:
+                self.size += len(data)
+                self._buffer = self._compressor.compress(data)
+            else:
+                self._buffer = self._compressor.flush()
+                self._done = True
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class DecompressingReader(io.RawIOBase):
+    """
+    Decompresses an ObjectReader over an object stored with codec. Closing it
+    closes the ObjectReader, releasing its connection.
+    """
+
+    def __init__(self, reader, codec):
+        self._reader = reader
+        self._decompressor = decompressor(codec)
+        self._buffer = b""
+        self._done = False
+        self.codec = codec
+
+    @property
+    def chunk_size(self):
+        return self._reader.chunk_size
+
+    def _decompress(self, data):
+        if data:
+            return self._decompressor.decompress(data)
+        self._done = True
+        if not getattr(self._decompressor, "eof", True):
+            raise IntegrityError(f"{self.codec} stream ended before its end marker")
+        return b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer and not self._done:
+            self._buffer = self._decompress(self._reader.read(self.chunk_size))
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def iter_chunks(self, chunk_size=None):
+        """
+        Yield the decompressed object content as bytes chunks, decompressing
+        chunk_size compressed bytes at a time
+        """
+        for chunk in self._reader.iter_chunks(chunk_size):
+            data = self._decompress(chunk)
+            if data:
+                yield data
+        self._decompress(b"")
+
+    def close(self):
+        if not self.closed:
+            self._reader.close()
+        super().close()
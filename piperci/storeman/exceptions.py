@@ -0,0 +1,9 @@
+class StorageError(Exception):
+    def __init__(self, message, status=None, code=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+class IntegrityError(StorageError):
+    pass
@@ -0,0 +1,60 @@
+from piperci import sri as sritool
+from piperci.storeman.exceptions import IntegrityError
+
+
+class DownloadVerifier:
+    """
+    Checks downloaded bytes against an expected SRI and/or size as they stream
+    past, so a bad transfer is caught without re-reading the file from disk.
+    """
+
+    def __init__(self, uri, expected_sri=None, expected_size=None):
+        self.uri = uri
+        self.expected_size = expected_size
+        self.expected = None
+        self.hasher = None
+        self.size = 0
+        if expected_sri is not None:
+            if isinstance(expected_sri, str):
+                expected_sri = sritool.sri_to_hash(expected_sri)
+            self.expected = expected_sri
+            self.hasher = sritool.new_hasher(expected_sri.algorithm)
+
+    def check_size(self, size):
+        """Fail before transferring anything if the object has the wrong size"""
+        if self.expected_size is not None and size != self.expected_size:
+            raise IntegrityError(
+                f"{self.uri} is {size} bytes, expected {self.expected_size} bytes"
+            )
+
+    def check_sri(self, stored_sri):
+        """
+        Fail before transferring anything if the SRI stored in the object
+        metadata at upload time contradicts the expected SRI
+        """
+        if self.expected is None or not stored_sri:
+            return
+        for stored in sritool.sri_to_hashes(stored_sri):
+            if stored.algorithm == self.expected.algorithm:
+                if stored.digest != self.expected.digest:
+                    raise IntegrityError(
+                        f"{self.uri}: stored {stored} != {self.expected}"
+                    )
+
+    def update(self, chunk):
+        self.size += len(chunk)
+        if self.expected_size is not None and self.size > self.expected_size:
+            raise IntegrityError(
+                f"{self.uri} exceeded the expected size of {self.expected_size} bytes"
+            )
+        if self.hasher is not None:
+            self.hasher.update(chunk)
+
+    def verify(self):
+        self.check_size(self.size)
+        if self.hasher is None:
+            return None
+        actual = sritool.SRIResult(self.expected.algorithm, self.hasher.digest())
+        if actual.digest != self.expected.digest:
+            raise IntegrityError(f"{self.uri}: {actual} != {self.expected}")
+        return actual
@@ -0,0 +1,165 @@
+"""
+On-disk checkpoints of multipart uploads and ranged downloads, so a transfer
+cut short by a killed process resumes after its last completed part.
+
+Each transfer has one JSON lines file named after a digest of what identifies
+it: the object, the local file and its size and modification time, and the
+part size. The first line holds those fields, the following lines record
+transfer state (eg. the multipart upload id) and each completed part with its
+size and digest. Lines are appended and synced as parts complete, a torn last
+line left by a crash is ignored.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+PART_DIGEST = "sha256"
+
+
+def part_hasher():
+    """A hasher for the part digests recorded in checkpoints"""
+    return hashlib.new(PART_DIGEST)
+
+
+def part_digest(data):
+    hasher = part_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+class Checkpoint:
+    """
+    The journal of one transfer
+    :ivar identity: The fields identifying the transfer
+    :ivar state: dict of transfer state, see set
+    :ivar parts: {part number: {"size": ..., "digest": ..., **extra}}
+    """
+
+    def __init__(self, path, identity, state=None, parts=None):
+        self.path = path
+        self.identity = identity
+        self.state = state or {}
+        self.parts = parts or {}
+        self._lock = threading.Lock()
+
+    def _append(self, entry):
+        line = json.dumps(entry, sort_keys=True) + "\n"
+        with self._lock:
+            with open(self.path, "a") as journal:
+                journal.write(line)
+                journal.flush()
+                os.fsync(journal.fileno())
+
+    def set(self, **state):
+        """Record transfer state, eg. set(upload_id=...)"""
+        self.state.update(state)
+        self._append({"state": state})
+
+    def record(self, number, size, digest, **extra):
+        """Record part number as completed, with its size and hex digest"""
+        part = dict(extra, size=size, digest=digest)
+        self.parts[number] = part
+        self._append(dict(part, part=number))
+
+    def matches(self, number, data):
+        """True if part number was completed with exactly data"""
+        part = self.parts.get(number)
+        return (
+            part is not None
+            and part["size"] == len(data)
+            and part["digest"] == part_digest(data)
+        )
+
+    def reset(self):
+        """Drop the recorded state and parts, to start the transfer over"""
+        with self._lock:
+            with open(self.path, "w") as journal:
+                journal.write(json.dumps(self.identity, sort_keys=True) + "\n")
+        self.state = {}
+        self.parts = {}
+
+    def discard(self):
+        """Forget the transfer, it completed or can't be resumed"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _read(path):
+    """(identity, state, parts) of a journal file, None if it can't be read"""
+    state, parts = {}, {}
+    try:
+        with open(path) as journal:
+            lines = journal.read().split("\n")
+        identity = json.loads(lines[0])
+    except (OSError, ValueError):
+        return None
+    for line in lines[1:]:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            # Torn write of the last line
+            break
+        if "state" in entry:
+            state.update(entry["state"])
+        elif "part" in entry:
+            parts[entry.pop("part")] = entry
+    return identity, state, parts
+
+
+class TransferJournal:
+    """
+    A directory of transfer checkpoints
+    :param directory: Where checkpoints are kept, created if needed
+    :param max_age: Seconds after a checkpoint's last update that gc drops it
+    """
+
+    def __init__(self, directory, max_age=DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, identity):
+        key = hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+        return os.path.join(self.directory, f"{key}.journal")
+
+    def open(self, **identity):
+        """
+        Return the Checkpoint of the transfer identity describes, resuming the
+        recorded one if there is one
+        """
+        path = self._path(identity)
+        recorded = _read(path) if os.path.exists(path) else None
+        if recorded is not None and recorded[0] == identity:
+            return Checkpoint(path, identity, recorded[1], recorded[2])
+        checkpoint = Checkpoint(path, identity)
+        checkpoint.reset()
+        return checkpoint
+
+    def gc(self, now=None):
+        """
+        Remove checkpoints not updated for max_age seconds
+        :return: List of the removed Checkpoints that could be read, so their
+        remote state (eg. multipart uploads) can be cleaned up
+        """
+        now = time.time() if now is None else now
+        removed = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".journal"):
+                continue
+            try:
+                if now - os.path.getmtime(path) < self.max_age:
+                    continue
+            except FileNotFoundError:
+                continue
+            recorded = _read(path)
+            checkpoint = Checkpoint(path, *recorded) if recorded else Checkpoint(path, {})
+            checkpoint.discard()
+            if recorded:
+                removed.append(checkpoint)
+        return removed
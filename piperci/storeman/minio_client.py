@@ -1,37 +1,736 @@
-from piperci.storeman.client import BaseStorageClient
+import certifi
+import io
+import os
+import threading
+import time
+import urllib3
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+
+from piperci import tracing
+from piperci.resilience import (
+    OK,
+    RETRY_STATUSES,
+    TRANSIENT,
+    UNSENT,
+    RetryPolicy,
+    default_resilience,
+)
+from piperci.storeman.client import BaseStorageClient, ObjectRecord
+from piperci.storeman.compression import (
+    CODEC_METADATA,
+    CompressingReader,
+    DecompressingReader,
+    compressor,
+    object_codec,
+    upload_codec,
+)
+from piperci.storeman.exceptions import IntegrityError
+from piperci.storeman.integrity import DownloadVerifier
+from piperci.storeman.journal import (
+    DEFAULT_MAX_AGE,
+    TransferJournal,
+    part_digest,
+    part_hasher,
+)
+from piperci.storeman.streams import HashingReader, IterReader, ObjectReader, read_full
 
 from minio import Minio
-from minio.error import BucketAlreadyOwnedByYou, BucketAlreadyExists
+from minio.definitions import UploadPart
+from minio.error import (
+    BucketAlreadyOwnedByYou,
+    BucketAlreadyExists,
+    NoSuchUpload,
+    ResponseError,
+)
+from minio.helpers import (
+    DEFAULT_PART_SIZE,
+    MAX_POOL_SIZE,
+    amzprefix_user_metadata,
+    queryencode,
+)
 from urllib.parse import urlparse
+from xml.etree import ElementTree
+
+SRI_METADATA = "sri"
+# Arguments of the client methods recorded as span attributes
+_RECORDED = ("bucket_name", "object_name", "uri", "prefix", "dgst", "length")
+_PARALLEL_UPLOADS = 3
+# The largest object a single CopyObject request, or copied part, may be
+MAX_COPY_SIZE = 5 * 1024 ** 3
+_S3_NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+def _parse_uri(uri):
+    scheme = urlparse(uri).scheme
+    if scheme != "minio":
+        raise ValueError(f"Unknown URI scheme: {scheme}")
+    bucket_name = urlparse(uri).path.split("/")[1]
+    object_name = "/".join(urlparse(uri).path.split("/")[2:])
+    return bucket_name, object_name
+
+
+def _classify(response, error):
+    if isinstance(error, urllib3.exceptions.MaxRetryError):
+        error = error.reason
+    if isinstance(error, urllib3.exceptions.ConnectTimeoutError):
+        # Includes NewConnectionError, eg. connection refused
+        return UNSENT
+    if isinstance(
+        error, (urllib3.exceptions.ReadTimeoutError, urllib3.exceptions.ProtocolError)
+    ):
+        return TRANSIENT
+    if error is not None:
+        return OK
+    return TRANSIENT if response.status in RETRY_STATUSES else OK
+
+
+def _release(response):
+    response.release_conn()
+
+
+class ResilientPoolManager(urllib3.PoolManager):
+    """
+    urllib3.PoolManager sending every request through piperci.resilience, with
+    a circuit breaker and retry budget per storage endpoint
+    """
+
+    def __init__(self, retry_policy=None, **kwargs):
+        super().__init__(retries=False, **kwargs)
+        self.retry_policy = retry_policy
+
+    def urlopen(self, method, url, redirect=True, **kwargs):
+        endpoint = "{0.scheme}://{0.netloc}".format(urlparse(url))
+        return default_resilience().call(
+            endpoint,
+            lambda: super(ResilientPoolManager, self).urlopen(
+                method, url, redirect=redirect, **kwargs
+            ),
+            method=method,
+            classify=_classify,
+            policy=self.retry_policy,
+            discard=_release,
+        )
+
+
+def pool_manager(max_pool_size=MAX_POOL_SIZE, timeout=None, retries=None):
+    """
+    Build the urllib3.PoolManager used by MinioClient
+    :param max_pool_size: Maximum connections kept per host, should be at least
+    the number of threads sharing the client
+    :param timeout: Seconds as a number, a (connect, read) tuple or a
+    urllib3.Timeout. None waits forever
+    :param retries: Retries for connection errors and 5xx responses as an
+    integer, None for the piperci.resilience default policy. Retries are bounded
+    by the endpoint's retry budget and stop while its circuit is open
+    :return: ResilientPoolManager
+    """
+    if isinstance(timeout, tuple):
+        timeout = urllib3.Timeout(connect=timeout[0], read=timeout[1])
+    elif timeout is None:
+        timeout = urllib3.Timeout.DEFAULT_TIMEOUT
+    return ResilientPoolManager(
+        retry_policy=None if retries is None else RetryPolicy(attempts=retries + 1),
+        timeout=timeout,
+        maxsize=max_pool_size,
+        cert_reqs="CERT_REQUIRED",
+        ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+    )
+
+
+def _remove_partial_download(checkpoint):
+    """Remove the .part file a stale download checkpoint left behind"""
+    path = checkpoint.identity.get("path")
+    if path is None:
+        return
+    try:
+        os.remove(f"{path}.part")
+    except OSError:
+        pass
+
+
+def object_sri(stat):
+    """
+    Return the SRI stored in an object's metadata by upload_file/upload_stream
+    :param stat: The object stat as returned by minio stat_object
+    :return: SRI as a string or None
+    """
+    metadata = {k.lower(): v for k, v in (stat.metadata or {}).items()}
+    return metadata.get(f"x-amz-meta-{SRI_METADATA}")
 
 
 class MinioClient(BaseStorageClient):
     def __init__(self, *args, **kwargs):
-        hostname = kwargs.get("hostname")
+        hostname = self.hostname = kwargs.get("hostname")
         access_key = kwargs.get("access_key")
         secret_key = kwargs.get("secret_key")
+        http_client = kwargs.get("http_client") or pool_manager(
+            max_pool_size=kwargs.get("max_pool_size", MAX_POOL_SIZE),
+            timeout=kwargs.get("timeout"),
+            retries=kwargs.get("retries"),
+        )
         self.storage_client = Minio(
-            hostname, access_key=access_key, secret_key=secret_key, secure=False
+            hostname,
+            access_key=access_key,
+            secret_key=secret_key,
+            secure=kwargs.get("secure", False),
+            region=kwargs.get("region"),
+            http_client=http_client,
         )
+        # The codec uploads are compressed with unless they name another one
+        self.compression = kwargs.get("compression")
+        if self.compression is not None:
+            # Fail now on an unknown codec or a codec package that's missing
+            compressor(self.compression)
+        # With a journal directory transfers larger than a part are resumable
+        self.journal = None
+        self.journal_gc_interval = kwargs.get("journal_gc_interval", 3600)
+        self._journal_collected = None
+        self._journal_lock = threading.Lock()
+        if kwargs.get("journal_dir"):
+            self.journal = TransferJournal(
+                kwargs["journal_dir"], kwargs.get("journal_max_age", DEFAULT_MAX_AGE)
+            )
+            self.collect_journal()
 
+    def collect_journal(self):
+        """
+        Drop stale checkpoints from the journal, aborting their multipart
+        uploads and removing the .part files of their downloads. Run when the
+        client is created, then by resumable transfers every
+        journal_gc_interval seconds. Long running processes may also call it.
+        """
+        if self.journal is None:
+            return
+        self._journal_collected = time.monotonic()
+        for checkpoint in self.journal.gc():
+            if checkpoint.identity.get("kind") == "download":
+                _remove_partial_download(checkpoint)
+                continue
+            upload_id = checkpoint.state.get("upload_id")
+            if upload_id is None:
+                continue
+            try:
+                self.storage_client._remove_incomplete_upload(
+                    checkpoint.identity["bucket"],
+                    checkpoint.state.get("object", checkpoint.identity["object"]),
+                    upload_id,
+                )
+            except Exception:
+                # The upload may have expired on the server already
+                pass
+
+    def _collect_journal_due(self):
+        """collect_journal if it last ran journal_gc_interval seconds ago"""
+        with self._journal_lock:
+            if time.monotonic() - self._journal_collected < self.journal_gc_interval:
+                return
+            self._journal_collected = time.monotonic()
+        self.collect_journal()
+
+    def _ensure_bucket(self, bucket_name):
+        try:
+            self.storage_client.make_bucket(bucket_name)
+        except (BucketAlreadyExists, BucketAlreadyOwnedByYou):
+            pass
+
+    @tracing.traced("storeman.stat_file", record=_RECORDED)
     def stat_file(self, bucket_name, prefix=None, recursive=False):
         return self.storage_client.list_objects(
             bucket_name, prefix=prefix, recursive=recursive
         )
 
-    def download_file(self, uri, file_path):
-        scheme = urlparse(uri).scheme
-        if scheme != "minio":
-            raise ValueError(f"Unknown URI scheme: {scheme}")
-        bucket_name = urlparse(uri).path.split("/")[1]
-        object_name = "/".join(urlparse(uri).path.split("/")[2:])
+    def iter_objects(self, bucket_name, prefix=None, recursive=False, start_after=None):
+        for obj in self.storage_client.list_objects_v2(
+            bucket_name, prefix=prefix, recursive=recursive, start_after=start_after
+        ):
+            yield ObjectRecord(
+                obj.object_name, obj.size, obj.etag, obj.last_modified, obj.is_dir
+            )
+
+    def object_uri(self, bucket_name, object_name):
+        return f"minio://{self.hostname}/{bucket_name}/{object_name}"
 
-        return self.storage_client.fget_object(bucket_name, object_name, file_path)
+    @tracing.traced("storeman.download_file", record=_RECORDED)
+    def download_file(self, uri, file_path, expected_sri=None, expected_size=None):
+        bucket_name, object_name = _parse_uri(uri)
+        verifier = DownloadVerifier(uri, expected_sri, expected_size)
+        stat = self.storage_client.stat_object(bucket_name, object_name)
+        codec = object_codec(stat.metadata)
+        if codec is None:
+            # The stored size of a compressed object isn't its content's size
+            verifier.check_size(stat.size)
+        verifier.check_sri(object_sri(stat))
+        if (
+            self.journal is not None
+            and codec is None
+            and stat.size > DEFAULT_PART_SIZE
+        ):
+            _record_transfer(stat.size, codec)
+            return self._download_resumable(
+                bucket_name, object_name, file_path, verifier, stat
+            )
 
-    def upload_file(self, bucket_name, object_name, file_path):
+        part_path = f"{file_path}.part"
         try:
-            self.storage_client.make_bucket(bucket_name)
-        except (BucketAlreadyExists, BucketAlreadyOwnedByYou):
-            pass
-        self.storage_client.fput_object(bucket_name, object_name, file_path)
-        return self.storage_client.stat_object(bucket_name, object_name)
+            with open(part_path, "wb") as part_file, _open_object(
+                self.storage_client.get_object(bucket_name, object_name)
+            ) as reader:
+                for chunk in reader.iter_chunks():
+                    verifier.update(chunk)
+                    part_file.write(chunk)
+            verifier.verify()
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        os.replace(part_path, file_path)
+        _record_transfer(verifier.size, codec, stat.size)
+        return stat
+
+    @tracing.traced("storeman.open_download", record=_RECORDED)
+    def open_download(self, uri):
+        bucket_name, object_name = _parse_uri(uri)
+
+        return _open_object(self.storage_client.get_object(bucket_name, object_name))
+
+    @tracing.traced("storeman.upload_file", record=_RECORDED)
+    def upload_file(
+        self,
+        bucket_name,
+        object_name,
+        file_path,
+        dgst="sha256",
+        part_size=DEFAULT_PART_SIZE,
+        compression=None,
+    ):
+        if self.journal is not None and os.path.getsize(file_path) > part_size:
+            return self._upload_resumable(
+                bucket_name,
+                object_name,
+                file_path,
+                dgst,
+                part_size,
+                upload_codec(compression, self.compression),
+            )
+        with open(file_path, "rb") as data:
+            return self.upload_stream(
+                bucket_name,
+                object_name,
+                data,
+                length=os.path.getsize(file_path),
+                dgst=dgst,
+                part_size=part_size,
+                compression=compression,
+            )
+
+    @tracing.traced("storeman.upload_stream", record=_RECORDED)
+    def upload_stream(
+        self,
+        bucket_name,
+        object_name,
+        data,
+        length=None,
+        dgst="sha256",
+        part_size=DEFAULT_PART_SIZE,
+        compression=None,
+    ):
+        codec = upload_codec(compression, self.compression)
+        if not callable(getattr(data, "read", None)):
+            data = IterReader(data)
+        source = HashingReader(data, dgst)
+        reader = source if codec is None else CompressingReader(source, codec)
+
+        self._ensure_bucket(bucket_name)
+        part_data = read_full(reader, part_size)
+        # Compressed, a first part of length bytes needn't be the whole stream
+        if len(part_data) < part_size or (codec is None and len(part_data) == length):
+            _check_length(length, source.size)
+            self.storage_client.put_object(
+                bucket_name,
+                object_name,
+                io.BytesIO(part_data),
+                len(part_data),
+                metadata=_object_metadata(source.sri(), codec),
+            )
+        else:
+            tracing.current_span().set_attribute("storeman.multipart", True)
+            staging = staging_name(object_name)
+            self._put_multipart(
+                bucket_name, staging, reader, part_data, part_size, length
+            )
+            self._publish(
+                bucket_name, staging, object_name, _object_metadata(source.sri(), codec)
+            )
+
+        stat = self.storage_client.stat_object(bucket_name, object_name)
+        stat.sri = source.sri()
+        _record_transfer(source.size, codec, stat.size)
+        return stat
+
+    def _publish(self, bucket_name, staging, object_name, metadata):
+        """
+        Copy the completed multipart upload staging to object_name with
+        metadata, then remove it.
+        Metadata is fixed when a multipart upload starts, before the SRI is
+        known, so multipart uploads go to a staging object first. The server
+        side copy moves no data through the client, and object_name never
+        exists without its SRI.
+        """
+        try:
+            stat = self.storage_client.stat_object(bucket_name, staging)
+            # Replacing the metadata would otherwise reset the Content-Type
+            metadata = dict(metadata, **{"Content-Type": stat.content_type})
+            if stat.size <= MAX_COPY_SIZE:
+                self.storage_client.copy_object(
+                    bucket_name,
+                    object_name,
+                    f"/{bucket_name}/{staging}",
+                    metadata=metadata,
+                )
+            else:
+                self._copy_multipart(
+                    bucket_name, staging, object_name, stat.size, metadata
+                )
+        finally:
+            self.storage_client.remove_object(bucket_name, staging)
+
+    def _copy_multipart(self, bucket_name, source, object_name, size, metadata):
+        """Server side copy of an object too large for CopyObject, UploadPartCopy"""
+        client = self.storage_client
+        upload_id = client._new_multipart_upload(
+            bucket_name, object_name, amzprefix_user_metadata(metadata)
+        )
+
+        def copy_part(number, start, end):
+            response = client._url_open(
+                "PUT",
+                bucket_name=bucket_name,
+                object_name=object_name,
+                query={"partNumber": str(number), "uploadId": upload_id},
+                headers={
+                    "X-Amz-Copy-Source": queryencode(f"/{bucket_name}/{source}"),
+                    "X-Amz-Copy-Source-Range": f"bytes={start}-{end}",
+                },
+            )
+            etag = ElementTree.fromstring(response.data).findtext(f"{{{_S3_NS}}}ETag")
+            return UploadPart(
+                bucket_name,
+                object_name,
+                upload_id,
+                number,
+                etag.strip('"'),
+                None,
+                end - start + 1,
+            )
+
+        try:
+            with ThreadPoolExecutor(max_workers=_PARALLEL_UPLOADS) as executor:
+                parts = list(
+                    executor.map(lambda r: copy_part(*r), copy_ranges(size))
+                )
+            client._complete_multipart_upload(
+                bucket_name,
+                object_name,
+                upload_id,
+                {part.part_number: part for part in parts},
+            )
+        except BaseException:
+            client._remove_incomplete_upload(bucket_name, object_name, upload_id)
+            raise
+
+    def _upload_resumable(
+        self, bucket_name, object_name, file_path, dgst, part_size, codec=None
+    ):
+        """
+        upload_file as a multipart upload checkpointed in self.journal. A
+        restarted upload skips the parts the server already has, as long as the
+        file still holds the same bytes. Failed uploads are left in place to be
+        resumed, collect_journal aborts them once their checkpoint is stale.
+        """
+        self._collect_journal_due()
+        file_stat = os.stat(file_path)
+        checkpoint = self.journal.open(
+            kind="upload",
+            bucket=bucket_name,
+            object=object_name,
+            path=os.path.realpath(file_path),
+            size=file_stat.st_size,
+            mtime=file_stat.st_mtime_ns,
+            part_size=part_size,
+            codec=codec,
+        )
+        self._ensure_bucket(bucket_name)
+        staging = checkpoint.state.get("object") or staging_name(object_name)
+        upload = _MultipartUpload(self.storage_client, bucket_name, staging, checkpoint)
+        with open(file_path, "rb") as data:
+            source = HashingReader(data, dgst)
+            reader = source if codec is None else CompressingReader(source, codec)
+            with ThreadPoolExecutor(max_workers=_PARALLEL_UPLOADS) as executor:
+                part_data = read_full(reader, part_size)
+                while part_data:
+                    upload.submit(executor, part_data)
+                    part_data = read_full(reader, part_size)
+        _check_length(file_stat.st_size, source.size)
+        upload.complete()
+        checkpoint.discard()
+        self._publish(
+            bucket_name, staging, object_name, _object_metadata(source.sri(), codec)
+        )
+
+        stat = self.storage_client.stat_object(bucket_name, object_name)
+        stat.sri = source.sri()
+        _record_transfer(source.size, codec, stat.size)
+        tracing.current_span().set_attribute("storeman.resumed_parts", upload.resumed)
+        return stat
+
+    def _download_resumable(self, bucket_name, object_name, file_path, verifier, stat):
+        """
+        The transfer of download_file, checkpointed in self.journal every part.
+        A restarted download keeps the parts of the .part file that are intact
+        and fetches the rest with a ranged request.
+        """
+        self._collect_journal_due()
+        part_size = DEFAULT_PART_SIZE
+        part_path = f"{file_path}.part"
+        checkpoint = self.journal.open(
+            kind="download",
+            bucket=bucket_name,
+            object=object_name,
+            path=os.path.realpath(file_path),
+            etag=stat.etag,
+            size=stat.size,
+            part_size=part_size,
+        )
+        try:
+            with open(part_path, "a+b") as part_file:
+                offset = _resume_offset(part_file, checkpoint, verifier, part_size)
+                part_file.seek(offset)
+                part_file.truncate()
+                if offset < stat.size:
+                    with ObjectReader(
+                        self.storage_client.get_partial_object(
+                            bucket_name, object_name, offset
+                        )
+                    ) as reader:
+                        _write_parts(reader, part_file, checkpoint, verifier, offset)
+            verifier.verify()
+        except IntegrityError:
+            os.remove(part_path)
+            checkpoint.discard()
+            raise
+        os.replace(part_path, file_path)
+        checkpoint.discard()
+        tracing.current_span().set_attribute("storeman.resumed_bytes", offset)
+        return stat
+
+    def _put_multipart(self, bucket_name, object_name, reader, part_data, size, length):
+        """
+        Upload a stream as a multipart upload, reading it one part at a time.
+        minio.Minio.put_object requires the total length up front, so this drives
+        the multipart API directly. Up to _PARALLEL_UPLOADS parts are uploaded
+        concurrently, bounding memory to that many parts plus the one being read.
+        """
+        upload = _MultipartUpload(self.storage_client, bucket_name, object_name)
+        try:
+            with ThreadPoolExecutor(max_workers=_PARALLEL_UPLOADS) as executor:
+                while part_data:
+                    upload.submit(executor, part_data)
+                    part_data = read_full(reader, size)
+            _check_length(length, reader.size)
+            upload.complete()
+        except BaseException:
+            upload.abort()
+            raise
+
+
+def staging_name(object_name):
+    """A unique name to upload object_name to before it is published"""
+    return f"{object_name}.{uuid.uuid4().hex}.partial"
+
+
+def copy_ranges(size):
+    """(part number, first byte, last byte) of the parts to copy size bytes in"""
+    return [
+        (number, start, min(start + MAX_COPY_SIZE, size) - 1)
+        for number, start in enumerate(range(0, size, MAX_COPY_SIZE), 1)
+    ]
+
+
+def _object_metadata(sri, codec):
+    metadata = {SRI_METADATA: sri}
+    if codec is not None:
+        metadata[CODEC_METADATA] = codec
+    return metadata
+
+
+def _open_object(response):
+    """An ObjectReader over response, decompressing if the object names a codec"""
+    reader = ObjectReader(response)
+    codec = object_codec(response.headers)
+    return reader if codec is None else DecompressingReader(reader, codec)
+
+
+def _record_transfer(size, codec, stored_size=None):
+    """Set the byte count attributes of the current span"""
+    span = tracing.current_span()
+    span.set_attribute("storeman.bytes", size)
+    if codec is not None:
+        span.set_attribute("storeman.codec", codec)
+    if codec is not None and stored_size is not None:
+        span.set_attribute("storeman.stored_bytes", stored_size)
+
+
+def _resume_offset(part_file, checkpoint, verifier, part_size):
+    """The length of the checkpointed parts intact at the start of part_file"""
+    part_file.seek(0)
+    offset = 0
+    number = 1
+    while number in checkpoint.parts:
+        data = part_file.read(part_size)
+        if not checkpoint.matches(number, data):
+            break
+        verifier.update(data)
+        offset += len(data)
+        number += 1
+    return offset
+
+
+def _write_parts(reader, part_file, checkpoint, verifier, offset):
+    """Append reader to part_file, checkpointing every part once it is on disk"""
+    part_size = checkpoint.identity["part_size"]
+    number = offset // part_size + 1
+    hasher, filled = part_hasher(), 0
+    for chunk in reader.iter_chunks():
+        verifier.update(chunk)
+        part_file.write(chunk)
+        view = memoryview(chunk)
+        while view:
+            take = min(len(view), part_size - filled)
+            hasher.update(view[:take])
+            filled += take
+            view = view[take:]
+            if filled == part_size:
+                part_file.flush()
+                os.fsync(part_file.fileno())
+                checkpoint.record(number, filled, hasher.hexdigest())
+                number += 1
+                hasher, filled = part_hasher(), 0
+
+
+def _check_length(length, actual):
+    if length is not None and length != actual:
+        raise ValueError(f"Data uploaded {actual} is not equal input size {length}")
+
+
+class _MultipartUpload:
+    """
+    A multipart upload, optionally checkpointed: with a journal Checkpoint
+    the upload it records is resumed if the server still has it, and every
+    uploaded part is recorded
+    """
+
+    def __init__(self, client, bucket_name, object_name, checkpoint=None):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.checkpoint = checkpoint
+        self.in_flight = threading.BoundedSemaphore(_PARALLEL_UPLOADS)
+        self.futures = []
+        self.errors = []
+        self.resumed = 0
+        self.uploaded = {}
+        self.upload_id = checkpoint and checkpoint.state.get("upload_id")
+        if self.upload_id:
+            self.uploaded = self._uploaded_parts()
+        if self.uploaded is None or not self.upload_id:
+            self.uploaded = {}
+            self.upload_id = client._new_multipart_upload(bucket_name, object_name)
+            if checkpoint is not None:
+                checkpoint.reset()
+                checkpoint.set(upload_id=self.upload_id, object=object_name)
+
+    def _uploaded_parts(self):
+        """{part number: UploadPart} of the server's parts, None if it's gone"""
+        try:
+            return {
+                part.part_number: part
+                for part in self.client._list_object_parts(
+                    self.bucket_name, self.object_name, self.upload_id
+                )
+            }
+        except (NoSuchUpload, ResponseError):
+            return None
+
+    def _resumable(self, part_number, part_data):
+        """The server's UploadPart of part_number if it holds part_data"""
+        part = self.uploaded.get(part_number)
+        if part is None or not self.checkpoint.matches(part_number, part_data):
+            return None
+        if self.checkpoint.parts[part_number].get("etag") != part.etag.strip('"'):
+            return None
+        return part
+
+    def submit(self, executor, part_data):
+        part = self._resumable(len(self.futures) + 1, part_data)
+        if part is not None:
+            self.resumed += 1
+            self.futures.append(part)
+            return
+        self.in_flight.acquire()
+        if self.errors:
+            self.in_flight.release()
+            raise self.errors[0]
+        self.futures.append(
+            executor.submit(self._upload_part, len(self.futures) + 1, part_data)
+        )
+
+    def _upload_part(self, part_number, part_data):
+        try:
+            etag = self.client._do_put_object(
+                self.bucket_name,
+                self.object_name,
+                part_data,
+                len(part_data),
+                upload_id=self.upload_id,
+                part_number=part_number,
+            )
+            if self.checkpoint is not None:
+                self.checkpoint.record(
+                    part_number,
+                    len(part_data),
+                    part_digest(part_data),
+                    etag=etag.strip('"'),
+                )
+            return UploadPart(
+                self.bucket_name,
+                self.object_name,
+                self.upload_id,
+                part_number,
+                etag,
+                None,
+                len(part_data),
+            )
+        except Exception as e:
+            self.errors.append(e)
+            raise
+        finally:
+            self.in_flight.release()
+
+    def complete(self):
+        parts = [
+            part if isinstance(part, UploadPart) else part.result()
+            for part in self.futures
+        ]
+        self.client._complete_multipart_upload(
+            self.bucket_name,
+            self.object_name,
+            self.upload_id,
+            {part.part_number: part for part in parts},
+        )
+
+    def abort(self):
+        self.client._remove_incomplete_upload(
+            self.bucket_name, self.object_name, self.upload_id
+        )
@@ -0,0 +1,148 @@
+import io
+
+from piperci import sri as sritool
+
+
+def read_full(reader, size):
+    """
+    Read up to size bytes from a file-like object, retrying short reads until
+    size bytes have been collected or the reader is exhausted.
+    :param reader: Object with a read(size) method returning bytes
+    :param size: The number of bytes to read as an integer
+    :return: bytes, shorter than size only at end of stream
+    """
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = reader.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+class IterReader(io.RawIOBase):
+    """
+    Adapts an iterable of bytes chunks (eg. a generator) to a readable
+    file-like object. Only the chunk currently being consumed is held in memory.
+    """
+
+    def __init__(self, iterable):
+        self._iter = iter(iterable)
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            try:
+                self._buffer = bytes(next(self._iter))
+            except StopIteration:
+                return 0
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class ObjectReader(io.RawIOBase):
+    """
+    Streaming reader over an object download. Wraps the HTTP response returned
+    by the storage backend and releases its connection back to the pool when
+    closed, so it should be used as a context manager:
+
+        with storecli.open_download(uri) as reader:
+            for chunk in reader.iter_chunks():
+                ...
+    """
+
+    def __init__(self, response, chunk_size=1024 * 1024):
+        self._response = response
+        self._exhausted = False
+        self.chunk_size = chunk_size
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._response.read(len(b))
+        size = len(data)
+        if not size:
+            self._exhausted = True
+        b[:size] = data
+        return size
+
+    def iter_chunks(self, chunk_size=None):
+        """
+        Yield the object content as bytes chunks of at most chunk_size bytes
+        :param chunk_size: Maximum chunk size in bytes, defaults to self.chunk_size
+        """
+        for chunk in self._response.stream(amt=chunk_size or self.chunk_size):
+            yield chunk
+        self._exhausted = True
+
+    def close(self):
+        if not self.closed:
+            # A partially read body can't be reused, drop the connection instead
+            # of handing a dirty socket back to the pool.
+            if not self._exhausted:
+                self._response.close()
+            self._response.release_conn()
+        super().close()
+
+
+class SRIHasher:
+    """
+    Incrementally digests data with one or more algorithms and renders the
+    result as an SRI string
+    """
+
+    def __init__(self, dgst="sha256"):
+        self.dgsts = [dgst] if isinstance(dgst, str) else list(dgst)
+        self.hashers = [sritool.new_hasher(d) for d in self.dgsts]
+        self.size = 0
+
+    def update(self, data):
+        for hasher in self.hashers:
+            hasher.update(data)
+        self.size += len(data)
+
+    def sri(self):
+        """
+        The SRI of everything digested so far, with one space separated hash per
+        digest algorithm
+        """
+        return " ".join(
+            str(sritool.SRIResult(d, h.digest()))
+            for d, h in zip(self.dgsts, self.hashers)
+        )
+
+
+class HashingReader(io.RawIOBase):
+    """
+    Wraps a readable file-like object and hashes every byte read through it,
+    so data can be digested in the same pass that uploads it.
+    """
+
+    def __init__(self, reader, dgst="sha256"):
+        self._reader = reader
+        self.hasher = SRIHasher(dgst)
+
+    @property
+    def size(self):
+        return self.hasher.size
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._reader.read(len(b))
+        size = len(data)
+        b[:size] = data
+        self.hasher.update(data)
+        return size
+
+    def sri(self):
+        return self.hasher.sri()
@@ -0,0 +1,302 @@
+"""
+Optional tracing of sri, storeman and gman operations.
+
+Spans go to the first of:
+
+    a local exporter, set with configure() or the PIPERCI_TRACE environment
+    variable: "console" prints a line per span to stderr, "file:PATH" appends
+    a JSON object per span to PATH. Works offline without extra packages.
+    An invalid PIPERCI_TRACE is logged and ignored.
+
+    OpenTelemetry, when opentelemetry-api is installed. Spans are recorded by
+    whatever SDK and exporter the application configured.
+
+    nowhere: span() returns a shared no-op span.
+
+Both span implementations offer the OpenTelemetry Span methods used here,
+set_attribute, add_event, record_exception and is_recording, so instrumented
+code doesn't care which one it gets.
+
+    with tracing.span("sri.generate_sri", {"sri.algorithm": dgst}) as span:
+        ...
+        span.set_attribute("sri.bytes", size)
+"""
+import contextvars
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+_UNRESOLVED = object()
+
+_exporter = None
+_otel_tracer = _UNRESOLVED
+_current = contextvars.ContextVar("piperci_span", default=None)
+
+
+class NoopSpan:
+    """Stands in for a span when tracing is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def is_recording(self):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def add_event(self, name, attributes=None):
+        pass
+
+    def record_exception(self, exception):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Span:
+    """A span recorded by piperci itself and handed to the local exporter"""
+
+    def __init__(self, name, attributes=None, parent=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = "OK"
+        self.start = time.time()
+        self.duration = None
+        self._started = time.perf_counter()
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_exception(exc)
+        _current.reset(self._token)
+        self.end()
+        return False
+
+    def is_recording(self):
+        return self.duration is None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes):
+        self.attributes.update(attributes)
+
+    def add_event(self, name, attributes=None):
+        self.events.append(
+            {"name": name, "time": time.time(), "attributes": dict(attributes or {})}
+        )
+
+    def record_exception(self, exception):
+        self.status = "ERROR"
+        self.add_event(
+            "exception",
+            {
+                "exception.type": type(exception).__name__,
+                "exception.message": str(exception),
+            },
+        )
+
+    def end(self):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._started
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(self)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+
+class ConsoleExporter:
+    """Prints one line per span to stream, stderr by default"""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        attributes = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+        status = "" if span.status == "OK" else f" {span.status}"
+        with self._lock:
+            print(
+                f"[trace {span.trace_id[:8]}] {span.name} "
+                f"{span.duration * 1000:.3f}ms{status} {attributes}".rstrip(),
+                file=self.stream or sys.stderr,
+            )
+
+    def shutdown(self):
+        pass
+
+
+class FileExporter:
+    """
+    Appends spans to path as JSON lines. The file is opened by the first
+    export, if it can't be spans are logged as dropped and discarded.
+    """
+
+    def __init__(self, path):
+        import json
+
+        self._dumps = json.dumps
+        self.path = path
+        self._file = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._file is None and not self._failed:
+            try:
+                self._file = open(self.path, "a", buffering=1)
+            except OSError as e:
+                self._failed = True
+                log.warning("Dropping spans, can't open %s: %s", self.path, e)
+        return self._file
+
+    def export(self, span):
+        line = self._dumps(span.to_dict(), default=str)
+        with self._lock:
+            file = self._open()
+            if file is not None:
+                file.write(line + "\n")
+
+    def shutdown(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _exporter_from_env(value):
+    if not value:
+        return None
+    if value == "console":
+        return ConsoleExporter()
+    if value.startswith("file:"):
+        return FileExporter(value[len("file:"):])
+    log.warning("Ignoring PIPERCI_TRACE=%s, expected 'console' or 'file:PATH'", value)
+    return None
+
+
+def configure(exporter=None):
+    """
+    Send spans to a local exporter, ConsoleExporter, FileExporter or any object
+    with export(span) and shutdown(). Without one local tracing stops and spans
+    go to OpenTelemetry if it is installed.
+    """
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    if previous is not None:
+        previous.shutdown()
+
+
+def _otel():
+    """The OpenTelemetry tracer, None if opentelemetry-api isn't installed"""
+    global _otel_tracer
+    if _otel_tracer is _UNRESOLVED:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            _otel_tracer = None
+        else:
+            _otel_tracer = trace.get_tracer("piperci")
+    return _otel_tracer
+
+
+def span(name, attributes=None):
+    """
+    Start a span around a with block, as a child of the current span
+    :param name: Span name, eg. "gman.update_task_id"
+    :param attributes: dict of initial span attributes
+    :return: A context manager returning the span
+    """
+    if _exporter is not None:
+        return Span(name, attributes, _current.get())
+    tracer = _otel()
+    if tracer is not None:
+        return tracer.start_as_current_span(name, attributes=attributes)
+    return NOOP_SPAN
+
+
+def current_span():
+    """The span of the innermost with tracing.span block, a no-op span if none"""
+    if _exporter is not None:
+        return _current.get() or NOOP_SPAN
+    if _otel() is not None:
+        from opentelemetry import trace
+
+        return trace.get_current_span()
+    return NOOP_SPAN
+
+
+def _enabled():
+    return _exporter is not None or _otel() is not None
+
+
+def traced(name, record=()):
+    """
+    Decorator running every call of a function in a span
+    :param name: The span name
+    :param record: Arguments to record as attributes, named
+    "<prefix of name>.<argument>"
+    """
+    import inspect
+
+    prefix = name.split(".")[0]
+
+    def decorate(fn):
+        signature = inspect.signature(fn)
+        recorded = [arg for arg in record if arg in signature.parameters]
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled():
+                return fn(*args, **kwargs)
+            bound = signature.bind_partial(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            attributes = {
+                f"{prefix}.{arg}": arguments[arg]
+                for arg in recorded
+                if arguments.get(arg) is not None
+            }
+            with span(name, attributes):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+configure(_exporter_from_env(os.environ.get("PIPERCI_TRACE")))
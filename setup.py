@@ -6,6 +6,7 @@ tests_require = [
     "pytest-mock",
     "responses",
     "pytest-server-fixtures[s3]",
+    "aiohttp",
 ]
 
 setup(
@@ -29,11 +30,20 @@ setup(
         "pyyaml",
         "marshmallow",
         "requests",
-        "minio",
+        "minio<7",
         "subresource-integrity",
+        "urllib3",
+        "certifi",
     ],
     setup_requires=["setuptools-scm"],
-    extras_require={"test": tests_require},
+    extras_require={
+        "test": tests_require,
+        "aio": ["aiohttp"],
+        "fast-digests": ["blake3", "xxhash"],
+        "fast-json": ["orjson"],
+        "tracing": ["opentelemetry-api"],
+        "zstd": ["zstandard"],
+    },
     tests_require=tests_require,
     entry_points={"console_scripts": ["sritool=piperci.cli.sri:main"]},
 )
@@ -0,0 +1,52 @@
+import pytest
+
+from urllib.parse import urlparse
+
+from piperci.storeman.client import storage_client
+from storeman_bench import BenchResults
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("storeman benchmark")
+    group.addoption(
+        "--bench-json",
+        default="storeman-benchmark.json",
+        help="write storeman benchmark results to this JSON file",
+    )
+    group.addoption(
+        "--bench-baseline",
+        default=None,
+        help="JSON results of a previous run to check for regressions against",
+    )
+    group.addoption(
+        "--bench-tolerance",
+        default=0.25,
+        type=float,
+        help="allowed fractional drop in throughput against the baseline",
+    )
+
+
+@pytest.fixture(scope="session")
+def bench_results(request):
+    results = BenchResults(
+        request.config.getoption("--bench-baseline"),
+        request.config.getoption("--bench-tolerance"),
+    )
+    yield results
+    results.dump(request.config.getoption("--bench-json"))
+
+
+@pytest.fixture
+def minio_server(s3_server):
+    return urlparse(s3_server.boto_endpoint_url).netloc
+
+
+@pytest.fixture
+def storecli(minio_server):
+    return storage_client(
+        storage_type="minio",
+        hostname=minio_server,
+        access_key="MINIO_TEST_ACCESS",
+        secret_key="MINIO_TEST_SECRET",
+        max_pool_size=32,
+    )
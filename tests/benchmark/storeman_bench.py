@@ -0,0 +1,54 @@
+"""Helpers for the storeman throughput benchmarks"""
+import json
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+MiB = 1024 * 1024
+
+
+class BenchResults:
+    def __init__(self, baseline=None, tolerance=0.25):
+        self.results = []
+        self.baseline = {}
+        self.tolerance = tolerance
+        if baseline:
+            with open(baseline) as f:
+                self.baseline = {r["name"]: r for r in json.load(f)["results"]}
+
+    def record(self, name, operation, objects, object_size, elapsed, **params):
+        total = objects * object_size
+        result = {
+            "name": name,
+            "operation": operation,
+            "objects": objects,
+            "object_size": object_size,
+            "bytes": total,
+            "seconds": round(elapsed, 6),
+            "mb_per_s": round(total / MiB / elapsed, 3),
+            "objects_per_s": round(objects / elapsed, 3),
+        }
+        result.update(params)
+        self.results.append(result)
+        return result
+
+    def regressions(self):
+        for result in self.results:
+            base = self.baseline.get(result["name"])
+            # objects/s is proportional to MB/s for a given case and is also
+            # meaningful for listings
+            limit = base and base["objects_per_s"] * (1 - self.tolerance)
+            if base and result["objects_per_s"] < limit:
+                yield result, base
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump({"timestamp": time.time(), "results": self.results}, f, indent=2)
+
+
+def run_concurrently(fn, items, concurrency):
+    """Run fn over items on concurrency threads, return the elapsed wall time"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(fn, items))
+    return time.perf_counter() - start
@@ -0,0 +1,74 @@
+import io
+import os
+import pytest
+
+from storeman_bench import MiB, run_concurrently
+
+# Every case moves roughly this much data in each direction
+TOTAL_BYTES = 64 * MiB
+
+sizes = [4 * 1024, 256 * 1024, 4 * MiB, 32 * MiB]
+concurrencies = [1, 4, 16]
+part_sizes = [5 * MiB, 16 * MiB, 32 * MiB]
+
+
+def _transfer(storecli, bench_results, name, object_size, concurrency, part_size):
+    objects = max(TOTAL_BYTES // object_size, concurrency)
+    payload = os.urandom(object_size)
+    bucket = "benchmark"
+    names = [f"{name}/{i}" for i in range(objects)]
+
+    def upload(object_name):
+        storecli.upload_stream(
+            bucket, object_name, io.BytesIO(payload), len(payload), part_size=part_size
+        )
+
+    def download(object_name):
+        with storecli.open_download(f"minio://bench/{bucket}/{object_name}") as r:
+            for _ in r.iter_chunks():
+                pass
+
+    params = {"concurrency": concurrency, "part_size": part_size}
+    upload_time = run_concurrently(upload, names, concurrency)
+    bench_results.record(
+        f"upload/{name}", "upload", objects, object_size, upload_time, **params
+    )
+    download_time = run_concurrently(download, names, concurrency)
+    bench_results.record(
+        f"download/{name}", "download", objects, object_size, download_time, **params
+    )
+
+
+@pytest.mark.parametrize("concurrency", concurrencies)
+@pytest.mark.parametrize("object_size", sizes)
+def test_object_size_throughput(storecli, bench_results, object_size, concurrency):
+    name = f"size-{object_size}-c{concurrency}"
+    _transfer(storecli, bench_results, name, object_size, concurrency, 5 * MiB)
+
+
+@pytest.mark.parametrize("part_size", part_sizes)
+def test_part_size_throughput(storecli, bench_results, part_size):
+    name = f"part-{part_size}"
+    _transfer(storecli, bench_results, name, 64 * MiB, 1, part_size)
+
+
+def test_listing_throughput(storecli, bench_results):
+    objects = 2000
+    run_concurrently(
+        lambda i: storecli.upload_stream("listing", f"{i % 16}/{i}", [b"x"], 1),
+        range(objects),
+        16,
+    )
+    elapsed = run_concurrently(
+        lambda _: sum(1 for _ in storecli.iter_objects_sharded("listing")), [0], 1
+    )
+    bench_results.record("list/sharded", "list", objects, 1, elapsed)
+
+
+def test_no_regressions(bench_results):
+    regressions = [
+        f"{r['name']}: {r['objects_per_s']} objects/s "
+        f"< baseline {b['objects_per_s']} objects/s"
+        for r, b in bench_results.regressions()
+    ]
+    assert not regressions, "\n".join(regressions)
@@ -0,0 +1,135 @@
+import threading
+
+import pytest
+
+from piperci import sri as sritool
+from piperci.artifacts import ArtifactPipeline, publish
+from piperci.gman import client as gman_client
+
+
+class Stat:
+    def __init__(self, size, sri):
+        self.size = size
+        self.sri = sri
+
+
+class FakeStorage:
+    """Stores uploads in memory, computing the SRI like MinioClient does"""
+
+    def __init__(self, fail=()):
+        self.objects = {}
+        self.fail = set(fail)
+        self.lock = threading.Lock()
+
+    def object_uri(self, bucket_name, object_name):
+        return f"minio://fake/{bucket_name}/{object_name}"
+
+    def upload_file(self, bucket_name, object_name, file_path, dgst="sha256"):
+        if object_name in self.fail:
+            raise OSError("upload failed")
+        with open(file_path, "rb") as file:
+            data = file.read()
+        with self.lock:
+            self.objects[(bucket_name, object_name)] = data
+        return Stat(len(data), sritool.generate_sri(file_path, dgst))
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for index in range(20):
+        path = tmp_path / "out" / f"file{index}.txt"
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b"x" * index)
+        paths.append(str(path))
+    return paths
+
+
+def test_publish_uploads_every_file(files, tmp_path):
+    storage = FakeStorage()
+
+    artifacts, summary = publish(
+        storage, "bucket", files, prefix="build/", root=str(tmp_path)
+    )
+
+    assert sorted(artifact.path for artifact in artifacts) == sorted(files)
+    assert len(storage.objects) == 20
+    for artifact in artifacts:
+        assert artifact.error is None
+        assert artifact.object_name.startswith("build/out/file")
+        assert artifact.uri == f"minio://fake/bucket/{artifact.object_name}"
+        assert artifact.sri == str(sritool.generate_sri(artifact.path))
+        assert not artifact.reported
+
+    record = summary.record()
+    assert record["files"] == 20
+    assert record["failures"] == 0
+    assert record["bytes"] == sum(range(20))
+    assert record["stages"]["upload"]["items"] == 20
+    assert record["stages"]["report"]["items"] == 20
+
+
+def test_publish_keeps_going(files):
+    storage = FakeStorage(fail=["file3.txt"])
+
+    artifacts, summary = publish(storage, "bucket", files, max_queued=2)
+
+    failed = [artifact for artifact in artifacts if artifact.error]
+    assert [artifact.object_name for artifact in failed] == ["file3.txt"]
+    assert "upload failed" in failed[0].error
+    assert summary.failures == 1
+    assert len(storage.objects) == 19
+
+
+def test_pipeline_stops_early(files):
+    pipeline = ArtifactPipeline(FakeStorage(), "bucket", max_queued=1)
+    run = pipeline.run(iter(files))
+
+    next(run)
+    run.close()
+
+    assert pipeline.summary.files == 1
+
+
+def test_pipeline_stopped_early_leaves_no_threads(files):
+    before = set(threading.enumerate())
+    pipeline = ArtifactPipeline(
+        FakeStorage(), "bucket", upload_workers=3, report_workers=3, max_queued=1
+    )
+    run = pipeline.run(iter(files))
+
+    next(run)
+    run.close()
+
+    for thread in set(threading.enumerate()) - before:
+        thread.join(5)
+        assert not thread.is_alive(), thread.name
+
+
+def test_publish_reports_to_gman(files):
+    standin = pytest.importorskip("piperci.gman.standin")
+    with standin.GManStandIn() as gman:
+        task_id = gman_client.request_new_task_id(
+            run_id="1234",
+            project="test",
+            caller="pytest",
+            status="started",
+            gman_url=gman.url,
+        )["task"]["task_id"]
+
+        artifacts, summary = publish(
+            FakeStorage(),
+            "bucket",
+            [(path, f"named/{index}") for index, path in enumerate(files[:5])],
+            gman_url=gman.url,
+            task_id=task_id,
+        )
+        events = gman_client.get_task_id_events(task_id=task_id, gman_url=gman.url)
+
+    assert all(artifact.reported for artifact in artifacts)
+    messages = {event["message"] for event in events if event["status"] == "info"}
+    assert messages == {
+        f"Uploaded artifact minio://fake/bucket/{artifact.object_name} "
+        f"sri={artifact.sri}"
+        for artifact in artifacts
+    }
@@ -0,0 +1,18 @@
+import pytest
+
+from piperci.gman import client
+from piperci.resilience import Resilience, RetryPolicy, set_default_resilience
+
+
+@pytest.fixture(autouse=True)
+def resilience():
+    """Fresh breakers and budgets per test, retrying without delays"""
+    yield set_default_resilience(Resilience(RetryPolicy(backoff=0)))
+    set_default_resilience()
+
+
+@pytest.fixture(autouse=True)
+def read_cache():
+    client.read_cache.clear()
+    yield client.read_cache
+    client.read_cache.clear()
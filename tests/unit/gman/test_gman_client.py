@@ -1,7 +1,12 @@
+import json
 import logging
 import pytest
 import requests
 import responses
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
 
 from piperci.gman import client
 from piperci.gman.exceptions import TaskError
@@ -367,3 +372,115 @@ def test_wait_for_thread_id_complete_fails_request(response_code):
 def test_wait_for_thread_id_complete_request_exception(mock_head_request_exception):
     with pytest.raises(requests.exceptions.RequestException):
         client.wait_for_thread_id_complete(thread_id="1234", gman_url="http://gman_url")
+
+
+@responses.activate
+def test_get_retries_transient_errors(task_event_list):
+    responses.add(responses.GET, "http://gman_url/task/1234/events", status=503)
+    responses.add(
+        responses.GET, "http://gman_url/task/1234/events", json=task_event_list
+    )
+
+    resp = client.get_task_id_events(task_id="1234", gman_url="http://gman_url")
+
+    assert resp == task_event_list
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_request_new_task_id_not_retried():
+    responses.add(responses.POST, "http://gman_url/task", status=503)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.request_new_task_id(
+            "1234", "http://gman_url", "test", "tests", status="started"
+        )
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_circuit_opens(resilience):
+    responses.add(responses.PUT, "http://gman_url/task/1234", status=500)
+    resilience.failure_threshold = 2
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.RequestException):
+            client.update_task_id(task_id="1234", gman_url="http://gman_url")
+    calls = len(responses.calls)
+
+    with pytest.raises(requests.exceptions.RequestException) as e:
+        client.get_task_id_events(task_id="1234", gman_url="http://gman_url")
+    assert "Circuit open" in str(e.value)
+    assert len(responses.calls) == calls
+
+
+@responses.activate
+def test_reads_are_cached_until_updated(task_event_list):
+    responses.add(
+        responses.GET, "http://gman_url/task/1234/events", json=task_event_list
+    )
+    responses.add(responses.PUT, "http://gman_url/task/1234", json={})
+
+    for _ in range(3):
+        client.get_task_id_events(task_id="1234", gman_url="http://gman_url")
+    assert len(responses.calls) == 1
+
+    client.update_task_id(task_id="1234", gman_url="http://gman_url", status="running")
+    client.get_task_id_events(task_id="1234", gman_url="http://gman_url")
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_cached_reads_are_copies(task_event_list):
+    responses.add(
+        responses.GET, "http://gman_url/task/1234/events", json=task_event_list
+    )
+
+    events = client.get_task_id_events(task_id="1234", gman_url="http://gman_url")
+    events[0]["task"]["task_id"] = "changed"
+    events.clear()
+
+    events = client.get_task_id_events(task_id="1234", gman_url="http://gman_url")
+    assert events == task_event_list
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_concurrent_reads_share_one_request(task_list, read_cache):
+    read_cache.ttl = 0
+    release = threading.Event()
+
+    def slow_response(request):
+        release.wait(5)
+        return 200, {}, json.dumps(task_list)
+
+    responses.add_callback(
+        responses.GET, "http://gman_url/thread/1234", callback=slow_response
+    )
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(
+                client.get_thread_id_tasks, thread_id="1234", gman_url="http://gman_url"
+            )
+            for _ in range(4)
+        ]
+        time.sleep(0.1)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == [task_list] * 4
+    assert len(responses.calls) == 1
+
+    client.get_thread_id_tasks(thread_id="1234", gman_url="http://gman_url")
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_read_errors_are_not_cached(task_list):
+    responses.add(responses.GET, "http://gman_url/thread/1234", status=404)
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_thread_id_tasks(thread_id="1234", gman_url="http://gman_url")
+
+    responses.replace(responses.GET, "http://gman_url/thread/1234", json=task_list)
+    assert client.get_thread_id_tasks(thread_id="1234", gman_url="http://gman_url")
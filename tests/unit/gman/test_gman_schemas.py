@@ -0,0 +1,60 @@
+import json
+
+import pytest
+import responses
+
+from piperci.gman import client, schemas
+from piperci.gman.exceptions import InvalidResponse
+
+
+def test_parse_events(task_event_list):
+    content = schemas.json_backend.dumps(task_event_list)
+
+    assert schemas.parse(schemas.event_schema, content, many=True) == task_event_list
+
+
+def test_parse_keeps_unknown_and_partial_fields():
+    content = b'{"task": {"task_id": "1234", "extra": [1]}, "new_field": true}'
+
+    assert schemas.parse(schemas.event_schema, content) == {
+        "task": {"task_id": "1234", "extra": [1]},
+        "new_field": True,
+    }
+
+
+def test_schema_dumps_str():
+    dumped = schemas.event_schema.dumps({"status": "info", "message": "test"})
+
+    assert isinstance(dumped, str)
+    assert json.loads(dumped)["status"] == "info"
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"not json", b'[{"status": 1}]', b'[{"task": "1234"}]', b'{"status": "ok"}'],
+)
+def test_parse_malformed(content):
+    with pytest.raises(InvalidResponse):
+        schemas.parse(schemas.event_schema, content, many=True)
+
+
+def test_render_new_task():
+    data = {"run_id": "1234", "project": "test", "caller": "tests", "status": "started"}
+
+    assert schemas.render(schemas.new_task_schema, data) == (
+        '{"run_id": "1234", "project": "test", "caller": "tests", "status": "started"}'
+    )
+
+
+def test_render_invalid():
+    with pytest.raises(ValueError):
+        schemas.render(schemas.task_update_schema, {"message": 1})
+
+
+@responses.activate
+def test_get_task_id_events_malformed():
+    responses.add(
+        responses.GET, "http://gman_url/task/1234/events", json=[{"status": 1}]
+    )
+    with pytest.raises(InvalidResponse):
+        client.get_task_id_events(task_id="1234", gman_url="http://gman_url")
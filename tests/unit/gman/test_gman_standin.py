@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+import requests
+
+from piperci.gman import client
+
+standin = pytest.importorskip("piperci.gman.standin")
+loadtest = pytest.importorskip("piperci.gman.loadtest")
+
+
+@pytest.fixture
+def gman():
+    with standin.GManStandIn() as gman:
+        yield gman
+
+
+def new_task(gman, **kwargs):
+    return client.request_new_task_id(
+        run_id="1234",
+        project="test",
+        caller="pytest",
+        status="started",
+        gman_url=gman.url,
+        **kwargs,
+    )
+
+
+def test_standin_task_lifecycle(gman):
+    task = new_task(gman)
+    task_id = task["task"]["task_id"]
+    assert task["task"]["thread_id"] == task_id
+
+    client.update_task_id(
+        task_id=task_id, gman_url=gman.url, status="completed", message="done"
+    )
+
+    events = client.get_task_id_events(task_id=task_id, gman_url=gman.url)
+    assert [event["status"] for event in events] == ["started", "completed"]
+    assert client.wait_for_task_status(
+        task_id=task_id, status="completed", gman_url=gman.url
+    )
+
+
+def test_standin_thread(gman):
+    parent = new_task(gman)["task"]["task_id"]
+    child = new_task(gman, thread_id=parent)["task"]["task_id"]
+
+    tasks = client.get_thread_id_tasks(thread_id=parent, gman_url=gman.url)
+    assert [task["task_id"] for task in tasks] == [parent, child]
+
+    for task_id in (parent, child):
+        client.update_task_id(
+            task_id=task_id, gman_url=gman.url, status="completed", message="done"
+        )
+    assert client.wait_for_thread_id_complete(thread_id=parent, gman_url=gman.url)
+    assert len(client.get_thread_id_events(thread_id=parent, gman_url=gman.url)) == 4
+
+
+def test_standin_thread_failure(gman):
+    task_id = new_task(gman)["task"]["task_id"]
+    client.update_task_id(
+        task_id=task_id, gman_url=gman.url, status="failed", message="boom"
+    )
+    with pytest.raises(client.TaskError):
+        client.wait_for_thread_id_complete(thread_id=task_id, gman_url=gman.url)
+
+
+def test_standin_unknown_task(gman):
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.update_task_id(
+            task_id="missing", gman_url=gman.url, status="completed", message="done"
+        )
+
+
+def test_standin_injected_failure_is_retried(gman):
+    task_id = new_task(gman)["task"]["task_id"]
+    gman.failures.extend([503, 503])
+    requests_before = gman.requests
+
+    events = client.get_task_id_events(task_id=task_id, gman_url=gman.url)
+
+    assert len(events) == 1
+    assert gman.requests - requests_before == 3
+
+
+def test_loadtest_report(gman):
+    report = loadtest.LoadTest(gman.url, lifecycles=6, concurrency=3, updates=2).run()
+
+    # request, 2 updates and completion per lifecycle, plus at least one poll
+    assert report["calls"] >= 6 * 5
+    assert report["errors"] == 0
+    assert report["lifecycles"] == 6
+    assert report["latency_p50_ms"] <= report["latency_p99_ms"]
+    assert report["detect_p50_ms"] is not None
+    assert report["calls_per_s"] > 0
+
+
+def test_loadtest_stops_watching_failed_lifecycles(gman, mocker):
+    mocker.patch.object(
+        client, "update_task_id", side_effect=requests.exceptions.ConnectionError
+    )
+    test = loadtest.LoadTest(gman.url, lifecycles=4, concurrency=2, updates=1)
+    runner = threading.Thread(target=test.run, daemon=True)
+
+    runner.start()
+    runner.join(5)
+
+    assert not runner.is_alive()
+    assert test.errors == 4
+    assert not test.detections
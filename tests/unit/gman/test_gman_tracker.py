@@ -0,0 +1,152 @@
+import threading
+
+import pytest
+
+from piperci.gman import client
+from piperci.gman.exceptions import TaskError
+from piperci.gman.tracker import ThreadTracker
+
+standin = pytest.importorskip("piperci.gman.standin")
+
+
+def event(task_id, status, timestamp):
+    return {"task": {"task_id": task_id}, "status": status, "timestamp": timestamp}
+
+
+@pytest.fixture
+def gman():
+    with standin.GManStandIn() as gman:
+        yield gman
+
+
+@pytest.fixture
+def thread(gman):
+    """A thread of a parent task and 20 child tasks, all started"""
+
+    def new_task(thread_id=None):
+        return client.request_new_task_id(
+            run_id="1234",
+            project="test",
+            caller="pytest",
+            status="received" if thread_id else "started",
+            thread_id=thread_id,
+            gman_url=gman.url,
+        )["task"]["task_id"]
+
+    parent = new_task()
+    return parent, [new_task(parent) for _ in range(20)]
+
+
+def complete(gman, task_ids, status="completed"):
+    for task_id in task_ids:
+        client.update_task_id(
+            task_id=task_id, gman_url=gman.url, status=status, message=status
+        )
+
+
+def test_apply_keeps_latest_and_terminal_statuses():
+    tracker = ThreadTracker("1", "http://gman")
+
+    changed = tracker.apply(
+        [
+            event("a", "started", "1"),
+            event("a", "info", "2"),
+            event("b", "started", "1"),
+            event("b", "completed", "2"),
+            event("b", "info", "3"),
+            event("c", "info", "2"),
+            event("c", "started", "1"),
+        ]
+    )
+
+    assert changed == 3
+    assert tracker.statuses == {"a": "info", "b": "completed", "c": "info"}
+    assert tracker.running() == {"a", "c"}
+    assert tracker.counts == {"info": 2, "completed": 1}
+
+    assert tracker.apply([event("a", "failed", "3"), event("b", "failed", "4")]) == 1
+    assert tracker.failed() == {"a"}
+    assert tracker.counts["info"] == 1
+
+
+def test_refresh_fetches_events_only_on_change(gman, thread):
+    parent, children = thread
+    tracker = ThreadTracker(parent, gman.url)
+
+    assert tracker.refresh() == 21
+    assert len(tracker) == 21
+    assert tracker.refresh() == 0
+    assert tracker.requests == 3
+
+    complete(gman, children[:5])
+    assert tracker.refresh() == 5
+    assert tracker.completed() == set(children[:5])
+    assert tracker.counts["completed"] == 5
+
+
+def test_refresh_polls_few_running_tasks(gman, thread, mocker):
+    parent, children = thread
+    tracker = ThreadTracker(parent, gman.url, poll_interval=0.01)
+    complete(gman, [parent] + children[:15])
+    tracker.refresh()
+
+    get_json = mocker.spy(client, "_get_json")
+    complete(gman, children[15:])
+    tracker.wait(timeout=5)
+
+    assert tracker.completed() == {parent, *children}
+    urls = [args[0] for args, _ in get_json.call_args_list]
+    assert urls and all("/task/" in url for url in urls)
+
+
+def test_refresh_caps_full_reads(gman, thread):
+    parent, children = thread
+    tracker = ThreadTracker(parent, gman.url)
+    tracker.refresh()
+
+    complete(gman, children[:5])
+    assert tracker.refresh(full_interval=60) == 0
+    assert tracker.requests == 3
+    assert tracker.refresh() == 5
+
+
+def test_wait_for_subset_polls_its_tasks(gman, thread):
+    parent, children = thread
+    tracker = ThreadTracker(parent, gman.url, poll_interval=0.01)
+    complete(gman, children[:3])
+
+    assert tracker.wait(children[:3], timeout=5) == set()
+    assert tracker.requests == 3
+    assert len(tracker) == 3
+
+
+def test_wait_for_thread(gman, thread):
+    parent, children = thread
+    tracker = ThreadTracker(
+        parent, gman.url, poll_interval=0.01, full_refresh_interval=0.05
+    )
+    timer = threading.Timer(0.1, complete, (gman, [parent] + children))
+    timer.start()
+
+    tracker.wait(timeout=5)
+
+    assert tracker.completed() == {parent, *children}
+    assert not tracker.running()
+
+
+def test_wait_raises_on_failure(gman, thread):
+    parent, children = thread
+    complete(gman, children[:1], status="failed")
+    tracker = ThreadTracker(parent, gman.url, poll_interval=0.01)
+
+    with pytest.raises(TaskError):
+        tracker.wait(timeout=5)
+    assert tracker.wait(children[:1], raise_on_failure=False) == {children[0]}
+
+
+def test_wait_timeout(gman, thread):
+    parent, children = thread
+    tracker = ThreadTracker(parent, gman.url, poll_interval=0.01)
+
+    with pytest.raises(TimeoutError):
+        tracker.wait(children, timeout=0.05)
@@ -0,0 +1,174 @@
+import threading
+
+import pytest
+import requests
+
+from piperci.gman import client
+from piperci.gman.updater import TaskUpdater
+
+
+class GatedUpdates:
+    """Records update_task_id calls, blocking each one until released"""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, task_id=None, gman_url=None, status=None, message=None):
+        self.started.set()
+        self.release.wait(5)
+        self.calls.append((task_id, status, message))
+        return {"status": status}
+
+
+@pytest.fixture
+def gated(mocker):
+    gated = GatedUpdates()
+    mocker.patch("piperci.gman.updater.client.update_task_id", side_effect=gated)
+    return gated
+
+
+def test_update_does_not_wait(gated):
+    with TaskUpdater("http://gman") as updater:
+        assert updater.update("1234", "info", "working") is None
+        assert gated.started.wait(5)
+        assert gated.calls == []
+        gated.release.set()
+        assert updater.flush(5)
+    assert gated.calls == [("1234", "info", "working")]
+
+
+def test_update_merges_queued(gated):
+    with TaskUpdater("http://gman") as updater:
+        updater.update("1234", "info", "first")
+        gated.started.wait(5)
+        updater.update("1234", "info", "second")
+        updater.update("5678", "info", "other")
+        updater.update("1234", "info", "third")
+        gated.release.set()
+
+    assert gated.calls == [
+        ("1234", "info", "first"),
+        ("5678", "info", "other"),
+        ("1234", "info", "third"),
+    ]
+    assert updater.merged == 1
+    assert updater.sent == 3
+
+
+def test_update_keeps_queued_status_changes(gated):
+    with TaskUpdater("http://gman") as updater:
+        updater.update("5678", "info", "busy")
+        gated.started.wait(5)
+        updater.update("1234", "started", "starting")
+        updater.update("1234", "info", "first")
+        updater.update("1234", "delegated", "delegating")
+        updater.update("1234", "info", "second")
+        gated.release.set()
+
+    assert gated.calls == [
+        ("5678", "info", "busy"),
+        ("1234", "started", "starting"),
+        ("1234", "delegated", "delegating"),
+        ("1234", "info", "second"),
+    ]
+    assert updater.merged == 1
+
+
+def test_terminal_update_ordered_and_synchronous(gated):
+    with TaskUpdater("http://gman") as updater:
+        updater.update("1234", "info", "first")
+        gated.started.wait(5)
+        updater.update("1234", "info", "superseded")
+        threading.Timer(0.1, gated.release.set).start()
+
+        assert updater.update("1234", "completed", "done") == {"status": "completed"}
+        assert gated.calls == [
+            ("1234", "info", "first"),
+            ("1234", "completed", "done"),
+        ]
+
+
+def test_updates_after_terminal_are_dropped(gated):
+    gated.release.set()
+    with TaskUpdater("http://gman") as updater:
+        updater.update("1234", "completed", "done")
+        updater.update("1234", "info", "late")
+        updater.update("5678", "info", "other")
+
+    assert gated.calls == [("1234", "completed", "done"), ("5678", "info", "other")]
+    assert updater.dropped == 1
+
+
+class RecordedSet(set):
+    """A set signalling every add"""
+
+    def __init__(self):
+        super().__init__()
+        self.added = threading.Event()
+
+    def add(self, item):
+        super().add(item)
+        self.added.set()
+
+
+def test_update_racing_terminal_is_not_sent_after_it(gated):
+    with TaskUpdater("http://gman") as updater:
+        updater._terminal = terminal_tasks = RecordedSet()
+        updater.update("1234", "info", "first")
+        gated.started.wait(5)
+        terminal = threading.Thread(
+            target=updater.update, args=("1234", "completed", "done")
+        )
+        terminal.start()
+        # The terminal update is waiting for "first" to be sent
+        assert terminal_tasks.added.wait(5)
+        updater.update("1234", "info", "racing")
+        gated.release.set()
+        terminal.join(5)
+
+    assert gated.calls == [("1234", "info", "first"), ("1234", "completed", "done")]
+
+
+def test_terminal_update_raises(mocker):
+    mocker.patch(
+        "piperci.gman.updater.client.update_task_id",
+        side_effect=requests.exceptions.HTTPError,
+    )
+    with TaskUpdater("http://gman") as updater:
+        updater.update("1234", "info", "ignored")
+        updater.flush(5)
+        assert updater.errors == 1
+        with pytest.raises(requests.exceptions.HTTPError):
+            updater.update("1234", "failed", "boom")
+
+
+def test_close_drains(gated):
+    updater = TaskUpdater("http://gman")
+    for task_id in range(5):
+        updater.update(str(task_id), "info", "working")
+    gated.release.set()
+    updater.close()
+
+    assert len(gated.calls) + updater.merged == 5
+    with pytest.raises(RuntimeError):
+        updater.update("1234", "info", "late")
+
+
+def test_updater_against_standin():
+    standin = pytest.importorskip("piperci.gman.standin")
+    with standin.GManStandIn() as gman, TaskUpdater(gman.url) as updater:
+        task_id = client.request_new_task_id(
+            run_id="1234",
+            project="test",
+            caller="pytest",
+            status="started",
+            gman_url=gman.url,
+        )["task"]["task_id"]
+        updater.update(task_id, "info", "working")
+        updater.flush(5)
+        updater.update(task_id, "completed", "done")
+
+        events = client.get_task_id_events(task_id=task_id, gman_url=gman.url)
+    assert [event["status"] for event in events] == ["started", "info", "completed"]
@@ -0,0 +1,141 @@
+import asyncio
+import pytest
+
+from piperci.resilience import (
+    OK,
+    TRANSIENT,
+    UNSENT,
+    CircuitBreaker,
+    CircuitOpenError,
+    Resilience,
+    RetryBudget,
+    RetryPolicy,
+)
+
+
+class Flaky:
+    """Fails with the given outcomes, then succeeds"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.outcomes:
+            raise RuntimeError(self.outcomes.pop(0))
+        return "done"
+
+
+def classify(result, error):
+    return OK if error is None else str(error)
+
+
+@pytest.fixture
+def resilience():
+    return Resilience(RetryPolicy(attempts=3, backoff=0), failure_threshold=3)
+
+
+def test_retries_transient_failures(resilience):
+    fn = Flaky(TRANSIENT, UNSENT)
+
+    assert resilience.call("http://gman", fn, "GET", classify=classify) == "done"
+    assert fn.calls == 3
+
+
+def test_gives_up_after_attempts(resilience):
+    fn = Flaky(TRANSIENT, TRANSIENT, TRANSIENT, TRANSIENT)
+
+    with pytest.raises(RuntimeError):
+        resilience.call("http://gman", fn, "GET", classify=classify)
+    assert fn.calls == 3
+
+
+@pytest.mark.parametrize("outcome,calls", [(TRANSIENT, 1), (UNSENT, 2)])
+def test_non_idempotent_only_retries_unsent(resilience, outcome, calls):
+    fn = Flaky(outcome)
+
+    try:
+        resilience.call("http://gman", fn, "POST", classify=classify)
+    except RuntimeError:
+        pass
+    assert fn.calls == calls
+
+
+def test_results_are_retried_and_discarded(resilience):
+    results = iter([503, 503, 200])
+    discarded = []
+
+    result = resilience.call(
+        "http://gman",
+        lambda: next(results),
+        classify=lambda r, e: TRANSIENT if r >= 500 else OK,
+        discard=discarded.append,
+    )
+
+    assert result == 200
+    assert discarded == [503, 503]
+
+
+def test_circuit_opens_per_endpoint(resilience):
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            resilience.call("http://gman", Flaky(TRANSIENT), "POST", classify=classify)
+
+    fn = Flaky()
+    with pytest.raises(CircuitOpenError):
+        resilience.call("http://gman", fn, classify=classify)
+    assert fn.calls == 0
+    assert resilience.call("http://minio", fn, classify=classify) == "done"
+
+
+def test_circuit_half_open_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.reset_timeout = 60
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.allow() > 0
+
+    breaker.reset_timeout = 0
+    assert breaker.allow() == 0
+    breaker.record_failure()
+    assert breaker.state in ("open", "half-open")
+
+    assert breaker.allow() == 0
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, min_retries=1)
+    for _ in range(4):
+        budget.record_request()
+
+    assert [budget.try_retry() for _ in range(4)] == [True, True, True, False]
+
+
+def test_retry_budget_stops_retry_storm():
+    resilience = Resilience(
+        RetryPolicy(attempts=5, backoff=0), failure_threshold=100, min_retries=2,
+        budget_ratio=0,
+    )
+    fns = [Flaky(*[TRANSIENT] * 4) for _ in range(3)]
+
+    for fn in fns:
+        with pytest.raises(RuntimeError):
+            resilience.call("http://gman", fn, classify=classify)
+
+    assert [fn.calls for fn in fns] == [3, 1, 1]
+
+
+def test_call_async(resilience):
+    fn = Flaky(TRANSIENT)
+
+    async def call():
+        return fn()
+
+    result = asyncio.run(resilience.call_async("http://gman", call, classify=classify))
+
+    assert result == "done"
+    assert fn.calls == 2
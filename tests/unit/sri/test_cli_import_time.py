@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+# Cumulative import time budget for piperci.cli.sri in microseconds. Generous
+# so slow CI machines pass, the module set assertions catch real regressions.
+IMPORT_BUDGET_US = 12000
+
+urlsafe_sri = 'c2hhMjU2LUJvWk0wRWh4Mkw1YUVyWmlxMnFWRFphQU4zdmhtb040T0tDbUl1Ti9WeTg9'
+
+
+def _importtime(code):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True,
+                            env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'))
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports[name.strip()] = int(cumulative)
+    return imports, result.stdout
+
+
+def test_cli_import_is_lazy():
+    imports, _ = _importtime('import piperci.cli.sri')
+
+    assert 'hashlib' not in imports
+    assert 'subresource_integrity' not in imports
+    assert 'piperci.tracing' not in imports
+    assert 'logging' not in imports
+    assert imports['piperci.cli.sri'] < IMPORT_BUDGET_US
+
+
+def test_cli_decode_avoids_hashlib():
+    code = ('import sys\n'
+            f'sys.argv = ["sritool", "decode", "{urlsafe_sri}"]\n'
+            'from piperci.cli import sri\n'
+            'sri.main()\n'
+            'print("hashlib" in sys.modules)\n')
+    imports, stdout = _importtime(code)
+
+    assert 'hashlib' not in imports
+    assert stdout.splitlines() == [
+        'sha256-BoZM0Ehx2L5aErZiq2qVDZaAN3vhmoN4OKCmIuN/Vy8=', 'False']
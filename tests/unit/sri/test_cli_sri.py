@@ -1,6 +1,10 @@
+import csv
+import io
+import json
 import os
 import pytest
 
+import piperci.sri as sritool
 from piperci.cli import sri
 
 
@@ -29,6 +33,12 @@ fail_cases = [
       'sha256-CXS0O7OjESVro+DicbpxpvZPeBy2jTJ/CuQJnScABWs='],
      '!='
      ),
+    (['sritool', 'generate', '--dgst', 'nope', test_file],
+     "invalid choice: 'nope'"),
+    (['sritool', 'generate', '--dgst', 'md5', test_file],
+     "invalid choice: 'md5'"),
+    (['sritool', 'generate'], 'required: file or --from-file'),
+    (['sritool', 'generate', '--from-file', '-', test_file], 'not allowed'),
 ]
 
 
@@ -52,3 +62,141 @@ def test_usage_errors(argv, stderr_val, capsys, monkeypatch):
     captured = capsys.readouterr()
 
     assert stderr_val in captured.err
+
+
+TEST_SRI = 'sha256-BoZM0Ehx2L5aErZiq2qVDZaAN3vhmoN4OKCmIuN/Vy8='
+
+
+@pytest.fixture
+def stdin(monkeypatch):
+    def _stdin(data):
+        monkeypatch.setattr('sys.stdin', io.TextIOWrapper(io.BytesIO(data)))
+    return _stdin
+
+
+def test_generate_stdin(stdin, capsys, monkeypatch):
+    with open(test_file, 'rb') as f:
+        stdin(f.read())
+    monkeypatch.setattr('sys.argv', ['sritool', 'generate', '-'])
+
+    sri.main()
+
+    assert capsys.readouterr().out.strip() == TEST_SRI
+
+
+def test_verify_stdin(stdin, capsys, monkeypatch):
+    with open(test_file, 'rb') as f:
+        stdin(f.read())
+    monkeypatch.setattr('sys.argv', ['sritool', 'verify', '-', TEST_SRI])
+
+    sri.main()
+
+    assert TEST_SRI in capsys.readouterr().out
+
+
+def test_generate_tee(stdin, capfdbinary, monkeypatch):
+    with open(test_file, 'rb') as f:
+        data = f.read()
+    stdin(data)
+    monkeypatch.setattr('sys.argv', ['sritool', 'generate', '--tee', '-'])
+    monkeypatch.setattr('sys.stdout', io.TextIOWrapper(io.FileIO(1, 'w',
+                                                                 closefd=False)))
+
+    sri.main()
+    captured = capfdbinary.readouterr()
+
+    assert captured.out == data
+    assert captured.err.decode().strip() == TEST_SRI
+
+
+@pytest.mark.parametrize('null', [False, True])
+def test_generate_from_file(null, stdin, capsys, monkeypatch, tmp_path):
+    other = tmp_path / 'other file.txt'
+    other.write_bytes(b'other')
+    sep = b'\0' if null else b'\n'
+    stdin(sep.join([test_file.encode(), b'', str(other).encode()]) + sep)
+    argv = ['sritool', 'generate', '--from-file', '-'] + (['-0'] if null else [])
+    monkeypatch.setattr('sys.argv', argv)
+
+    sri.main()
+    lines = capsys.readouterr().out.splitlines()
+
+    assert lines == [f'{TEST_SRI}  {test_file}',
+                     f'{sritool.generate_sri(str(other))}  {other}']
+
+
+def test_generate_stream_matches_file():
+    with open(test_file, 'rb') as f:
+        assert str(sritool.generate_sri_stream(f)) == TEST_SRI
+
+
+@pytest.fixture
+def sri_list(tmp_path):
+    other = tmp_path / 'other.txt'
+    other.write_bytes(b'other')
+    sri_list = tmp_path / 'list.txt'
+    sri_list.write_text(f'{TEST_SRI}  {other}\n'
+                        f'{TEST_SRI}  {test_file}\n'
+                        f'{TEST_SRI}  {tmp_path / "missing.txt"}\n')
+    return sri_list
+
+
+@pytest.mark.parametrize('keep_going', [False, True])
+def test_verify_jsonl(keep_going, sri_list, capsys, monkeypatch):
+    argv = ['sritool', 'verify', '--format', 'jsonl', '--from-file', str(sri_list)]
+    monkeypatch.setattr('sys.argv', argv + (['--keep-going'] if keep_going else []))
+
+    with pytest.raises(SystemExit) as exit:
+        sri.main()
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert exit.value.code == 1
+    assert records[0]['ok'] is False
+    assert records[0]['bytes'] == 5
+    assert records[0]['expected'] == TEST_SRI
+    if not keep_going:
+        assert [r['type'] for r in records] == ['file', 'summary']
+        return
+    assert records[1]['ok'] is True
+    assert records[1]['sri'] == TEST_SRI
+    assert 'FileNotFoundError' in records[2]['error']
+    assert records[3]['type'] == 'summary'
+    assert records[3]['files'] == 3
+    assert records[3]['failures'] == 2
+    assert records[3]['bytes'] == 5 + os.path.getsize(test_file)
+
+
+def test_generate_csv(capsys, monkeypatch):
+    argv = ['sritool', 'generate', '--format', 'csv', test_file]
+    monkeypatch.setattr('sys.argv', argv)
+
+    sri.main()
+    rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+
+    assert [row['type'] for row in rows] == ['file', 'summary']
+    assert rows[0]['sri'] == TEST_SRI
+    assert rows[0]['path'] == test_file
+    assert rows[1]['files'] == '1'
+    assert rows[1]['failures'] == '0'
+
+
+def test_generate_json(capsys, monkeypatch):
+    argv = ['sritool', 'generate', '--format', 'json', test_file]
+    monkeypatch.setattr('sys.argv', argv)
+
+    sri.main()
+    output = json.loads(capsys.readouterr().out)
+
+    assert output['files'][0]['sri'] == TEST_SRI
+    assert output['summary']['bytes'] == os.path.getsize(test_file)
+    assert output['summary']['mb_per_s'] >= 0
+
+
+def test_backends(capsys, monkeypatch):
+    monkeypatch.setattr('sys.argv', ['sritool', 'backends', '--size', '1'])
+
+    sri.main()
+    rows = [line.split() for line in capsys.readouterr().out.splitlines()]
+
+    assert ['sha256', 'sri'] in [row[:2] for row in rows]
+    assert ['blake2b', 'internal'] in [row[:2] for row in rows]
@@ -1,5 +1,7 @@
 import base64
 import os
+import pickle
+import pytest
 
 from pytest import raises
 
@@ -7,6 +9,7 @@ from piperci import sri as sritool
 
 
 test_file = os.path.join(os.path.dirname(__file__), 'tst_file.txt')
+test_file_sri = 'sha256-BoZM0Ehx2L5aErZiq2qVDZaAN3vhmoN4OKCmIuN/Vy8='
 
 
 def test_hash_to_urlsafeb64(sri_obj, sri_urlsafe):
@@ -72,6 +75,14 @@ def test_hash_file_bad_dgst():
         sritool.hash_file('sha3245455', test_file)
 
 
+def test_unregistered_dgst_is_rejected():
+    with raises(ValueError):
+        sritool.generate_sri(test_file, dgst='md5')
+    with raises(ValueError):
+        sritool.sri_to_hash('md5-57ugThFgAvzdERYx6j3wlQ==')
+    assert 'md5' not in sritool.digest_algorithms()
+
+
 def test_b64_hash(sri):
 
     parts = sri.split('-')
@@ -95,3 +106,112 @@ def test_generate_sri_url_safe():
 def test_sri_to_hash(sri):
 
     assert str(sritool.sri_to_hash(sri)) == sri
+
+
+def test_urlsafe_to_sri(sri, sri_urlsafe):
+    assert sritool.urlsafe_to_sri(sri_urlsafe) == sri
+
+
+def test_urlsafe_to_sri_invalid():
+    with raises(ValueError):
+        sritool.urlsafe_to_sri(base64.urlsafe_b64encode(b'md5-abcd'))
+
+
+def test_sri_backends_are_default():
+    backends = sritool.digest_backends()
+
+    assert {name for name, sri in backends.items() if sri} == set(
+        sritool.SRI_ALGORITHMS)
+    assert backends['blake2b'] is False
+
+
+def test_generate_sri_internal_backend():
+    hash = sritool.generate_sri(test_file, dgst='blake2s')
+
+    assert isinstance(hash, sritool.DigestHash)
+    assert str(hash).startswith('blake2s-')
+    assert sritool.sri_to_hash(str(hash)) == hash
+    assert sritool.urlsafe_to_hash(sritool.hash_to_urlsafeb64(hash)) == hash
+    assert sritool.urlsafe_to_sri(sritool.hash_to_urlsafeb64(hash)) == str(hash)
+
+
+def test_sri_to_hashes_orders_sri_first():
+    sha = str(sritool.generate_sri(test_file))
+    blake = str(sritool.generate_sri(test_file, dgst='blake2b'))
+
+    hashes = sritool.sri_to_hashes(f'{blake} {sha}')
+
+    assert [h.algorithm for h in hashes] == ['sha256', 'blake2b']
+
+
+def test_register_backend(monkeypatch):
+    class Length:
+        def __init__(self):
+            self.size = 0
+
+        def update(self, data):
+            self.size += len(data)
+
+        def digest(self):
+            return self.size.to_bytes(8, 'big')
+
+    def missing():
+        raise ImportError('not installed')
+
+    monkeypatch.setattr(sritool, '_BACKENDS', dict(sritool._BACKENDS))
+    sritool.register_backend('length', Length)
+    sritool.register_backend('missing', missing)
+
+    assert 'missing' not in sritool.digest_backends()
+    assert sritool.hash_file('length', test_file) == os.path.getsize(
+        test_file).to_bytes(8, 'big')
+    assert set(sritool.benchmark_backends(size=1024, rounds=1)) == set(
+        sritool.digest_backends())
+
+
+def test_xxhash_backend():
+    xxhash = pytest.importorskip('xxhash')
+
+    with open(test_file, 'rb') as f:
+        expected = xxhash.xxh3_128(f.read()).digest()
+
+    assert sritool.hash_file('xxh3_128', test_file) == expected
+
+
+def test_generate_sri_result_is_lazy():
+    sri = test_file_sri
+    result = sritool.generate_sri(test_file)
+
+    assert isinstance(result, sritool.SRIResult)
+    assert result._sri is None
+    assert result.algorithm == 'sha256'
+    assert str(result) == sri
+    assert str(result) is str(result)
+    assert result.urlsafe == sritool.hash_to_urlsafeb64(sritool.sri_to_hash(sri))
+    assert result.to_hash() == sritool.sri_to_hash(sri)
+
+
+def test_sri_result_compares_digests():
+    sri = test_file_sri
+    result = sritool.generate_sri(test_file)
+
+    assert result == sritool.sri_to_hash(sri)
+    assert sritool.sri_to_hash(sri) == result
+    assert hash(result) == hash(sritool.sri_to_hash(sri))
+    assert result != sritool.SRIResult('sha384', result.digest)
+    assert result != sri
+    assert str(result) == sri
+    assert result != sritool.generate_sri(test_file, dgst='blake2b')
+    assert len({result, sritool.generate_sri(test_file)}) == 1
+
+
+def test_sri_result_types():
+    integrity = pytest.importorskip('subresource_integrity')
+    result = sritool.generate_sri(test_file)
+    blake2b = sritool.generate_sri(test_file, dgst='blake2b')
+
+    assert isinstance(result, integrity.Hash)
+    assert not isinstance(blake2b, integrity.Hash)
+    assert isinstance(blake2b, sritool.DigestHash)
+    assert pickle.loads(pickle.dumps(result)) == result
+    assert type(pickle.loads(pickle.dumps(result))) is type(result)
@@ -0,0 +1,64 @@
+import os
+import pytest
+
+from piperci import sri as sritool
+from piperci.cli import sri
+from piperci.sri_pool import DigestPool, hash_files
+
+
+@pytest.fixture
+def tree(tmp_path):
+    paths = []
+    for i in range(10):
+        path = tmp_path / f'file{i}'
+        path.write_bytes(os.urandom(i * 100))
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize('dgst', ['sha256', 'blake2b'])
+def test_hash_files(dgst, tree):
+    batches = list(hash_files(tree, dgst=dgst, workers=2, batch_size=3))
+
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+    results = [(path, batch.sri(index), batch.sizes[index])
+               for batch in batches for index, path in enumerate(batch.paths)]
+    assert results == [(path, sritool.generate_sri(path, dgst=dgst),
+                        os.path.getsize(path)) for path in tree]
+
+
+def test_hash_files_errors(tree):
+    missing = tree[0] + '.missing'
+
+    with DigestPool(workers=1) as pool:
+        batch, = pool.hash_files([tree[1], missing, tree[2]])
+
+    assert list(batch.errors) == [1]
+    assert 'FileNotFoundError' in batch.errors[1]
+    assert batch.digest(1) is None
+    assert batch.sri(1) is None
+    assert batch.sri(2, url_safe=True) == sritool.generate_sri(tree[2], url_safe=True)
+
+
+def test_close_cancels_pending_batches(tree):
+    pool = DigestPool(workers=1)
+    batches = pool.hash_files(tree, batch_size=1)
+    next(batches)
+    submitted = list(pool._futures)
+
+    pool.close()
+
+    assert submitted and all(future.done() for future in submitted)
+    assert pool._executor is None
+
+
+def test_generate_jobs(tree, tmp_path, capsys, monkeypatch):
+    path_list = tmp_path / 'list.txt'
+    path_list.write_text('\n'.join(tree))
+    monkeypatch.setattr('sys.argv', ['sritool', 'generate', '-j', '2',
+                                     '--from-file', str(path_list)])
+
+    sri.main()
+
+    assert capsys.readouterr().out.splitlines() == [
+        f'{sritool.generate_sri(path)}  {path}' for path in tree]
@@ -0,0 +1,139 @@
+import os
+import pytest
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from piperci import sri as sritool
+from piperci.cli import sri
+from piperci.sri_server import SRIClient, SRIServer, SRIServerError
+
+
+test_file = os.path.join(os.path.dirname(__file__), 'tst_file.txt')
+test_sri = 'sha256-BoZM0Ehx2L5aErZiq2qVDZaAN3vhmoN4OKCmIuN/Vy8='
+test_urlsafe = 'c2hhMjU2LUJvWk0wRWh4Mkw1YUVyWmlxMnFWRFphQU4zdmhtb040T0tDbUl1Ti9WeTg9'
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = SRIServer(os.path.join(tmp_path, 'sritool.sock'))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def client(server):
+    with SRIClient(server.socket_path) as client:
+        yield client
+
+
+def test_generate(client):
+    assert client.generate(test_file) == test_sri
+    assert client.generate(test_file, url_safe=True) == test_urlsafe
+
+
+def test_generate_cached(client, server, tmp_path, mocker):
+    spy = mocker.spy(sritool, 'hash_file')
+    path = os.path.join(tmp_path, 'file.txt')
+    with open(path, 'w') as f:
+        f.write('test')
+
+    first = client.generate(path)
+    assert client.generate(path) == first
+    assert spy.call_count == 1
+
+    with open(path, 'w') as f:
+        f.write('changed')
+    assert client.generate(path) != first
+    assert spy.call_count == 2
+
+
+def test_generate_cached_same_size_rewrite(client, tmp_path):
+    path = os.path.join(tmp_path, 'file.txt')
+    with open(path, 'w') as f:
+        f.write('test')
+    first = client.generate(path)
+    st = os.stat(path)
+
+    with open(path, 'w') as f:
+        f.write('tset')
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    assert client.generate(path) != first
+
+
+def test_verify(client):
+    assert client.verify(test_file, test_sri)['match']
+    assert client.verify(test_file, test_urlsafe, url_safe=True)['match']
+    assert not client.verify(
+        test_file, 'sha256-CXS0O7OjESVro+DicbpxpvZPeBy2jTJ/CuQJnScABWs=')['match']
+
+
+def test_errors(client):
+    with pytest.raises(SRIServerError):
+        client.generate('./tst_none.txt')
+    with pytest.raises(SRIServerError):
+        client.request(op='nope')
+    assert client.generate(test_file) == test_sri
+
+
+def test_concurrent_clients(server):
+    def generate(_):
+        with SRIClient(server.socket_path) as client:
+            return [client.generate(test_file) for _ in range(10)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(generate, range(16)))
+    assert all(r == [test_sri] * 10 for r in results)
+
+
+def test_stale_socket_removed(tmp_path):
+    path = os.path.join(tmp_path, 'sritool.sock')
+    SRIServer(path).socket.close()
+    assert os.path.exists(path)
+    server = SRIServer(path)
+    server.server_close()
+    assert not os.path.exists(path)
+
+
+def test_regular_file_not_removed(tmp_path):
+    path = os.path.join(tmp_path, 'data.txt')
+    with open(path, 'w') as f:
+        f.write('test')
+
+    with pytest.raises(SRIServerError):
+        SRIServer(path)
+    with open(path) as f:
+        assert f.read() == 'test'
+
+
+def test_socket_in_use(server):
+    with pytest.raises(SRIServerError):
+        SRIServer(server.socket_path)
+
+
+@pytest.mark.parametrize('argv,stdout_val', [
+    (['generate', test_file], test_sri),
+    (['--url-safe', 'generate', test_file], test_urlsafe),
+    (['verify', test_file, test_sri], f'{test_sri}\nurlsafeb64: {test_urlsafe}'),
+])
+def test_cli_client(server, argv, stdout_val, capsys, monkeypatch):
+    monkeypatch.setattr('sys.argv', ['sritool', '--socket', server.socket_path] + argv)
+
+    sri.main()
+    assert stdout_val in capsys.readouterr().out
+
+
+def test_cli_client_verify_fails(server, capsys, monkeypatch):
+    monkeypatch.setenv('SRITOOL_SOCKET', server.socket_path)
+    monkeypatch.setattr('sys.argv', [
+        'sritool', 'verify', test_file,
+        'sha256-CXS0O7OjESVro+DicbpxpvZPeBy2jTJ/CuQJnScABWs='])
+
+    with pytest.raises(SystemExit):
+        sri.main()
+    assert '!=' in capsys.readouterr().err
@@ -1,4 +1,6 @@
 import pytest
+
+from piperci.storeman import client
 from urllib.parse import urlparse
 
 
@@ -15,3 +17,28 @@ def minio_bucket_with_files(s3_bucket):
     object = s3_bucket.client.Object(bucket, "test")
     object.put(Body="test")
     return bucket
+
+
+@pytest.fixture(autouse=True)
+def clear_storage_clients():
+    yield
+    client.clear_storage_clients()
+
+
+@pytest.fixture
+def s3_standin():
+    from s3_standin import S3StandIn
+
+    server = S3StandIn(page_size=2).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def standin_storecli(s3_standin):
+    return client.storage_client(
+        storage_type="minio",
+        hostname=s3_standin.hostname,
+        access_key="MINIO_TEST_ACCESS",
+        secret_key="MINIO_TEST_SECRET",
+    )
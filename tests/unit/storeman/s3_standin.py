@@ -0,0 +1,289 @@
+"""
+Minimal in-memory S3 stand-in served by aiohttp on a background thread.
+
+Implements just enough of the S3 API for the storeman clients: bucket
+creation, object PUT/GET/HEAD, multipart uploads with ListParts and
+UploadPartCopy, CopyObject and ListObjectsV2. Request
+signatures are not checked.
+"""
+import asyncio
+import hashlib
+import threading
+import uuid
+
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from urllib.parse import unquote
+from xml.etree import ElementTree
+
+from aiohttp import web
+
+NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+def _xml(root, namespace=NS, **children):
+    element = ElementTree.Element(root, xmlns=namespace)
+    for tag, text in children.items():
+        ElementTree.SubElement(element, tag).text = text
+    return ElementTree.tostring(element)
+
+
+def _error(status, code):
+    body = _xml("Error", namespace="", Code=code, Message=code)
+    return web.Response(status=status, body=body)
+
+
+class StoredObject:
+    def __init__(self, data, metadata=None):
+        self.data = data
+        self.metadata = metadata or {}
+        self.etag = hashlib.md5(data).hexdigest()
+        self.last_modified = datetime.now(timezone.utc)
+
+    def headers(self):
+        headers = {
+            "ETag": f'"{self.etag}"',
+            "Last-Modified": format_datetime(self.last_modified, usegmt=True),
+            "Content-Type": "binary/octet-stream",
+        }
+        headers.update(self.metadata)
+        return headers
+
+
+class S3StandIn:
+    def __init__(self, page_size=1000, max_copy_size=5 * 1024 ** 3):
+        self.page_size = page_size
+        # CopyObject refuses larger sources, as S3 does above 5 GB
+        self.max_copy_size = max_copy_size
+        self.buckets = {}
+        self.uploads = {}
+        self.requests = []
+        # Statuses to answer the next object requests with, for failure injection
+        self.failures = []
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    @property
+    def hostname(self):
+        return f"127.0.0.1:{self.port}"
+
+    def start(self):
+        app = web.Application(client_max_size=1024 ** 3)
+        app.router.add_route("*", "/{bucket}", self.handle_bucket)
+        app.router.add_route("*", "/{bucket}/", self.handle_bucket)
+        app.router.add_route("*", "/{bucket}/{key:.+}", self.handle_object)
+        self.runner = web.AppRunner(app)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+        return self
+
+    async def _start(self):
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def started_uploads(self):
+        """The keys multipart uploads were started for, in order"""
+        return [
+            unquote(path.split("?")[0]).split("/", 2)[2]
+            for method, path in self.requests
+            if method == "POST" and path.endswith("?uploads=")
+        ]
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    async def handle_bucket(self, request):
+        self.requests.append((request.method, request.path_qs))
+        bucket = request.match_info["bucket"]
+        if request.method == "PUT":
+            if bucket in self.buckets:
+                return _error(409, "BucketAlreadyOwnedByYou")
+            self.buckets[bucket] = {}
+            return web.Response()
+        if bucket not in self.buckets:
+            return _error(404, "NoSuchBucket")
+        if "location" in request.query:
+            return web.Response(body=_xml("LocationConstraint"))
+        return self.list_objects(bucket, request.query)
+
+    def list_objects(self, bucket, query):
+        prefix = query.get("prefix", "")
+        marker = query.get("continuation-token") or query.get("start-after", "")
+        delimiter = query.get("delimiter")
+        entries = []
+        for key in sorted(self.buckets[bucket]):
+            if not key.startswith(prefix) or key <= marker:
+                continue
+            rest = key[len(prefix):]
+            if delimiter and delimiter in rest:
+                common = prefix + rest.split(delimiter)[0] + delimiter
+                if entries and entries[-1] == (common, None):
+                    continue
+                if marker.startswith(common):
+                    continue
+                entries.append((common, None))
+            else:
+                entries.append((key, self.buckets[bucket][key]))
+
+        page = entries[: self.page_size]
+        truncated = len(entries) > self.page_size
+        root = ElementTree.Element("ListBucketResult", xmlns=NS)
+        ElementTree.SubElement(root, "Name").text = bucket
+        ElementTree.SubElement(root, "IsTruncated").text = str(truncated).lower()
+        if truncated:
+            last = page[-1][0]
+            ElementTree.SubElement(root, "NextContinuationToken").text = last
+        for key, obj in page:
+            if obj is None:
+                common = ElementTree.SubElement(root, "CommonPrefixes")
+                ElementTree.SubElement(common, "Prefix").text = key
+                continue
+            contents = ElementTree.SubElement(root, "Contents")
+            ElementTree.SubElement(contents, "Key").text = key
+            ElementTree.SubElement(contents, "LastModified").text = (
+                obj.last_modified.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            )
+            ElementTree.SubElement(contents, "ETag").text = f'"{obj.etag}"'
+            ElementTree.SubElement(contents, "Size").text = str(len(obj.data))
+        return web.Response(body=ElementTree.tostring(root))
+
+    async def handle_object(self, request):
+        self.requests.append((request.method, request.path_qs))
+        if self.failures:
+            return _error(self.failures.pop(0), "SlowDown")
+        return await self.object_request(request)
+
+    async def object_request(self, request):
+        bucket = request.match_info["bucket"]
+        key = request.match_info["key"]
+        if bucket not in self.buckets:
+            return _error(404, "NoSuchBucket")
+        objects = self.buckets[bucket]
+        query = request.query
+
+        if request.method == "POST" and "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            self.uploads[upload_id] = ({}, self._metadata(request))
+            return web.Response(
+                body=_xml("InitiateMultipartUploadResult", UploadId=upload_id)
+            )
+        if "uploadId" in query:
+            return await self.upload_request(request, objects, key)
+        if request.method == "PUT" and "X-Amz-Copy-Source" in request.headers:
+            return self.copy_object(request, objects, key)
+        if request.method == "PUT":
+            objects[key] = StoredObject(await request.read(), self._metadata(request))
+            return web.Response(headers={"ETag": objects[key].etag})
+        if request.method == "DELETE":
+            objects.pop(key, None)
+            return web.Response(status=204)
+
+        if key not in objects:
+            return _error(404, "NoSuchKey")
+        return self.get_object(request, objects[key])
+
+    def get_object(self, request, obj):
+        data = obj.data
+        status = 200
+        if "Range" in request.headers:
+            start, _, end = request.headers["Range"][len("bytes="):].partition("-")
+            end = int(end) if end else len(data) - 1
+            data = data[int(start): end + 1]
+            status = 206
+        headers = obj.headers()
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(data))
+            return web.Response(status=status, headers=headers)
+        return web.Response(status=status, headers=headers, body=data)
+
+    async def upload_request(self, request, objects, key):
+        upload_id = request.query["uploadId"]
+        if request.method == "POST":
+            return await self.complete_upload(request, objects, key)
+        if request.method == "DELETE":
+            self.uploads.pop(upload_id, None)
+            return web.Response(status=204)
+        if request.method == "PUT" and "X-Amz-Copy-Source" in request.headers:
+            return self.copy_part(request, upload_id)
+        if request.method == "PUT":
+            part = await request.read()
+            parts, _ = self.uploads[upload_id]
+            parts[int(request.query["partNumber"])] = part
+            return web.Response(headers={"ETag": hashlib.md5(part).hexdigest()})
+        return self.list_parts(upload_id)
+
+    def list_parts(self, upload_id):
+        if upload_id not in self.uploads:
+            return _error(404, "NoSuchUpload")
+        parts, _ = self.uploads[upload_id]
+        root = ElementTree.Element("ListPartsResult", xmlns=NS)
+        ElementTree.SubElement(root, "IsTruncated").text = "false"
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        for number in sorted(parts):
+            part = ElementTree.SubElement(root, "Part")
+            ElementTree.SubElement(part, "PartNumber").text = str(number)
+            ElementTree.SubElement(part, "LastModified").text = now
+            ElementTree.SubElement(part, "ETag").text = (
+                f'"{hashlib.md5(parts[number]).hexdigest()}"'
+            )
+            ElementTree.SubElement(part, "Size").text = str(len(parts[number]))
+        return web.Response(body=ElementTree.tostring(root))
+
+    def _copy_source(self, request):
+        source = unquote(request.headers["X-Amz-Copy-Source"]).lstrip("/")
+        source_bucket, _, source_key = source.partition("/")
+        return self.buckets[source_bucket][source_key]
+
+    def copy_part(self, request, upload_id):
+        source = self._copy_source(request)
+        start, _, end = request.headers["X-Amz-Copy-Source-Range"][6:].partition("-")
+        part = source.data[int(start): int(end) + 1]
+        parts, _ = self.uploads[upload_id]
+        parts[int(request.query["partNumber"])] = part
+        body = _xml(
+            "CopyPartResult",
+            ETag=f'"{hashlib.md5(part).hexdigest()}"',
+            LastModified=source.last_modified.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        )
+        return web.Response(body=body)
+
+    def copy_object(self, request, objects, key):
+        source = self._copy_source(request)
+        if len(source.data) > self.max_copy_size:
+            return _error(400, "InvalidRequest")
+        metadata = source.metadata
+        if request.headers.get("X-Amz-Metadata-Directive") == "REPLACE":
+            metadata = self._metadata(request)
+        objects[key] = StoredObject(source.data, metadata)
+        body = _xml(
+            "CopyObjectResult",
+            ETag=f'"{objects[key].etag}"',
+            LastModified=objects[key].last_modified.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        )
+        return web.Response(body=body)
+
+    async def complete_upload(self, request, objects, key):
+        parts, metadata = self.uploads.pop(request.query["uploadId"])
+        body = ElementTree.fromstring(await request.read())
+        numbers = [int(e.text) for e in body.iter(f"{{{NS}}}PartNumber")]
+        objects[key] = StoredObject(b"".join(parts[n] for n in numbers), metadata)
+        body = _xml(
+            "CompleteMultipartUploadResult",
+            Location=f"/{request.match_info['bucket']}/{key}",
+            Bucket=request.match_info["bucket"],
+            Key=key,
+            ETag=f'"{objects[key].etag}"',
+        )
+        return web.Response(body=body)
+
+    @staticmethod
+    def _metadata(request):
+        return {
+            k: v
+            for k, v in request.headers.items()
+            if k.lower().startswith("x-amz-meta-") or k.lower() == "content-type"
+        }
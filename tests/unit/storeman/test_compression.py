@@ -0,0 +1,234 @@
+import asyncio
+import io
+import os
+
+import pytest
+
+from piperci import sri as sritool
+from piperci.storeman.client import storage_client
+from piperci.storeman.compression import (
+    CompressingReader,
+    DecompressingReader,
+    available_codecs,
+    object_codec,
+)
+from piperci.storeman.exceptions import IntegrityError
+from piperci.storeman.minio_client import object_sri
+
+DATA = b"".join(b"line %d of a build log\n" % i for i in range(10000))
+
+
+@pytest.fixture(params=["gzip", "zstd"])
+def codec(request):
+    if request.param not in available_codecs():
+        pytest.skip(f"{request.param} is not installed")
+    return request.param
+
+
+class Chunks:
+    """Stands in for an ObjectReader over data"""
+
+    chunk_size = 1000
+
+    def __init__(self, data):
+        self._reader = io.BytesIO(data)
+
+    def read(self, size):
+        return self._reader.read(size)
+
+    def iter_chunks(self, chunk_size=None):
+        return iter(lambda: self.read(chunk_size or self.chunk_size), b"")
+
+    def close(self):
+        pass
+
+
+def compress(data, codec):
+    return CompressingReader(io.BytesIO(data), codec, chunk_size=4096).read()
+
+
+def test_reader_round_trip(codec):
+    compressed = compress(DATA, codec)
+
+    assert len(compressed) < len(DATA) / 5
+    assert DecompressingReader(Chunks(compressed), codec).read() == DATA
+    chunks = DecompressingReader(Chunks(compressed), codec).iter_chunks()
+    assert b"".join(chunks) == DATA
+
+
+def test_truncated_stream(codec):
+    compressed = compress(DATA, codec)
+
+    with pytest.raises(IntegrityError):
+        DecompressingReader(Chunks(compressed[:-10]), codec).read()
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        CompressingReader(io.BytesIO(DATA), "lzma")
+
+
+def test_upload_stream_compressed(standin_storecli, s3_standin, codec, tmp_path):
+    stat = standin_storecli.upload_stream(
+        "testbucket", "test", io.BytesIO(DATA), length=len(DATA), compression=codec
+    )
+
+    stored = s3_standin.buckets["testbucket"]["test"]
+    assert len(stored.data) == stat.size < len(DATA) / 5
+    assert object_codec(stat.metadata) == codec
+    expected_sri = str(sritool.generate_sri_stream(io.BytesIO(DATA)))
+    assert object_sri(stat) == stat.sri == expected_sri
+
+    path = os.path.join(tmp_path, "test.log")
+    standin_storecli.download_file(
+        "minio://localhost/testbucket/test",
+        path,
+        expected_sri=stat.sri,
+        expected_size=len(DATA),
+    )
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    with standin_storecli.open_download("minio://localhost/testbucket/test") as r:
+        assert r.read() == DATA
+
+
+def test_client_compression_multipart(s3_standin, tmp_path):
+    storecli = storage_client(
+        storage_type="minio",
+        hostname=s3_standin.hostname,
+        access_key="MINIO_TEST_ACCESS",
+        secret_key="MINIO_TEST_SECRET",
+        compression="gzip",
+    )
+    data = os.urandom(100)
+    path = os.path.join(tmp_path, "test.bin")
+    with open(path, "wb") as f:
+        f.write(data)
+
+    stat = storecli.upload_file("testbucket", "test", path, part_size=32)
+
+    assert s3_standin.started_uploads()[0].startswith("test.")
+    assert list(s3_standin.buckets["testbucket"]) == ["test"]
+    assert object_codec(stat.metadata) == "gzip"
+    assert stat.sri == str(sritool.generate_sri(path))
+    storecli.download_file(
+        "minio://localhost/testbucket/test", path, expected_sri=stat.sri
+    )
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+
+def test_download_detects_corrupt_content(standin_storecli, s3_standin, tmp_path):
+    stat = standin_storecli.upload_stream(
+        "testbucket", "test", [DATA], compression="gzip"
+    )
+    stored = s3_standin.buckets["testbucket"]["test"]
+    stored.data = compress(DATA[:-1] + b"!", "gzip")
+    path = os.path.join(tmp_path, "test.log")
+
+    with pytest.raises(IntegrityError):
+        standin_storecli.download_file(
+            "minio://localhost/testbucket/test", path, expected_sri=stat.sri
+        )
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize("compression", [False, "none"])
+def test_upload_overrides_client_codec(s3_standin, compression):
+    storecli = storage_client(
+        storage_type="minio",
+        hostname=s3_standin.hostname,
+        access_key="MINIO_TEST_ACCESS",
+        secret_key="MINIO_TEST_SECRET",
+        compression="gzip",
+    )
+
+    stat = storecli.upload_stream(
+        "testbucket", "test", [DATA], compression=compression
+    )
+
+    assert object_codec(stat.metadata) is None
+    assert s3_standin.buckets["testbucket"]["test"].data == DATA
+
+
+@pytest.mark.parametrize("part_size", [1024 * 1024, 1024])
+def test_async_upload_compressed(s3_standin, codec, part_size, tmp_path):
+    storecli = storage_client(
+        storage_type="minio",
+        async_=True,
+        hostname=s3_standin.hostname,
+        access_key="MINIO_TEST_ACCESS",
+        secret_key="MINIO_TEST_SECRET",
+        compression=codec,
+    )
+    uri = "minio://localhost/testbucket/test"
+    path = os.path.join(tmp_path, "test.log")
+
+    async def transfer():
+        async with storecli:
+            record = await storecli.upload_stream(
+                "testbucket", "test", [DATA], length=len(DATA), part_size=part_size
+            )
+            await storecli.download_file(
+                uri, path, expected_sri=record.sri, expected_size=len(DATA)
+            )
+            async with storecli.open_download(uri) as reader:
+                head = await reader.read(10)
+                rest = b"".join([chunk async for chunk in reader.iter_chunks()])
+            return record, head + rest
+
+    record, data = asyncio.run(transfer())
+
+    assert data == DATA
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    stored = s3_standin.buckets["testbucket"]["test"]
+    assert len(stored.data) == record.size < len(DATA) / 5
+    assert object_codec(stored.metadata) == codec
+    assert record.sri == str(sritool.generate_sri_stream(io.BytesIO(DATA)))
+
+
+def test_async_upload_uncompressed_and_unknown_codec(s3_standin, tmp_path):
+    storecli = storage_client(
+        storage_type="minio",
+        async_=True,
+        hostname=s3_standin.hostname,
+        access_key="MINIO_TEST_ACCESS",
+        secret_key="MINIO_TEST_SECRET",
+        compression="gzip",
+    )
+
+    async def upload(compression):
+        async with storecli:
+            return await storecli.upload_stream(
+                "testbucket", "test", [DATA], compression=compression
+            )
+
+    asyncio.run(upload(False))
+    assert s3_standin.buckets["testbucket"]["test"].data == DATA
+    with pytest.raises(ValueError):
+        asyncio.run(upload("lzma"))
+
+
+def test_async_download_detects_truncated_content(
+    standin_storecli, s3_standin, tmp_path
+):
+    standin_storecli.upload_stream("testbucket", "test", [DATA], compression="gzip")
+    stored = s3_standin.buckets["testbucket"]["test"]
+    stored.data = stored.data[:-10]
+    storecli = storage_client(
+        storage_type="minio",
+        async_=True,
+        hostname=s3_standin.hostname,
+        access_key="MINIO_TEST_ACCESS",
+        secret_key="MINIO_TEST_SECRET",
+    )
+    path = os.path.join(tmp_path, "test.log")
+
+    async def download():
+        async with storecli:
+            await storecli.download_file("minio://localhost/testbucket/test", path)
+
+    with pytest.raises(IntegrityError):
+        asyncio.run(download())
+    assert not os.path.exists(path)
@@ -0,0 +1,159 @@
+import os
+
+import pytest
+
+from piperci.storeman.client import storage_client
+from piperci.storeman.journal import TransferJournal, part_digest
+from piperci.storeman.minio_client import DEFAULT_PART_SIZE, _MultipartUpload
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return TransferJournal(str(tmp_path / "journal"))
+
+
+@pytest.fixture
+def journal_storecli(s3_standin, tmp_path):
+    return storage_client(
+        storage_type="minio",
+        hostname=s3_standin.hostname,
+        access_key="MINIO_TEST_ACCESS",
+        secret_key="MINIO_TEST_SECRET",
+        journal_dir=str(tmp_path / "journal"),
+    )
+
+
+def part_puts(s3_standin):
+    return [r for r in s3_standin.requests if r[0] == "PUT" and "partNumber" in r[1]]
+
+
+def test_checkpoint_is_resumed(journal):
+    checkpoint = journal.open(kind="upload", object="test", size=30)
+    checkpoint.set(upload_id="1234")
+    checkpoint.record(1, 4, part_digest(b"test"), etag="abcd")
+
+    resumed = journal.open(kind="upload", object="test", size=30)
+
+    assert resumed.state == {"upload_id": "1234"}
+    assert resumed.matches(1, b"test")
+    assert not resumed.matches(1, b"tset")
+    assert resumed.parts[1]["etag"] == "abcd"
+    assert not journal.open(kind="upload", object="test", size=31).parts
+
+
+def test_checkpoint_ignores_torn_line(journal):
+    checkpoint = journal.open(object="test")
+    checkpoint.record(1, 4, part_digest(b"test"))
+    with open(checkpoint.path, "a") as f:
+        f.write('{"part": 2, "si')
+
+    assert list(journal.open(object="test").parts) == [1]
+
+
+def test_gc_removes_stale_checkpoints(journal):
+    stale = journal.open(object="stale")
+    stale.set(upload_id="1234")
+    fresh = journal.open(object="fresh")
+    os.utime(stale.path, (0, 0))
+
+    (removed,) = journal.gc()
+
+    assert removed.identity == {"object": "stale"}
+    assert removed.state == {"upload_id": "1234"}
+    assert not os.path.exists(stale.path)
+    assert os.path.exists(fresh.path)
+
+
+def test_upload_file_resumes_parts(journal_storecli, s3_standin, tmp_path, mocker):
+    path = tmp_path / "test.bin"
+    path.write_bytes(bytes(range(30)))
+    complete = mocker.patch.object(
+        _MultipartUpload, "complete", side_effect=ConnectionError
+    )
+    with pytest.raises(ConnectionError):
+        journal_storecli.upload_file("testbucket", "test", str(path), part_size=8)
+    assert len(part_puts(s3_standin)) == 4
+
+    complete.side_effect = None
+    mocker.stopall()
+    s3_standin.requests.clear()
+    stat = journal_storecli.upload_file("testbucket", "test", str(path), part_size=8)
+
+    assert not part_puts(s3_standin)
+    assert stat.size == 30
+    assert s3_standin.buckets["testbucket"]["test"].data == bytes(range(30))
+    assert not os.listdir(journal_storecli.journal.directory)
+
+
+def test_upload_file_restarts_changed_file(
+    journal_storecli, s3_standin, tmp_path, mocker
+):
+    path = tmp_path / "test.bin"
+    path.write_bytes(bytes(range(30)))
+    mocker.patch.object(_MultipartUpload, "complete", side_effect=ConnectionError)
+    with pytest.raises(ConnectionError):
+        journal_storecli.upload_file("testbucket", "test", str(path), part_size=8)
+
+    mocker.stopall()
+    path.write_bytes(bytes(range(1, 31)))
+    s3_standin.requests.clear()
+    journal_storecli.upload_file("testbucket", "test", str(path), part_size=8)
+
+    assert len(part_puts(s3_standin)) == 4
+    assert s3_standin.buckets["testbucket"]["test"].data == bytes(range(1, 31))
+
+
+def test_download_file_resumes_parts(journal_storecli, tmp_path, mocker):
+    data = os.urandom(DEFAULT_PART_SIZE + 1024)
+    journal_storecli.upload_stream("testbucket", "test", [data])
+    path = str(tmp_path / "test.bin")
+    mocker.patch(
+        "piperci.storeman.minio_client.os.replace", side_effect=PermissionError
+    )
+    with pytest.raises(PermissionError):
+        journal_storecli.download_file("minio://localhost/testbucket/test", path)
+
+    mocker.stopall()
+    partial = mocker.spy(journal_storecli.storage_client, "get_partial_object")
+    journal_storecli.download_file(
+        "minio://localhost/testbucket/test", path, expected_size=len(data)
+    )
+
+    partial.assert_called_once_with("testbucket", "test", DEFAULT_PART_SIZE)
+    with open(path, "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists(f"{path}.part")
+    assert not os.listdir(journal_storecli.journal.directory)
+
+
+def test_collect_journal_removes_stale_downloads(journal_storecli, tmp_path, mocker):
+    data = os.urandom(DEFAULT_PART_SIZE + 1024)
+    journal_storecli.upload_stream("testbucket", "test", [data])
+    path = str(tmp_path / "test.bin")
+    mocker.patch(
+        "piperci.storeman.minio_client.os.replace", side_effect=PermissionError
+    )
+    with pytest.raises(PermissionError):
+        journal_storecli.download_file("minio://localhost/testbucket/test", path)
+    mocker.stopall()
+    (name,) = os.listdir(journal_storecli.journal.directory)
+    os.utime(os.path.join(journal_storecli.journal.directory, name), (0, 0))
+    assert os.path.exists(f"{path}.part")
+
+    journal_storecli.collect_journal()
+
+    assert not os.path.exists(f"{path}.part")
+    assert not os.listdir(journal_storecli.journal.directory)
+
+
+def test_transfers_collect_journal_periodically(journal_storecli, tmp_path, mocker):
+    path = tmp_path / "test.bin"
+    path.write_bytes(bytes(range(30)))
+    collect = mocker.spy(journal_storecli, "collect_journal")
+
+    journal_storecli.upload_file("testbucket", "test", str(path), part_size=8)
+    assert not collect.called
+
+    journal_storecli.journal_gc_interval = 0
+    journal_storecli.upload_file("testbucket", "test", str(path), part_size=8)
+    collect.assert_called_once_with()
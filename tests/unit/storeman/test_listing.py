@@ -0,0 +1,101 @@
+import itertools
+import pytest
+
+from piperci.storeman.client import BaseStorageClient, ObjectRecord
+
+
+class MemoryClient(BaseStorageClient):
+    """Listing-only client over a sorted list of object names"""
+
+    def __init__(self, names):
+        self.names = sorted(names)
+        self.calls = []
+
+    def iter_objects(self, bucket_name, prefix=None, recursive=False, start_after=None):
+        self.calls.append((prefix, recursive))
+        prefix = prefix or ""
+        seen = set()
+        for name in self.names:
+            if not name.startswith(prefix) or (start_after and name <= start_after):
+                continue
+            rest = name[len(prefix):]
+            if not recursive and "/" in rest:
+                directory = prefix + rest.split("/")[0] + "/"
+                if directory not in seen:
+                    seen.add(directory)
+                    yield ObjectRecord(directory, 0, None, None, True)
+            else:
+                yield ObjectRecord(name, 1, "etag", None, False)
+
+    def stat_file(self, bucket_name, prefix=None, recursive=False):
+        pass
+
+    def object_uri(self, bucket_name, object_name):
+        pass
+
+    def download_file(self):
+        pass
+
+    def upload_file(self, bucket_name, object_name, file_path, dgst="sha256"):
+        pass
+
+    def upload_stream(
+        self, bucket_name, object_name, data, length=None, dgst="sha256"
+    ):
+        pass
+
+    def open_download(self, uri):
+        pass
+
+
+@pytest.fixture
+def names():
+    return ["top"] + [f"{d}/{i:03d}" for d in "abcd" for i in range(50)]
+
+
+def test_iter_objects_sharded(names):
+    client = MemoryClient(names)
+    records = list(client.iter_objects_sharded("bucket", workers=3, max_queued=5))
+
+    assert sorted(r.name for r in records) == sorted(names)
+    assert ("a/", True) in client.calls
+
+
+def test_iter_objects_sharded_no_shards():
+    client = MemoryClient(["one", "two"])
+    assert [r.name for r in client.iter_objects_sharded("bucket")] == ["one", "two"]
+
+
+def test_iter_objects_sharded_early_exit(names):
+    client = MemoryClient(names)
+    records = client.iter_objects_sharded("bucket", workers=2, max_queued=1)
+    assert len(list(itertools.islice(records, 10))) == 10
+    records.close()
+
+
+def test_iter_objects_sharded_error(names, mocker):
+    client = MemoryClient(names)
+    listing = client.iter_objects
+
+    def failing(bucket_name, prefix=None, recursive=False, start_after=None):
+        if prefix == "b/":
+            raise IOError("listing failed")
+        return listing(bucket_name, prefix, recursive, start_after)
+
+    mocker.patch.object(client, "iter_objects", side_effect=failing)
+    with pytest.raises(IOError):
+        list(client.iter_objects_sharded("bucket"))
+
+
+def test_iter_objects_start_after(standin_storecli):
+    names = ["a/1", "a/2", "b/1", "b/2", "c", "d"]
+    for name in names:
+        standin_storecli.upload_stream("testbucket", name, [b"test"])
+
+    records = standin_storecli.iter_objects(
+        "testbucket", recursive=True, start_after="a/2"
+    )
+    assert [r.name for r in records] == ["b/1", "b/2", "c", "d"]
+
+    records = standin_storecli.iter_objects("testbucket", prefix="b/", start_after="b/1")
+    assert [(r.name, r.size) for r in records] == [("b/2", 4)]
@@ -0,0 +1,227 @@
+import asyncio
+import base64
+import hashlib
+import os
+import pytest
+import threading
+
+from piperci.storeman import aio, minio_client
+from piperci.storeman.aio import AsyncMinioClient
+from piperci.storeman.client import storage_client
+from piperci.storeman.exceptions import IntegrityError, StorageError
+from piperci.storeman.integrity import DownloadVerifier
+from piperci.storeman.streams import SRIHasher
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def aio_client(s3_standin):
+    return storage_client(
+        storage_type="minio",
+        async_=True,
+        hostname=s3_standin.hostname,
+        access_key="MINIO_TEST_ACCESS",
+        secret_key="MINIO_TEST_SECRET",
+    )
+
+
+def test_storage_client_async():
+    storecli = storage_client(
+        storage_type="minio",
+        async_=True,
+        hostname="localhost",
+        access_key="1234",
+        secret_key="1234",
+    )
+    assert isinstance(storecli, AsyncMinioClient)
+
+
+def test_upload_download_file(aio_client, tmp_path):
+    src = os.path.join(tmp_path, "src.txt")
+    dst = os.path.join(tmp_path, "dst.txt")
+    with open(src, "w") as f:
+        f.write("test")
+
+    async def transfer():
+        async with aio_client:
+            record = await aio_client.upload_file("testbucket", "test", src)
+            await aio_client.upload_file("testbucket", "test", src)
+            await aio_client.download_file("minio://localhost/testbucket/test", dst)
+            return record
+
+    record = run(transfer())
+    assert record.size == 4
+    assert record.sri == "sha256-n4bQgYhMfWWaL+qgxVrQFaO/TxsrC4Is0V1sFbDwCgg="
+    with open(dst) as f:
+        assert f.read() == "test"
+
+
+def test_upload_stream_multipart(aio_client, s3_standin):
+    async def chunks():
+        for i in range(10):
+            yield bytes([i]) * 3
+
+    async def transfer():
+        async with aio_client:
+            record = await aio_client.upload_stream(
+                "testbucket", "stream", chunks(), part_size=8
+            )
+            uri = "minio://localhost/testbucket/stream"
+            async with aio_client.open_download(uri) as reader:
+                data = b"".join([chunk async for chunk in reader.iter_chunks(4)])
+            return record, data
+
+    record, data = run(transfer())
+    assert data == b"".join(bytes([i]) * 3 for i in range(10))
+    digest = base64.b64encode(hashlib.sha256(data).digest()).decode()
+    assert record.sri == f"sha256-{digest}"
+    assert s3_standin.started_uploads()[0].startswith("stream.")
+    assert list(s3_standin.buckets["testbucket"]) == ["stream"]
+
+
+def test_upload_digests_off_the_loop(aio_client, monkeypatch):
+    threads = set()
+    update = SRIHasher.update
+
+    def record_thread(self, data):
+        threads.add(threading.current_thread())
+        update(self, data)
+
+    async def chunks():
+        for i in range(10):
+            yield bytes([i]) * 3
+
+    async def transfer():
+        async with aio_client:
+            await aio_client.upload_stream("testbucket", "file", [b"x" * 20])
+            await aio_client.upload_stream(
+                "testbucket", "stream", chunks(), part_size=8
+            )
+
+    monkeypatch.setattr(SRIHasher, "update", record_thread)
+    run(transfer())
+
+    assert threads and threading.main_thread() not in threads
+
+
+def test_download_digests_off_the_loop(aio_client, monkeypatch, tmp_path):
+    threads = set()
+    update = DownloadVerifier.update
+
+    def record_thread(self, chunk):
+        threads.add(threading.current_thread())
+        update(self, chunk)
+
+    async def transfer():
+        async with aio_client:
+            record = await aio_client.upload_stream("testbucket", "test", [b"test"])
+            await aio_client.download_file(
+                "minio://localhost/testbucket/test",
+                str(tmp_path / "test"),
+                expected_sri=record.sri,
+            )
+
+    monkeypatch.setattr(DownloadVerifier, "update", record_thread)
+    run(transfer())
+
+    assert threads and threading.main_thread() not in threads
+
+
+def test_upload_stream_over_copy_limit(aio_client, s3_standin, monkeypatch):
+    s3_standin.max_copy_size = 16
+    monkeypatch.setattr(minio_client, "MAX_COPY_SIZE", 16)
+    monkeypatch.setattr(aio, "MAX_COPY_SIZE", 16)
+    data = bytes(range(40))
+
+    async def upload():
+        async with aio_client:
+            return await aio_client.upload_stream(
+                "testbucket", "test", [data], part_size=8
+            )
+
+    record = run(upload())
+
+    assert s3_standin.buckets["testbucket"]["test"].data == data
+    assert list(s3_standin.buckets["testbucket"]) == ["test"]
+    digest = base64.b64encode(hashlib.sha256(data).digest()).decode()
+    assert record.sri == f"sha256-{digest}"
+
+
+def test_stat_file_paginates(aio_client):
+    async def listing():
+        async with aio_client:
+            for name in ["a/1", "a/2", "b", "c", "d"]:
+                await aio_client.upload_stream("testbucket", name, [b"test"])
+            flat = await aio_client.stat_file("testbucket")
+            deep = await aio_client.stat_file("testbucket", recursive=True)
+            return flat, deep
+
+    flat, deep = run(listing())
+    assert sorted((r.name, r.is_dir) for r in flat) == [
+        ("a/", True),
+        ("b", False),
+        ("c", False),
+        ("d", False),
+    ]
+    assert [r.name for r in deep] == ["a/1", "a/2", "b", "c", "d"]
+
+
+def test_download_missing_object(aio_client, tmp_path):
+    async def download():
+        async with aio_client:
+            await aio_client.upload_stream("testbucket", "test", [b"test"])
+            await aio_client.download_file(
+                "minio://localhost/testbucket/missing", os.path.join(tmp_path, "x")
+            )
+
+    with pytest.raises(StorageError) as e:
+        run(download())
+    assert e.value.code == "NoSuchKey"
+
+
+def test_download_file_invalid_scheme(aio_client):
+    with pytest.raises(ValueError):
+        run(aio_client.download_file("http://localhost/test/test", "test"))
+
+
+def test_download_file_integrity_mismatch(aio_client, tmp_path):
+    async def download():
+        async with aio_client:
+            await aio_client.upload_stream("testbucket", "test", [b"test"])
+            await aio_client.download_file(
+                "minio://localhost/testbucket/test",
+                os.path.join(tmp_path, "test.txt"),
+                expected_sri="sha256-CXS0O7OjESVro+DicbpxpvZPeBy2jTJ/CuQJnScABWs=",
+            )
+
+    with pytest.raises(IntegrityError):
+        run(download())
+    assert not os.listdir(tmp_path)
+
+
+def test_transient_errors_are_retried(aio_client, s3_standin):
+    async def stat():
+        async with aio_client:
+            await aio_client.upload_stream("testbucket", "test", [b"test"])
+            s3_standin.failures = [503]
+            async with aio_client.open_download("minio://localhost/testbucket/test") as r:
+                return await r.read()
+
+    assert run(stat()) == b"test"
+    assert not s3_standin.failures
+
+
+def test_async_clients_are_not_shared():
+    def new():
+        return storage_client(
+            storage_type="minio",
+            async_=True,
+            hostname="localhost",
+            access_key="1234",
+            secret_key="1234",
+        )
+
+    assert new() is not new()
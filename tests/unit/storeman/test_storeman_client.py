@@ -1,6 +1,12 @@
 from piperci.storeman.client import storage_client
+from piperci.storeman.exceptions import IntegrityError
+from piperci.storeman import minio_client
+from piperci.storeman.minio_client import object_sri
+from piperci import sri as sritool
 
 from minio import Minio
+import hashlib
+import io
 import os
 import pytest
 
@@ -83,3 +89,269 @@ def test_upload_file_bucket_exists(minio_server, minio_bucket_with_files, tmp_pa
     storecli.upload_file(bucket, "testfile", os.path.join(tmp_path, "test.txt"))
 
     assert len(list(storecli.stat_file("testbucket", prefix="test_object")))
+
+
+def test_upload_stream(minio_server):
+    storecli = storage_client(
+        storage_type="minio",
+        hostname=minio_server,
+        access_key="MINIO_TEST_ACCESS",
+        secret_key="MINIO_TEST_SECRET",
+    )
+    storecli.upload_stream("testbucket", "test_stream", (b"test" for _ in range(4)))
+
+    with storecli.open_download("minio://localhost/testbucket/test_stream") as reader:
+        assert reader.read() == b"test" * 4
+
+
+def test_upload_stream_with_length(minio_server):
+    storecli = storage_client(
+        storage_type="minio",
+        hostname=minio_server,
+        access_key="MINIO_TEST_ACCESS",
+        secret_key="MINIO_TEST_SECRET",
+    )
+    stat = storecli.upload_stream(
+        "testbucket", "test_stream", io.BytesIO(b"test"), length=4
+    )
+
+    assert stat.size == 4
+
+
+def test_upload_stream_multipart(mocker):
+    storecli = storage_client(
+        storage_type="minio", hostname="test", access_key="1234", secret_key="1234"
+    )
+    minio = mocker.patch.object(storecli, "storage_client")
+    minio._new_multipart_upload.return_value = "upload-id"
+    minio._do_put_object.return_value = "etag"
+    minio.stat_object.return_value.size = 20
+
+    storecli.upload_stream(
+        "testbucket", "test_object", (b"test" for _ in range(5)), part_size=8
+    )
+
+    sizes = [call[0][3] for call in minio._do_put_object.call_args_list]
+    assert sorted(sizes) == [4, 8, 8]
+    uploaded_parts = minio._complete_multipart_upload.call_args[0][3]
+    assert sorted(uploaded_parts) == [1, 2, 3]
+
+
+def test_upload_stream_multipart_aborts(mocker):
+    storecli = storage_client(
+        storage_type="minio", hostname="test", access_key="1234", secret_key="1234"
+    )
+    minio = mocker.patch.object(storecli, "storage_client")
+    minio._new_multipart_upload.return_value = "upload-id"
+    minio._do_put_object.side_effect = IOError
+
+    with pytest.raises(IOError):
+        storecli.upload_stream(
+            "testbucket", "test_object", (b"test" for _ in range(5)), part_size=8
+        )
+
+    minio._remove_incomplete_upload.assert_called_once_with(
+        "testbucket", mocker.ANY, "upload-id"
+    )
+    staging = minio._remove_incomplete_upload.call_args[0][1]
+    assert staging.startswith("test_object.")
+
+
+def test_open_download_invalid_scheme():
+    storecli = storage_client(
+        storage_type="minio",
+        hostname="test",
+        access_key="MINIO_TEST_ACCESS",
+        secret_key="MINIO_TEST_SECRET",
+    )
+    with pytest.raises(ValueError):
+        storecli.open_download("http://172.17.0.1:8089/test/test")
+
+
+def test_iter_objects(minio_server, minio_bucket_with_files):
+    storecli = storage_client(
+        storage_type="minio",
+        hostname=minio_server,
+        access_key="MINIO_TEST_ACCESS",
+        secret_key="MINIO_TEST_SECRET",
+    )
+    bucket = minio_bucket_with_files
+    records = list(storecli.iter_objects(bucket, recursive=True))
+    assert [(r.name, r.size) for r in records] == [("test", 4)]
+    assert not list(storecli.iter_objects(bucket, start_after="test"))
+
+
+def test_storage_client_shared():
+    kwargs = {"hostname": "localhost", "access_key": "1234", "secret_key": "1234"}
+    storecli = storage_client(storage_type="minio", **kwargs)
+
+    assert storage_client(storage_type="minio", **kwargs) is storecli
+    assert storage_client(storage_type="minio", shared=False, **kwargs) is not storecli
+    assert (
+        storage_client(storage_type="minio", secure=True, **kwargs) is not storecli
+    )
+
+
+def test_storage_client_pool_settings():
+    storecli = storage_client(
+        storage_type="minio",
+        hostname="localhost",
+        access_key="1234",
+        secret_key="1234",
+        secure=True,
+        max_pool_size=32,
+        timeout=(1, 30),
+        retries=2,
+    )
+    http = storecli.storage_client._http
+
+    assert storecli.storage_client._is_ssl
+    assert http.connection_pool_kw["maxsize"] == 32
+    assert http.connection_pool_kw["timeout"].connect_timeout == 1
+    assert http.retry_policy.attempts == 3
+
+
+TEST_SRI = "sha256-n4bQgYhMfWWaL+qgxVrQFaO/TxsrC4Is0V1sFbDwCgg="
+
+
+def test_download_file_expected_sri(standin_storecli, tmp_path):
+    standin_storecli.upload_stream("testbucket", "test", [b"test"])
+    path = os.path.join(tmp_path, "test.txt")
+    standin_storecli.download_file(
+        "minio://localhost/testbucket/test", path, expected_sri=TEST_SRI
+    )
+    with open(path) as f:
+        assert f.read() == "test"
+
+
+@pytest.mark.parametrize(
+    "expected",
+    [
+        {"expected_sri": "sha256-CXS0O7OjESVro+DicbpxpvZPeBy2jTJ/CuQJnScABWs="},
+        {"expected_size": 3},
+        {"expected_size": 5},
+    ],
+)
+def test_download_file_integrity_mismatch(
+    standin_storecli, s3_standin, tmp_path, expected
+):
+    standin_storecli.upload_stream("testbucket", "test", [b"test"])
+    path = os.path.join(tmp_path, "test.txt")
+    with pytest.raises(IntegrityError):
+        standin_storecli.download_file(
+            "minio://localhost/testbucket/test", path, **expected
+        )
+    assert not os.listdir(tmp_path)
+    assert ("GET", "/testbucket/test") not in s3_standin.requests
+
+
+def test_upload_file_stores_sri(standin_storecli, tmp_path):
+    with open(os.path.join(tmp_path, "test.txt"), "w") as f:
+        f.write("test")
+    stat = standin_storecli.upload_file(
+        "testbucket", "test", os.path.join(tmp_path, "test.txt")
+    )
+
+    assert stat.sri == TEST_SRI
+    stored = standin_storecli.storage_client.stat_object("testbucket", "test")
+    assert object_sri(stored) == TEST_SRI
+
+
+def test_upload_stream_multi_digest_sri(standin_storecli):
+    stat = standin_storecli.upload_stream(
+        "testbucket", "test", [b"te", b"st"], dgst=["sha256", "sha512"]
+    )
+    hashes = sritool.sri_to_hashes(stat.sri)
+
+    assert [h.algorithm for h in hashes] == ["sha512", "sha256"]
+    assert str(hashes[1]) == TEST_SRI
+
+
+def test_upload_stream_multipart_stores_sri(standin_storecli, s3_standin):
+    data = [bytes([i]) * 3 for i in range(10)]
+    stat = standin_storecli.upload_stream("testbucket", "test", data, part_size=8)
+
+    assert s3_standin.started_uploads()[0].startswith("test.")
+    assert list(s3_standin.buckets["testbucket"]) == ["test"]
+    assert stat.size == 30
+    assert object_sri(stat) == stat.sri == str(
+        sritool.hash_to_sri_hash("sha256", hashlib.sha256(b"".join(data)).digest())
+    )
+
+
+def test_upload_stream_over_copy_limit(standin_storecli, s3_standin, monkeypatch):
+    s3_standin.max_copy_size = 16
+    monkeypatch.setattr(minio_client, "MAX_COPY_SIZE", 16)
+    data = bytes(range(40))
+
+    stat = standin_storecli.upload_stream("testbucket", "test", [data], part_size=8)
+
+    copied = [
+        path
+        for method, path in s3_standin.requests
+        if method == "PUT" and path.startswith("/testbucket/test?partNumber=")
+    ]
+    assert len(copied) == 3
+    assert s3_standin.buckets["testbucket"]["test"].data == data
+    assert list(s3_standin.buckets["testbucket"]) == ["test"]
+    assert object_sri(stat) == stat.sri
+
+
+def test_upload_stream_length_mismatch(standin_storecli):
+    with pytest.raises(ValueError):
+        standin_storecli.upload_stream("testbucket", "test", [b"test"], length=5)
+
+
+def test_transient_storage_errors_are_retried(standin_storecli, s3_standin, tmp_path):
+    standin_storecli.upload_stream("testbucket", "test", [b"test"])
+    s3_standin.failures = [503, 500]
+    path = os.path.join(tmp_path, "test.txt")
+
+    standin_storecli.download_file("minio://localhost/testbucket/test", path)
+
+    with open(path, "rb") as f:
+        assert f.read() == b"test"
+    assert not s3_standin.failures
+
+
+def test_artifact_pipeline_round_trip(standin_storecli, s3_standin, tmp_path):
+    from piperci.artifacts import publish
+
+    path = os.path.join(tmp_path, "artifact.txt")
+    with open(path, "wb") as f:
+        f.write(b"artifact")
+
+    (artifact,), summary = publish(standin_storecli, "testbucket", [path])
+
+    assert artifact.uri == f"minio://{s3_standin.hostname}/testbucket/artifact.txt"
+    assert artifact.sri == str(sritool.generate_sri(path))
+    download = os.path.join(tmp_path, "download.txt")
+    standin_storecli.download_file(artifact.uri, download, expected_sri=artifact.sri)
+    with open(download, "rb") as f:
+        assert f.read() == b"artifact"
+
+
+def test_upload_is_traced(standin_storecli):
+    from piperci import tracing
+
+    class Exporter(list):
+        export = list.append
+
+        def shutdown(self):
+            pass
+
+    spans = Exporter()
+    tracing.configure(spans)
+    try:
+        standin_storecli.upload_stream("testbucket", "traced", [b"test"])
+    finally:
+        tracing.configure()
+
+    (span,) = spans
+    assert span.name == "storeman.upload_stream"
+    assert span.attributes == {
+        "storeman.bucket_name": "testbucket",
+        "storeman.object_name": "traced",
+        "storeman.dgst": "sha256",
+        "storeman.bytes": 4,
+    }
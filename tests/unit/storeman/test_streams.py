@@ -0,0 +1,51 @@
+import io
+
+from piperci.storeman.streams import IterReader, ObjectReader, read_full
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+        self.closed = False
+        self.released = False
+
+    def read(self, amt=None):
+        return self.data.read(amt)
+
+    def stream(self, amt=None):
+        for chunk in iter(lambda: self.data.read(amt), b""):
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+    def release_conn(self):
+        self.released = True
+
+
+def test_read_full_short_reads():
+    reader = IterReader([b"ab", b"c", b"defg"])
+    assert read_full(reader, 5) == b"abcde"
+    assert read_full(reader, 5) == b"fg"
+    assert read_full(reader, 5) == b""
+
+
+def test_iter_reader_generator():
+    reader = IterReader(bytes([i]) * 3 for i in range(3))
+    assert reader.read() == b"\x00\x00\x00\x01\x01\x01\x02\x02\x02"
+
+
+def test_object_reader_releases_connection():
+    response = FakeResponse(b"test" * 10)
+    with ObjectReader(response) as reader:
+        assert b"".join(reader.iter_chunks(chunk_size=7)) == b"test" * 10
+    assert response.released
+    assert not response.closed
+
+
+def test_object_reader_partial_read_closes_connection():
+    response = FakeResponse(b"test" * 10)
+    with ObjectReader(response) as reader:
+        assert reader.read(4) == b"test"
+    assert response.released
+    assert response.closed
@@ -0,0 +1,25 @@
+import pytest
+
+from piperci import tracing
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def shutdown(self):
+        pass
+
+    def named(self, name):
+        return [span for span in self.spans if span.name == name]
+
+
+@pytest.fixture
+def spans():
+    exporter = ListExporter()
+    tracing.configure(exporter)
+    yield exporter
+    tracing.configure()
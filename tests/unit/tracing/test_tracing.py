@@ -0,0 +1,139 @@
+import io
+import json
+
+import pytest
+import responses
+
+from piperci import sri as sritool
+from piperci import tracing
+from piperci.gman import client
+
+EVENTS = [
+    {"task": {"task_id": "1234"}, "status": "received"},
+    {"task": {"task_id": "1234"}, "status": "completed"},
+]
+
+
+def test_span_is_noop_without_backend(monkeypatch):
+    monkeypatch.setattr(tracing, "_otel_tracer", None)
+
+    with tracing.span("test") as span:
+        span.set_attribute("key", "value")
+        assert tracing.current_span() is tracing.NOOP_SPAN
+    assert span is tracing.NOOP_SPAN
+
+
+def test_spans_nest(spans):
+    with tracing.span("outer", {"a": 1}) as outer:
+        with tracing.span("inner") as inner:
+            assert tracing.current_span() is inner
+        assert tracing.current_span() is outer
+
+    assert [span.name for span in spans.spans] == ["inner", "outer"]
+    assert inner.parent_id == outer.span_id
+    assert inner.trace_id == outer.trace_id
+    assert outer.attributes == {"a": 1}
+
+
+def test_span_records_exception(spans):
+    with pytest.raises(ValueError):
+        with tracing.span("failing"):
+            raise ValueError("boom")
+
+    (span,) = spans.spans
+    assert span.status == "ERROR"
+    assert span.events[0]["attributes"]["exception.message"] == "boom"
+
+
+def test_generate_sri_span(spans, tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(b"x" * 100)
+
+    sritool.generate_sri(str(path), dgst="sha512")
+
+    (span,) = spans.named("sri.generate_sri")
+    assert span.attributes == {"sri.algorithm": "sha512", "sri.bytes": 100}
+
+
+@responses.activate
+def test_gman_span_records_retries(spans):
+    url = "http://gman_url/task/1234/events"
+    responses.add(responses.GET, url, status=503)
+    responses.add(responses.GET, url, json=EVENTS)
+
+    client.get_task_id_events(task_id="1234", gman_url="http://gman_url")
+
+    (span,) = spans.named("gman.get_task_id_events")
+    assert span.attributes["gman.task_id"] == "1234"
+    assert span.attributes["gman.items"] == 2
+    assert span.attributes["retry.attempts"] == 2
+    assert [event["name"] for event in span.events] == ["retry"]
+
+
+@responses.activate
+def test_gman_span_records_poll_iterations(spans, mocker):
+    mocker.patch("piperci.gman.client.time.sleep")
+    url = "http://gman_url/task/1234/events"
+    responses.add(responses.GET, url, json=[])
+    responses.add(responses.GET, url, json=EVENTS)
+
+    client.wait_for_task_status("1234", "completed", "http://gman_url")
+
+    (span,) = spans.named("gman.wait_for_task_status")
+    assert span.attributes["gman.poll_iterations"] == 2
+    assert span.attributes["gman.task_id"] == "1234"
+
+
+def test_file_exporter(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracing.configure(tracing.FileExporter(str(path)))
+    try:
+        with tracing.span("test", {"key": "value"}):
+            pass
+    finally:
+        tracing.configure()
+
+    (record,) = [json.loads(line) for line in path.read_text().splitlines()]
+    assert record["name"] == "test"
+    assert record["attributes"] == {"key": "value"}
+    assert record["duration_ms"] >= 0
+
+
+def test_file_exporter_opens_on_first_span(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    exporter = tracing.FileExporter(str(path))
+
+    assert not path.exists()
+    exporter.shutdown()
+    assert not path.exists()
+
+
+def test_file_exporter_unwritable(tmp_path, caplog):
+    tracing.configure(tracing.FileExporter(str(tmp_path / "missing" / "trace.jsonl")))
+    try:
+        with tracing.span("test"):
+            pass
+        with tracing.span("test"):
+            pass
+    finally:
+        tracing.configure()
+
+    assert len([r for r in caplog.records if "Dropping spans" in r.getMessage()]) == 1
+
+
+def test_invalid_env_is_ignored(caplog):
+    assert tracing._exporter_from_env("jaeger") is None
+    assert "PIPERCI_TRACE=jaeger" in caplog.text
+
+
+def test_console_exporter():
+    out = io.StringIO()
+    tracing.configure(tracing.ConsoleExporter(out))
+    try:
+        with tracing.span("test", {"key": "value"}):
+            pass
+    finally:
+        tracing.configure()
+
+    assert "test" in out.getvalue()
+    assert "key=value" in out.getvalue()